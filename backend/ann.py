@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from backend.rag import EmbeddingIndex, normalize_rows, top_k_scores
+from backend.settings import ANN_ENABLED, ANN_MIN_ROWS, ANN_NLIST, ANN_NPROBE
+from backend.store import DB_PATH
+
+# Trained IVF centroids/lists are cached next to the database.
+ANN_INDEX_PATH = DB_PATH.parent / "ann_ivf.npz"
+
+
+def ann_index_path(source: str) -> Path:
+    """Cache file for one source partition's IVF index."""
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in source)
+    return ANN_INDEX_PATH.with_name(f"{ANN_INDEX_PATH.stem}_{safe}.npz")
+
+KMEANS_ITERS = 20
+KMEANS_SAMPLE = 50_000
+
+
+def matrix_fingerprint(matrix: np.ndarray, block_rows: int = 65536) -> str:
+    """Cheap identity check so a cached index is only reused for the same rows."""
+    h = hashlib.sha1()
+    h.update(str(matrix.shape).encode("ascii"))
+    # Hashed block by block so memory-mapped matrices are never copied whole.
+    for start in range(0, matrix.shape[0], block_rows):
+        block = np.ascontiguousarray(matrix[start:start + block_rows], dtype=np.float32)
+        h.update(block.tobytes())
+    return h.hexdigest()
+
+
+def auto_nlist(n_rows: int) -> int:
+    # Common IVF rule of thumb: about 4 * sqrt(N) lists.
+    return max(1, min(n_rows, int(4 * np.sqrt(max(1, n_rows)))))
+
+
+def spherical_kmeans(
+    matrix: np.ndarray,
+    n_clusters: int,
+    iters: int = KMEANS_ITERS,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    k-means on unit vectors using dot-product assignment.
+    matrix: normalized rows (N, d)
+    returns: normalized centroids (n_clusters, d)
+    """
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+
+    # 1) Train on a sample; assignments for all rows are done afterwards.
+    if n > KMEANS_SAMPLE:
+        sample = matrix[rng.choice(n, size=KMEANS_SAMPLE, replace=False)]
+    else:
+        sample = matrix
+
+    # 2) Seed centroids from random rows.
+    centroids = sample[rng.choice(sample.shape[0], size=n_clusters, replace=False)].copy()
+
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+
+        # 3) Recompute means; empty clusters are reseeded from random rows.
+        new = np.zeros_like(centroids)
+        np.add.at(new, assign, sample)
+        counts = np.bincount(assign, minlength=n_clusters)
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            new[empty] = sample[rng.choice(sample.shape[0], size=empty.size)]
+
+        new = normalize_rows(new)
+        if np.allclose(new, centroids, atol=1e-5):
+            centroids = new
+            break
+        centroids = new
+
+    return centroids.astype(np.float32)
+
+
+class IVFIndex(EmbeddingIndex):
+    """
+    Inverted-file ANN index over normalized chunk embeddings.
+
+    Rows are bucketed by their nearest k-means centroid; a query scores the
+    centroids and scans only the nprobe closest buckets. Lists are stored
+    CSR-style: `order` holds row ids grouped by list, `offsets` the bounds.
+    """
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        centroids: np.ndarray,
+        order: np.ndarray,
+        offsets: np.ndarray,
+        nprobe: int = ANN_NPROBE,
+        normalized: bool = False,
+    ):
+        if normalized:
+            self.matrix = np.asarray(matrix, dtype=np.float32)
+        else:
+            super().__init__(matrix)
+        self.centroids = centroids.astype(np.float32)
+        self.order = order.astype(np.int64)
+        self.offsets = offsets.astype(np.int64)
+        self.nprobe = max(1, int(nprobe))
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        nlist: int = 0,
+        nprobe: int = ANN_NPROBE,
+        seed: int = 0,
+        normalized: bool = False,
+    ) -> "IVFIndex":
+        m = matrix if normalized else normalize_rows(matrix)
+        n = m.shape[0]
+        nlist = auto_nlist(n) if nlist <= 0 else min(int(nlist), n)
+
+        centroids = spherical_kmeans(m, nlist, seed=seed)
+        assign = np.concatenate([
+            np.argmax(np.asarray(m[start:start + KMEANS_SAMPLE]) @ centroids.T, axis=1)
+            for start in range(0, n, KMEANS_SAMPLE)
+        ])
+
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        return cls(m, centroids, order, offsets, nprobe=nprobe, normalized=True)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            centroids=self.centroids,
+            order=self.order,
+            offsets=self.offsets,
+            fingerprint=np.array(matrix_fingerprint(self.matrix)),
+        )
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        matrix: np.ndarray,
+        nprobe: int = ANN_NPROBE,
+        normalized: bool = False,
+    ) -> "IVFIndex | None":
+        """Return the cached index, or None if missing or built for other rows."""
+        if not path.exists():
+            return None
+
+        m = matrix if normalized else normalize_rows(matrix)
+        try:
+            with np.load(path) as data:
+                if str(data["fingerprint"]) != matrix_fingerprint(m):
+                    return None
+                return cls(
+                    m,
+                    data["centroids"],
+                    data["order"],
+                    data["offsets"],
+                    nprobe=nprobe,
+                    normalized=True,
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def candidates(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        """Row ids in the nprobe lists whose centroids are closest to q."""
+        nprobe = max(1, min(int(nprobe), self.nlist))
+        lists, _ = top_k_scores(self.centroids @ q, nprobe)
+        return np.concatenate(
+            [self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists]
+        )
+
+    def search(self, query_vec: np.ndarray, k: int = 5, nprobe: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        if len(self) == 0:
+            return np.array([], dtype=int), np.array([], dtype=np.float32)
+
+        if query_vec.ndim != 1:
+            raise ValueError("query_vec pitää olla 1D, muoto (d,)")
+
+        if query_vec.shape[0] != self.dim:
+            raise ValueError("dimensiot ei täsmää")
+
+        q = normalize_rows(query_vec)
+        cand = self.candidates(q, self.nprobe if nprobe is None else nprobe)
+
+        # Too few rows in the probed lists: answer exactly instead.
+        if cand.size < min(int(k), len(self)):
+            return super().search(query_vec, k)
+
+        sims = self.matrix[cand] @ q
+        local_idx, scores = top_k_scores(sims, k)
+        return cand[local_idx].astype(int), scores
+
+    def search_many(self, query_matrix: np.ndarray, k: int = 5) -> list[tuple[np.ndarray, np.ndarray]]:
+        if query_matrix.ndim != 2:
+            raise ValueError("query_matrix pitää olla 2D, muoto (Q, d)")
+        # Candidate lists differ per query, so each row is probed separately.
+        return [self.search(q, k) for q in query_matrix]
+
+
+def build_search_index(
+    matrix: np.ndarray,
+    path: Path = ANN_INDEX_PATH,
+    exact: EmbeddingIndex | None = None,
+) -> EmbeddingIndex:
+    """
+    Pick the search index for the loaded chunk matrix.
+    Small corpora (or ANN_ENABLED=0) use exact search; otherwise the cached
+    IVF index is loaded from disk, or trained and saved when stale.
+    exact: prebuilt exact index (e.g. a memory-mapped one) to use and to
+    take the normalized rows from; defaults to EmbeddingIndex(matrix).
+    """
+    if exact is None:
+        exact = EmbeddingIndex(matrix)
+
+    if not ANN_ENABLED or len(exact) < ANN_MIN_ROWS:
+        return exact
+
+    index = IVFIndex.load(path, exact.matrix, nprobe=ANN_NPROBE, normalized=True)
+    if index is not None:
+        return index
+
+    index = IVFIndex.build(exact.matrix, nlist=ANN_NLIST, nprobe=ANN_NPROBE, normalized=True)
+    try:
+        index.save(path)
+    except OSError:
+        pass
+    return index
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from backend.ann import ann_index_path, build_search_index
+from backend.quant import QuantizedIndex, code_dtype, quantize, sqlite_row_fetcher
+from backend.rag import EmbeddingIndex, top_k_scores
+from backend.settings import EMBED_QUANT, EMBED_SIDECAR, RESCORE_FACTOR, SIDECAR_BLOCK_ROWS
+from backend.sidecar import (
+    MemmapIndex,
+    SIDECAR_META_PATH,
+    open_sidecar,
+    read_sidecar_meta,
+    sidecar_slice,
+)
+from backend.store import DB_PATH, read_index_generations
+
+EMBED_DIM = 384
+
+
+@dataclass(frozen=True)
+class SourcePartition:
+    """All embedded chunks of one `chunks.source`, with their own search index."""
+    source: str
+    generation: int
+    chunk_ids: np.ndarray
+    refs: list[str]
+    texts: list[str]
+    index: EmbeddingIndex
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+class ChunkSnapshot:
+    """
+    Immutable view of the chunk index that requests read from.
+
+    Partitions are laid out back to back, so a global row position maps to
+    (partition, local row) through `offsets`; the flat `chunk_*` lists keep
+    the existing idx-based helpers working. Reloads build a new snapshot and
+    swap it in, reusing the partitions whose generation did not change.
+    """
+
+    def __init__(
+        self,
+        partitions: dict[str, SourcePartition] | None = None,
+        generations: dict[str, int] | None = None,
+    ):
+        self.partitions = dict(sorted((partitions or {}).items()))
+        self.offsets: dict[str, int] = {}
+        # index_generations as read when this snapshot was built.
+        self.generations = dict(generations or {})
+
+        chunk_ids: list[np.ndarray] = []
+        self.chunk_sources: list[str] = []
+        self.chunk_refs: list[str] = []
+        self.chunk_texts: list[str] = []
+
+        offset = 0
+        for source, part in self.partitions.items():
+            self.offsets[source] = offset
+            chunk_ids.append(part.chunk_ids)
+            self.chunk_sources.extend([source] * len(part))
+            self.chunk_refs.extend(part.refs)
+            self.chunk_texts.extend(part.texts)
+            offset += len(part)
+
+        self.chunk_ids = np.concatenate(chunk_ids) if chunk_ids else np.empty(0, dtype=np.int64)
+        # chunk id -> global row, for hits that come from SQLite (e.g. FTS5).
+        self.position_of = {int(cid): pos for pos, cid in enumerate(self.chunk_ids)}
+
+    def __len__(self) -> int:
+        return len(self.chunk_texts)
+
+    def size(self, sources: list[str] | None = None) -> int:
+        """Number of chunks in the selected sources (all when None)."""
+        return sum(len(p) for p in self.selected(sources))
+
+    def selected(self, sources: list[str] | None = None) -> list[SourcePartition]:
+        if sources is None:
+            return list(self.partitions.values())
+        return [self.partitions[s] for s in dict.fromkeys(sources) if s in self.partitions]
+
+    def search(
+        self,
+        query_vec: np.ndarray,
+        k: int = 5,
+        sources: list[str] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k over the selected partitions; returned idx are global row positions."""
+        return self.search_many(query_vec[None, :], k, sources)[0]
+
+    def search_many(
+        self,
+        query_matrix: np.ndarray,
+        k: int = 5,
+        sources: list[str] | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        n_queries = query_matrix.shape[0]
+        per_query: list[list[tuple[np.ndarray, np.ndarray]]] = [[] for _ in range(n_queries)]
+
+        # 1) Each selected partition answers its own top-k, shifted to global
+        #    positions; partitions outside `sources` are never scanned.
+        for part in self.selected(sources):
+            source = part.source
+            if len(part) == 0:
+                continue
+            offset = self.offsets[source]
+            for r, (idx, scores) in enumerate(part.index.search_many(query_matrix, k)):
+                per_query[r].append((idx + offset, scores))
+
+        # 2) Merge the partition winners per query.
+        out: list[tuple[np.ndarray, np.ndarray]] = []
+        for hits in per_query:
+            if not hits:
+                out.append((np.array([], dtype=int), np.array([], dtype=np.float32)))
+                continue
+            idx = np.concatenate([h[0] for h in hits])
+            scores = np.concatenate([h[1] for h in hits])
+            keep, best = top_k_scores(scores, k)
+            out.append((idx[keep].astype(int), best))
+        return out
+
+
+def load_snapshot(
+    db_path: Path = DB_PATH,
+    meta_path: Path = SIDECAR_META_PATH,
+    previous: ChunkSnapshot | None = None,
+    force: bool = False,
+) -> ChunkSnapshot:
+    """
+    Build a snapshot from SQLite. Partitions of `previous` whose generation
+    still matches are reused as-is; everything else is reloaded.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        # One read transaction so metadata and blobs come from the same snapshot
+        # even if an ingest script is writing meanwhile.
+        conn.execute("BEGIN")
+        generations = read_index_generations(conn)
+        try:
+            sources = [
+                r[0] for r in conn.execute(
+                    "SELECT DISTINCT source FROM chunks WHERE length(embedding) > 0"
+                ).fetchall()
+            ]
+        except sqlite3.OperationalError:
+            sources = []
+
+        meta = read_sidecar_meta(meta_path) if EMBED_SIDECAR else None
+        mm = open_sidecar(meta, meta_path) if meta is not None else None
+
+        partitions: dict[str, SourcePartition] = {}
+        for source in sources:
+            generation = generations.get(source, 0)
+            old = previous.partitions.get(source) if previous is not None else None
+            if old is not None and not force and old.generation == generation:
+                partitions[source] = old
+                continue
+            partitions[source] = load_partition(conn, db_path, source, generation, meta, mm)
+    finally:
+        conn.close()
+
+    return ChunkSnapshot(partitions, generations)
+
+
+def load_partition(
+    conn: sqlite3.Connection,
+    db_path: Path,
+    source: str,
+    generation: int,
+    meta: dict | None,
+    mm: np.ndarray | None,
+) -> SourcePartition:
+    """
+    Load one source. Embeddings come from the first available of:
+    1) EMBED_QUANT codes in SQLite (rescored from the sidecar or SQLite),
+    2) the memory-mapped sidecar written by ingest (no blobs are read),
+    3) the float32 blobs in chunks.embedding.
+    """
+    rows = conn.execute(
+        """
+        SELECT id, ref, text, embedding_q, embedding_scale, quant
+        FROM chunks
+        WHERE source = ? AND length(embedding) > 0
+        ORDER BY id
+        """,
+        (source,),
+    ).fetchall()
+
+    ids = [int(r[0]) for r in rows]
+    chunk_ids = np.asarray(ids, dtype=np.int64)
+    mm_rows = sidecar_slice(meta, mm, source, ids) if mm is not None else None
+
+    if EMBED_QUANT != "none":
+        index = load_quantized_index(conn, db_path, source, rows, chunk_ids, mm_rows)
+    elif mm_rows is not None:
+        # Rows were normalized at write time; searches scan the mmap in blocks.
+        index = build_search_index(
+            mm_rows,
+            path=ann_index_path(source),
+            exact=MemmapIndex(mm_rows, block_rows=SIDECAR_BLOCK_ROWS),
+        )
+    else:
+        # Normalize once here so per-request search is a plain dot product;
+        # large corpora get an IVF index (cached under db/) instead of a full scan.
+        index = build_search_index(
+            load_float32_matrix(conn, source, len(ids)),
+            path=ann_index_path(source),
+        )
+
+    return SourcePartition(
+        source=source,
+        generation=generation,
+        chunk_ids=chunk_ids,
+        refs=[r[1] for r in rows],
+        texts=[r[2] for r in rows],
+        index=index,
+    )
+
+
+def load_float32_matrix(conn: sqlite3.Connection, source: str, n_rows: int) -> np.ndarray:
+    """Decode the non-empty chunks.embedding blobs of one source, in id order."""
+    if n_rows == 0:
+        return np.empty((0, EMBED_DIM), dtype=np.float32)
+
+    cur = conn.execute(
+        "SELECT embedding FROM chunks WHERE source = ? AND length(embedding) > 0 ORDER BY id",
+        (source,),
+    )
+    return np.vstack([np.frombuffer(blob, dtype=np.float32) for (blob,) in cur])
+
+
+def load_quantized_index(
+    conn: sqlite3.Connection,
+    db_path: Path,
+    source: str,
+    rows: list,
+    chunk_ids: np.ndarray,
+    mm_rows: np.ndarray | None,
+) -> QuantizedIndex:
+    codes: list[np.ndarray | None] = []
+    scales: list[float] = []
+    missing: list[int] = []
+
+    # Stored codes for the configured mode are used as-is; other rows are
+    # quantized from their float32 blob below.
+    for pos, (_, _, _, q_blob, q_scale, q_mode) in enumerate(rows):
+        if q_mode == EMBED_QUANT and q_blob:
+            codes.append(np.frombuffer(q_blob, dtype=code_dtype(EMBED_QUANT)))
+            scales.append(float(q_scale))
+        else:
+            codes.append(None)
+            scales.append(1.0)
+            missing.append(pos)
+
+    if missing:
+        cur = conn.execute(
+            """
+            SELECT embedding FROM chunks
+            WHERE source = ? AND length(embedding) > 0
+              AND NOT (quant IS ? AND COALESCE(length(embedding_q), 0) > 0)
+            ORDER BY id
+            """,
+            (source, EMBED_QUANT),
+        )
+        blobs = np.vstack([np.frombuffer(blob, dtype=np.float32) for (blob,) in cur])
+        row_codes, row_scales = quantize(blobs, EMBED_QUANT)
+        for pos, c, s in zip(missing, row_codes, row_scales):
+            codes[pos] = c
+            scales[pos] = float(s)
+
+    if codes:
+        matrix = np.vstack(codes)
+    else:
+        matrix = np.empty((0, EMBED_DIM), dtype=code_dtype(EMBED_QUANT))
+
+    if mm_rows is not None:
+        full_rows = lambda pos: np.asarray(mm_rows[pos])
+    else:
+        full_rows = sqlite_row_fetcher(db_path, chunk_ids)
+
+    return QuantizedIndex(
+        matrix,
+        np.asarray(scales, dtype=np.float32),
+        full_rows,
+        rescore_factor=RESCORE_FACTOR,
+    )
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from typing import Any, Callable
+
+import numpy as np
+
+from backend.ingest_embedder import IngestEmbedder
+from backend.query_cache import normalize_query
+from backend.settings import INGEST_EMBED_BATCH, INGEST_EMBED_WORKERS
+
+# Embedding model used by the server and every ingest script.
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+# Misses encoded (and stored) per round; large enough for length bucketing
+# and the process pool to pay off, small enough to keep progress on disk.
+ENCODE_BLOCK = 4096
+
+
+def text_key(text: str) -> str:
+    """sha256 of the normalized text; variants the model embeds identically share a key."""
+    return hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+
+
+def load_sentence_transformer(model_name: str = EMBED_MODEL_NAME) -> Any:
+    print("Ladataan embedding-malli...")
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    print("Malli ladattu.")
+    return model
+
+
+def load_ingest_embedder(model_name: str = EMBED_MODEL_NAME) -> IngestEmbedder:
+    return IngestEmbedder(
+        load_sentence_transformer(model_name),
+        workers=INGEST_EMBED_WORKERS,
+        batch_size=INGEST_EMBED_BATCH,
+    )
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embeddings in the `embedding_cache` table, keyed by
+    (model name, sha256 of normalized text). encode() reads hits from the
+    table and sends only the misses to the model, in blocks; the model
+    (an IngestEmbedder by default) is loaded on the first miss.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        model_name: str = EMBED_MODEL_NAME,
+        load_model: Callable[[], Any] | None = None,
+    ):
+        self.conn = conn
+        self.model_name = model_name
+        self.load_model = load_model or (lambda: load_ingest_embedder(model_name))
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            self._model = self.load_model()
+        return self._model
+
+    def lookup(self, keys: list[str]) -> dict[str, np.ndarray]:
+        found: dict[str, np.ndarray] = {}
+        # Stay under SQLite's bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"""
+                SELECT text_hash, embedding FROM embedding_cache
+                WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})
+                """,
+                [self.model_name, *batch],
+            ).fetchall()
+            found.update({h: np.frombuffer(blob, dtype=np.float32) for h, blob in rows})
+        return found
+
+    def encode(self, texts: list[str], block_size: int = ENCODE_BLOCK) -> np.ndarray:
+        """float32 embeddings for texts, rows in the same order."""
+        keys = [text_key(t) for t in texts]
+        unique = list(dict.fromkeys(keys))
+        found = self.lookup(unique)
+
+        # 1) One representative text per missing key.
+        first_text: dict[str, str] = {}
+        for k, t in zip(keys, texts):
+            first_text.setdefault(k, t)
+        missing = [k for k in unique if k not in found]
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+
+        # 2) Encode the misses block by block and store each block.
+        for start in range(0, len(missing), block_size):
+            batch = missing[start:start + block_size]
+            emb = np.asarray(
+                self.model.encode([first_text[k] for k in batch]),
+                dtype=np.float32,
+            )
+            with self.conn:
+                self.conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO embedding_cache(model, text_hash, embedding)
+                    VALUES(?, ?, ?)
+                    """,
+                    [(self.model_name, k, vec.tobytes()) for k, vec in zip(batch, emb)],
+                )
+            found.update(zip(batch, emb))
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([found[k] for k in keys])
+
+    def summary(self) -> str:
+        line = f"{self.hits} osumaa, {self.misses} uutta"
+        if self._model is not None and hasattr(self._model, "summary"):
+            line += f"; malli: {self._model.summary()}"
+        return line
+
+    def close(self) -> None:
+        """Stop the embedder's worker processes, if any were started."""
+        if self._model is not None and hasattr(self._model, "close"):
+            self._model.close()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+import numpy as np
+
+# Queued to wake a worker up for shutdown.
+_STOP = object()
+
+
+class BatchingEncoder:
+    """
+    Micro-batching front for the embedding model.
+
+    Callers on the FastAPI threadpool queue their texts and wait on futures;
+    worker threads drain the queue and run one `encode_fn` call per batch,
+    flushing after `max_batch` texts or `max_wait_ms` since the first text
+    of the batch arrived. Many concurrent batch-of-1 encodes become a few
+    batched forward passes.
+
+    Until start() (or after stop()) encode() calls `encode_fn` directly.
+    Callers wait at most `timeout_sec` for their rows.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], np.ndarray],
+        max_batch: int = 32,
+        max_wait_ms: float = 5,
+        workers: int = 1,
+        timeout_sec: float = 30,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_sec = max(0.0, float(max_wait_ms)) / 1000.0
+        self.workers = max(1, int(workers))
+        self.timeout_sec = max(0.001, float(timeout_sec))
+        self.batches = 0
+        self.items = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+        # Guards _threads, so submit() never queues behind stop()'s drain.
+        self._run_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self) -> None:
+        with self._run_lock:
+            if self._threads:
+                return
+            for n in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"embed-batcher-{n}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self) -> None:
+        with self._run_lock:
+            threads, self._threads = self._threads, []
+            for _ in threads:
+                self._queue.put(_STOP)
+        for t in threads:
+            t.join(timeout=5)
+
+        # Texts queued while shutting down are encoded here, so no caller hangs.
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._encode_batch(leftovers)
+
+    def submit(self, text: str) -> Future:
+        fut: Future = Future()
+        with self._run_lock:
+            if self._threads:
+                self._queue.put((text, fut))
+                return fut
+        # Stopped: nobody would drain the queue, so encode right here.
+        self._encode_batch([(text, fut)])
+        return fut
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Embeddings for texts, rows in the same order."""
+        if not self.running:
+            return np.asarray(self.encode_fn(list(texts)), dtype=np.float32)
+
+        futures = [self.submit(t) for t in texts]
+        rows = [f.result(timeout=self.timeout_sec) for f in futures]
+        if not rows:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(rows)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "running": self.running,
+                "workers": self.workers,
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            }
+
+    def _collect(self, first) -> tuple[list, bool]:
+        """Gather a batch starting with `first`; returns (batch, stop_seen)."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_sec
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch, stop_seen = self._collect(first)
+            self._encode_batch(batch)
+
+            if stop_seen:
+                return
+
+    def _encode_batch(self, batch: list) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            vecs = np.asarray(self.encode_fn(texts), dtype=np.float32)
+            if vecs.ndim != 2 or len(vecs) != len(batch):
+                raise RuntimeError(f"encoder returned {vecs.shape} for {len(batch)} texts")
+        except Exception as e:
+            # Every caller in the batch sees the encoder error.
+            for _, fut in batch:
+                fut.set_exception(e)
+        else:
+            for (_, fut), vec in zip(batch, vecs):
+                fut.set_result(vec)
+
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable
+
+from backend.embed_cache import EmbeddingCache
+from backend.quant import quantized_columns
+from backend.rag import chunk_text
+from backend.settings import EMBED_QUANT
+from backend.store import read_chunk_page_hashes
+
+
+def page_text_hash(text: str, chunk_size: int, overlap: int) -> str:
+    """
+    Hash of a page's source text plus the chunking parameters, so a page is
+    re-chunked when either its text or the way it is split changes.
+    """
+    h = hashlib.sha256(f"{chunk_size}:{overlap}\n".encode("utf-8"))
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+def diff_chunks(
+    old: list[tuple[int, str]],
+    new: list[str],
+) -> tuple[list[int], list[int], list[str]]:
+    """
+    Match a page's stored chunks to its freshly chunked text by content.
+    old: (chunk_id, text) rows currently stored for the page
+    new: chunk texts the page produces now
+    returns: (keep_ids, delete_ids, insert_texts)
+
+    A stored chunk whose text is still produced keeps its row (same id,
+    no re-embedding); only texts without a stored match are inserted.
+    """
+    available: dict[str, list[int]] = defaultdict(list)
+    for chunk_id, text in sorted(old):
+        available[text].append(chunk_id)
+
+    keep_ids: list[int] = []
+    insert_texts: list[str] = []
+    for text in new:
+        ids = available.get(text)
+        if ids:
+            keep_ids.append(ids.pop(0))
+        else:
+            insert_texts.append(text)
+
+    delete_ids = sorted(i for ids in available.values() for i in ids)
+    return keep_ids, delete_ids, insert_texts
+
+
+@dataclass
+class SyncPlan:
+    """What an incremental sync of one chunk source will change."""
+    source: str
+    new_hashes: dict[str, str] = field(default_factory=dict)
+    to_insert: list[tuple[str, str]] = field(default_factory=list)
+    delete_ids: list[int] = field(default_factory=list)
+    removed_refs: list[str] = field(default_factory=list)
+    # (ref, new chunks, stale chunks) per changed document.
+    changed: list[tuple[str, int, int]] = field(default_factory=list)
+    kept: int = 0
+
+    @property
+    def changes_chunks(self) -> bool:
+        return bool(self.delete_ids or self.to_insert or self.removed_refs)
+
+
+def plan_sync(
+    conn: sqlite3.Connection,
+    source: str,
+    docs: dict[str, str],
+    chunk_size: int = 500,
+    overlap: int = 150,
+    full: bool = False,
+    chunker: Callable[..., list[str]] = chunk_text,
+) -> SyncPlan:
+    """
+    Compare docs (ref -> text, e.g. manual pages or notes sections) with the
+    stored chunks of `source`. Only refs whose text hash changed are
+    re-chunked; refs no longer in docs are removed. full=True replans
+    everything and reuses no stored chunk. chunker(text, chunk_size=,
+    overlap=) splits one document (default: rag.chunk_text).
+    """
+    plan = SyncPlan(source)
+
+    # 1) Current chunks and document hashes of the source.
+    old_by_ref: dict[str, list[tuple[int, str]]] = {}
+    for chunk_id, ref, text in conn.execute(
+        "SELECT id, ref, text FROM chunks WHERE source = ? ORDER BY id", (source,)
+    ):
+        old_by_ref.setdefault(ref, []).append((int(chunk_id), text))
+    stored_hashes = read_chunk_page_hashes(conn, source)
+
+    if full:
+        plan.delete_ids = [cid for rows in old_by_ref.values() for cid, _ in rows]
+        old_by_ref = {}
+        stored_hashes = {}
+
+    # 2) Changed documents: diff their chunks against the stored rows.
+    for ref, text in docs.items():
+        h = page_text_hash(text, chunk_size, overlap)
+        if stored_hashes.get(ref) == h:
+            continue
+        plan.new_hashes[ref] = h
+        keep_ids, stale_ids, texts = diff_chunks(
+            old_by_ref.get(ref, []),
+            chunker(text, chunk_size=chunk_size, overlap=overlap),
+        )
+        plan.kept += len(keep_ids)
+        plan.delete_ids.extend(stale_ids)
+        plan.to_insert.extend((ref, t) for t in texts)
+        plan.changed.append((ref, len(texts), len(stale_ids)))
+
+    # 3) Documents that are gone.
+    plan.removed_refs = sorted(ref for ref in set(old_by_ref) | set(stored_hashes) if ref not in docs)
+    for ref in plan.removed_refs:
+        plan.delete_ids.extend(cid for cid, _ in old_by_ref.get(ref, []))
+
+    plan.delete_ids = sorted(set(plan.delete_ids))
+    return plan
+
+
+def embed_chunk_rows(cache: EmbeddingCache, source: str, items: list[tuple[str, str]]) -> list[tuple]:
+    """Embed (ref, text) items; returns chunk rows ready for INSERT."""
+    if not items:
+        return []
+
+    # All texts in one call: cached ones are read back, and the misses are
+    # length-bucketed and spread over the embedding worker processes.
+    emb = cache.encode([text for _, text in items])
+    # EMBED_QUANT=float16|int8 also stores the compact codes the server scans.
+    compact = quantized_columns(emb, EMBED_QUANT)
+
+    return [
+        (source, ref, text, vec.tobytes(), *qcols)
+        for (ref, text), vec, qcols in zip(items, emb, compact)
+    ]
+
+
+def apply_sync(conn: sqlite3.Connection, plan: SyncPlan, rows: list[tuple]) -> None:
+    """Delete stale chunks, insert new ones and update hashes in one transaction."""
+    with conn:
+        # Stay under SQLite's bound-parameter limit.
+        for start in range(0, len(plan.delete_ids), 500):
+            batch = plan.delete_ids[start:start + 500]
+            conn.execute(f"DELETE FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch)
+        conn.executemany(
+            """
+            INSERT INTO chunks(source, ref, text, embedding, embedding_q, embedding_scale, quant)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        conn.executemany(
+            """
+            INSERT INTO chunk_page_hashes(source, ref, text_hash) VALUES(?, ?, ?)
+            ON CONFLICT(source, ref) DO UPDATE SET text_hash = excluded.text_hash
+            """,
+            [(plan.source, ref, h) for ref, h in plan.new_hashes.items()],
+        )
+        conn.executemany(
+            "DELETE FROM chunk_page_hashes WHERE source = ? AND ref = ?",
+            [(plan.source, ref) for ref in plan.removed_refs],
+        )
+
+
+def sync_source(
+    conn: sqlite3.Connection,
+    source: str,
+    docs: dict[str, str],
+    cache: EmbeddingCache,
+    chunk_size: int = 500,
+    overlap: int = 150,
+    full: bool = False,
+    chunker: Callable[..., list[str]] = chunk_text,
+) -> SyncPlan:
+    """
+    Plan, embed and apply an incremental sync of one source. Documents
+    without chunks (e.g. empty pages) only record their hash; the caller
+    refreshes the sidecar and index generation when plan.changes_chunks.
+    """
+    plan = plan_sync(conn, source, docs, chunk_size, overlap, full, chunker)
+    rows = embed_chunk_rows(cache, source, plan.to_insert) if plan.changes_chunks else []
+    if plan.changes_chunks or plan.new_hashes:
+        apply_sync(conn, plan, rows)
+    return plan
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import numpy as np
+
+
+def length_order(texts: list[str]) -> np.ndarray:
+    """Indices that sort texts longest first (stable), so batches pad to similar lengths."""
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    return np.argsort(-lengths, kind="stable")
+
+
+def pool_min_texts(workers: int, batch_size: int) -> int:
+    """Smallest encode() input that goes to the process pool (each worker gets several batches)."""
+    return workers * batch_size * 4
+
+
+@contextmanager
+def env_override(name: str, value: str) -> Iterator[None]:
+    """Set an environment variable for the duration of the block, then restore it."""
+    old = os.environ.get(name)
+    os.environ[name] = value
+    try:
+        yield
+    finally:
+        if old is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = old
+
+
+class IngestEmbedder:
+    """
+    Ingest-side wrapper around a SentenceTransformer.
+
+    encode() sorts texts by length before batching and restores the input
+    order afterwards. Large inputs are spread over a sentence-transformers
+    multi-process pool (`workers` processes, started on first use); small
+    ones are encoded in-process, where starting the pool would cost more
+    than it saves.
+    """
+
+    def __init__(self, model: Any, workers: int = 0, batch_size: int = 64):
+        self.model = model
+        self.workers = int(workers) or os.cpu_count() or 1
+        self.batch_size = max(1, int(batch_size))
+        self.encoded = 0
+        self.seconds = 0.0
+        self._pool = None
+
+    def __enter__(self) -> "IngestEmbedder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def use_pool(self, n_texts: int) -> bool:
+        return self.workers > 1 and n_texts >= pool_min_texts(self.workers, self.batch_size)
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """float32 embeddings, rows in the order of texts."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        t0 = time.perf_counter()
+        order = length_order(texts)
+        ordered = [texts[i] for i in order]
+
+        if self.use_pool(len(texts)):
+            emb = self._encode_pool(ordered)
+        else:
+            emb = self.model.encode(ordered, batch_size=self.batch_size)
+
+        emb = np.asarray(emb, dtype=np.float32)
+        out = np.empty_like(emb)
+        out[order] = emb
+
+        self.encoded += len(texts)
+        self.seconds += time.perf_counter() - t0
+        return out
+
+    def _encode_pool(self, texts: list[str]) -> np.ndarray:
+        if self._pool is None:
+            # Each process gets its share of the cores for torch's own threads;
+            # the workers inherit the variable, this process keeps its own.
+            threads = str(max(1, (os.cpu_count() or 1) // self.workers))
+            with env_override("OMP_NUM_THREADS", threads):
+                self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.workers)
+
+        # Texts are already length-sorted, so each chunk sent to a worker is
+        # homogeneous; chunk_size keeps all workers busy until the end.
+        chunk_size = max(self.batch_size, len(texts) // (self.workers * 4))
+        if "pool" in inspect.signature(self.model.encode).parameters:
+            return self.model.encode(texts, pool=self._pool, batch_size=self.batch_size, chunk_size=chunk_size)
+        return self.model.encode_multi_process(texts, self._pool, batch_size=self.batch_size, chunk_size=chunk_size)
+
+    def rate(self) -> float:
+        return self.encoded / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return f"{self.encoded} chunkia, {self.seconds:.1f} s ({self.rate():.1f} chunkia/s, {self.workers} prosessia)"
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+from datetime import date
 
 PATTERN_TOTAL_COST = re.compile(
     r"paljonko\s+(?P<target>.+?)\s+on\s+maksanut\s+yhteensä",
@@ -35,4 +36,84 @@ def parse_yes_no_question(text: str) -> str | None:
     if not m:
         return None
 
-    return m.group("target").strip().lower()
\ No newline at end of file
+    return m.group("target").strip().lower()
+
+# Inessive month names: "maaliskuussa" -> 3.
+MONTHS = {
+    f"{stem}kuussa": i
+    for i, stem in enumerate(
+        ["tammi", "helmi", "maalis", "huhti", "touko", "kesä",
+         "heinä", "elo", "syys", "loka", "marras", "joulu"],
+        start=1,
+    )
+}
+
+PATTERN_PERIOD_COST = re.compile(
+    r"paljonko\s+(?:rahaa\s+)?(?:kului|meni|maksoi|maksoivat)\b(?P<period>.*)",
+    re.IGNORECASE
+)
+
+PATTERN_PERIOD_LIST = re.compile(
+    r"mitä\s+(?:osia\s+)?(?:vaihdettiin|ostettiin|huollettiin)\b(?P<period>.*)",
+    re.IGNORECASE
+)
+
+# The whole period phrase, nothing else: a leftover part name ("jarrupalat
+# vuonna 2024") or unit ("2000 km jälkeen") means another kind of question.
+PATTERN_MONTH = re.compile(
+    r"(?P<month>" + "|".join(MONTHS) + r")(?:\s+(?P<year>(?:19|20)\d{2}))?",
+    re.IGNORECASE
+)
+
+PATTERN_YEAR = re.compile(
+    r"(?:(?:vuonna|vuoden)\s+)?(?P<year>(?:19|20)\d{2})",
+    re.IGNORECASE
+)
+
+PATTERN_RELATIVE_YEAR = re.compile(r"(?P<which>viime|tänä)\s+vuonna", re.IGNORECASE)
+
+# Words allowed around the period phrase.
+PERIOD_FILLER = re.compile(r"\b(?:yhteensä|aikana)\b|[?.!,]", re.IGNORECASE)
+
+def parse_period(text: str, today: date | None = None) -> tuple[date, date, str] | None:
+    """
+    Time range when text is only a period: (start, end exclusive, label),
+    e.g. "maaliskuussa 2024", "vuonna 2024", "2024", "tänä vuonna",
+    "viime vuonna". A month without a year is its latest occurrence up to
+    today. Anything else left in text returns None.
+    """
+    today = today or date.today()
+    t = " ".join(PERIOD_FILLER.sub(" ", text.lower()).split())
+
+    m = PATTERN_MONTH.fullmatch(t)
+    if m:
+        month = MONTHS[m.group("month").lower()]
+        if m.group("year"):
+            year = int(m.group("year"))
+        else:
+            year = today.year if month <= today.month else today.year - 1
+        start = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1)
+        return start, end, f"{m.group('month').lower()} {year}"
+
+    m = PATTERN_RELATIVE_YEAR.fullmatch(t)
+    if m:
+        year = today.year - 1 if m.group("which").lower() == "viime" else today.year
+    else:
+        m = PATTERN_YEAR.fullmatch(t)
+        if not m:
+            return None
+        year = int(m.group("year"))
+    return date(year, 1, 1), date(year + 1, 1, 1), f"vuonna {year}"
+
+def parse_period_cost_question(text: str, today: date | None = None) -> tuple[date, date, str] | None:
+    m = PATTERN_PERIOD_COST.search(text.strip())
+    if not m:
+        return None
+    return parse_period(m.group("period"), today)
+
+def parse_period_list_question(text: str, today: date | None = None) -> tuple[date, date, str] | None:
+    m = PATTERN_PERIOD_LIST.search(text.strip())
+    if not m:
+        return None
+    return parse_period(m.group("period"), today)
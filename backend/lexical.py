@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+
+# Word tokens for the FTS5 MATCH expression; keeps part numbers like "KA24DE" whole.
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_available(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunks_fts'"
+    ).fetchone()
+    return row is not None
+
+
+def fts_match_query(text: str) -> str | None:
+    """
+    Turn free text into a safe FTS5 query: every token quoted, OR-ed so
+    BM25 ranks chunks that contain more of the terms higher.
+    """
+    toks = list(dict.fromkeys(t.lower() for t in TOKEN_RE.findall(text or "")))
+    if not toks:
+        return None
+    return " OR ".join(f'"{t}"' for t in toks)
+
+
+def lexical_search(
+    conn: sqlite3.Connection,
+    query: str,
+    k: int = 5,
+    sources: list[str] | None = None,
+) -> list[tuple[int, str, str, str, float]]:
+    """
+    BM25 search over chunks_fts.
+    returns: (chunk_id, source, ref, text, score) best first; score = -bm25,
+    so larger is better like the cosine scores elsewhere.
+    """
+    match = fts_match_query(query)
+    if match is None or not fts_available(conn):
+        return []
+    if sources is not None and not sources:
+        return []
+
+    sql = """
+        SELECT c.id, c.source, c.ref, c.text, -bm25(chunks_fts) AS score
+        FROM chunks_fts
+        JOIN chunks c ON c.id = chunks_fts.rowid
+        WHERE chunks_fts MATCH ?
+    """
+    params: list = [match]
+    if sources is not None:
+        sql += f" AND c.source IN ({','.join('?' * len(sources))})"
+        params.extend(sources)
+    sql += " ORDER BY bm25(chunks_fts) LIMIT ?"
+    params.append(int(k))
+
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    return [(int(i), s, r, t, float(sc)) for i, s, r, t, sc in rows]
+
+
+def rrf_fuse(rankings: list[list[int]], k_rrf: int = 60) -> list[tuple[int, float]]:
+    """
+    Reciprocal-rank fusion: score(d) = sum over rankings of 1 / (k_rrf + rank).
+    rankings: lists of ids, best first. returns (id, fused score) best first.
+    """
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k_rrf + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
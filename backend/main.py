@@ -2,15 +2,30 @@ from __future__ import annotations
 
 import re
 import sqlite3
+import threading
 import numpy as np
 
-from fastapi import FastAPI
+from fastapi import BackgroundTasks, FastAPI
 from pydantic import BaseModel, Field
-from backend.parts_logic import load_parts_df
-from backend.rag import cosine_top_k
+from typing import Literal
+from backend.parts_cache import PartsCache
+from backend.parts_logic import PARTS_SOURCE, backfill_date_days, date_day, parts_documents
+from backend.chunk_index import ChunkSnapshot
+from backend.rag import normalize_rows
+from backend.reloader import SnapshotReloader
+from backend.lexical import lexical_search, rrf_fuse
+from backend.query_cache import QueryEmbeddingCache
+from backend.encoder_service import BatchingEncoder
+from backend.embed_cache import EMBED_MODEL_NAME, EmbeddingCache
+from backend.incremental import sync_source
 from backend.rules import try_rules
-from backend.store import DB_PATH, connect, init_db
+from backend.store import DB_PATH, bump_index_generation, connect, init_db
 from backend.settings import USE_OLLAMA, OLLAMA_BASE_URL, OLLAMA_MODEL, OLLAMA_TIMEOUT_SEC, MAX_CONTEXT_CHARS, MIN_SCORE
+from backend.settings import EMBED_QUANT, INDEX_RELOAD_SEC
+from backend.settings import EMBED_MODEL_PRELOAD, HYBRID_DEPTH, HYBRID_RRF_K
+from backend.settings import QUERY_CACHE_SIZE, QUERY_CACHE_TTL_SEC
+from backend.settings import ENCODER_BATCHING, ENCODER_MAX_BATCH, ENCODER_MAX_WAIT_MS, ENCODER_WORKERS
+from backend.settings import ENCODER_TIMEOUT_SEC
 from backend.ollama_process import start_ollama, stop_ollama
 from backend.prompt_builder import build_prompt
 from backend.context_formatter import format_context
@@ -24,13 +39,23 @@ from backend.ollama_client import (
 
 app = FastAPI(title="AI Project Car Helper")
 
-# Loaded once at startup to serve parts lookups without re-querying per request.
-PARTS_DF = None
+# Loaded once at startup to serve parts lookups without re-querying per request;
+# POST/DELETE /parts patch it in place.
+PARTS = PartsCache()
+# Serializes parts_text re-embedding after ledger writes.
+PARTS_SYNC_LOCK = threading.Lock()
 OLLAMA_HANDLE = None
+# Owns the chunk index snapshot; swapped in place when ingest bumps a generation.
+CHUNK_RELOADER = SnapshotReloader(interval_sec=INDEX_RELOAD_SEC)
+EMBED_MODEL_LOCK = threading.Lock()
+# Repeated questions skip the encoder (the largest per-request CPU cost without Ollama).
+QUERY_CACHE = QueryEmbeddingCache(max_size=QUERY_CACHE_SIZE, ttl_sec=QUERY_CACHE_TTL_SEC)
 
 class AskIn(BaseModel):
     question: str = Field(..., description="User question in natural language")
     top_k: int = Field(5, ge=1, le=20, description="Number of results to return")
+    sources: list[str] | None = Field(None, description="Only search these chunk sources, e.g. ['manual']")
+    mode: Literal["vector", "hybrid"] = Field("vector", description="hybrid = BM25 + vector, fused by rank")
 
 class PartIn(BaseModel):
     date: str
@@ -41,10 +66,53 @@ class PartIn(BaseModel):
 class PdfSearchIn(BaseModel):
     query: str
     top_k: int = 5
+    sources: list[str] | None = None
+    mode: Literal["vector", "lexical", "hybrid"] = "vector"
+
+class AskBatchIn(BaseModel):
+    questions: list[str] = Field(..., description="Questions answered like POST /ask, in order")
+    top_k: int = Field(5, ge=1, le=20, description="Number of results to return per question")
+    sources: list[str] | None = Field(None, description="Only search these chunk sources, e.g. ['manual']")
+    mode: Literal["vector", "hybrid"] = Field("vector", description="hybrid = BM25 + vector, fused by rank")
+
+class PdfSearchBatchIn(BaseModel):
+    queries: list[str]
+    top_k: int = 5
+    sources: list[str] | None = None
+    mode: Literal["vector", "lexical", "hybrid"] = "vector"
+
+def get_embed_model():
+    """The shared SentenceTransformer, loaded on first call."""
+    model = getattr(app.state, "embed_model", None)
+    if model is not None:
+        return model
+    with EMBED_MODEL_LOCK:
+        model = getattr(app.state, "embed_model", None)
+        if model is None:
+            print("Loading embedding model...")
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(EMBED_MODEL_NAME)
+            app.state.embed_model = model
+            print("Embedding model loaded.")
+    return model
+
+
+def model_encode(texts: list[str]) -> np.ndarray:
+    return get_embed_model().encode(texts, convert_to_numpy=True)
+
+
+# Concurrent requests share batched forward passes instead of encoding one sentence each.
+ENCODER = BatchingEncoder(
+    model_encode,
+    max_batch=ENCODER_MAX_BATCH,
+    max_wait_ms=ENCODER_MAX_WAIT_MS,
+    workers=ENCODER_WORKERS,
+    timeout_sec=ENCODER_TIMEOUT_SEC,
+)
+
 
 @app.on_event("startup")
 def on_startup() -> None:
-    global PARTS_DF
     global OLLAMA_HANDLE
     if USE_OLLAMA:
         OLLAMA_HANDLE = start_ollama(
@@ -55,53 +123,26 @@ def on_startup() -> None:
     # Initialize the local database and cache parts for rule-based matches.
     init_db()
     c = connect()
-    PARTS_DF = load_parts_df(c)
+    backfill_date_days(c)
+    PARTS.load(c)
     c.close()
 
     # Load the embedding model once so requests reuse it.
-    print("Loading embedding model...")
-    from sentence_transformers import SentenceTransformer
-    app.state.embed_model = SentenceTransformer("all-MiniLM-L6-v2")
-    print("Embedding model loaded.")
+    if EMBED_MODEL_PRELOAD:
+        get_embed_model()
+    if ENCODER_BATCHING:
+        ENCODER.start()
 
-    # Load stored chunk embeddings for RAG retrieval.
+    # Load stored chunk embeddings for RAG retrieval, then watch for re-ingests.
     print("Loading chunks from DB...")
-    with sqlite3.connect(DB_PATH) as conn:
-        try:
-            rows = conn.execute(
-                "SELECT source, ref, text, embedding FROM chunks"
-            ).fetchall()
-        except sqlite3.OperationalError:
-            rows = []
-
-    sources: list[str] = []
-    refs: list[str] = []
-    texts: list[str] = []
-    vectors: list[np.ndarray] = []
-
-    # Decode stored embeddings to numpy vectors while keeping metadata aligned.
-    for source, ref, text, emb_blob in rows:
-        vec = np.frombuffer(emb_blob, dtype=np.float32)
-        if vec.size == 0:
-            continue
-        sources.append(source)
-        refs.append(ref)
-        texts.append(text)
-        vectors.append(vec)
-
-    if vectors:
-        matrix = np.vstack(vectors)
-    else:
-        matrix = np.empty((0, 384), dtype=np.float32)
-
-    app.state.chunk_sources = sources
-    app.state.chunk_refs = refs
-    app.state.chunk_texts = texts
-    app.state.chunk_matrix = matrix
+    CHUNK_RELOADER.reload(force=True)
+    CHUNK_RELOADER.start()
+    snap = CHUNK_RELOADER.snapshot
 
     # Helpful diagnostics to confirm startup cache sizes.
-    print(f"Chunks loaded: {matrix.shape[0]}")
-    print(f"Parts rows loaded: {0 if PARTS_DF is None else len(PARTS_DF)}")
+    index_types = {s: type(p.index).__name__ for s, p in snap.partitions.items()}
+    print(f"Chunks loaded: {len(snap)} (indexes: {index_types}, EMBED_QUANT={EMBED_QUANT})")
+    print(f"Parts rows loaded: {len(PARTS)}")
     print(
         f"USE_OLLAMA={USE_OLLAMA} "
         f"OLLAMA_BASE_URL={OLLAMA_BASE_URL} "
@@ -112,16 +153,36 @@ def on_startup() -> None:
 @app.on_event("shutdown")
 def on_shutdown() -> None:
     global OLLAMA_HANDLE
+    CHUNK_RELOADER.stop()
+    ENCODER.stop()
     if OLLAMA_HANDLE is not None:
         stop_ollama(OLLAMA_HANDLE)
         OLLAMA_HANDLE = None
 
+def current_snapshot() -> ChunkSnapshot:
+    # Read once per request; a concurrent reload swaps the attribute, not the object.
+    return CHUNK_RELOADER.snapshot
+
+
 @app.get("/health")
 def health() -> dict:
-    matrix = getattr(app.state, "chunk_matrix", None)
-    n_chunks = int(matrix.shape[0]) if matrix is not None else 0
-    n_parts = 0 if PARTS_DF is None else int(len(PARTS_DF))
-    return {"ok": True, "chunks": n_chunks, "parts_rows": n_parts}
+    snap = current_snapshot()
+    n_parts = len(PARTS)
+    return {
+        "ok": True,
+        "chunks": len(snap),
+        "parts_rows": n_parts,
+        "parts_version": PARTS.version,
+        "index_generations": snap.generations,
+        "query_cache": QUERY_CACHE.stats(),
+        "encoder": ENCODER.stats(),
+    }
+
+
+@app.post("/admin/reload")
+def admin_reload(full: bool = False) -> dict:
+    """Check index generations now; full=true rebuilds every source."""
+    return CHUNK_RELOADER.reload(force=full)
 
 
 def page_from_ref(ref: str) -> int | None:
@@ -149,33 +210,33 @@ def looks_readable(t: str) -> bool:
     return True
 
 
-def build_sources(idx, scores) -> list[dict]:
+def build_sources(snap: ChunkSnapshot, idx, scores) -> list[dict]:
     sources_out: list[dict] = []
     for i, s in zip(idx, scores):
         i2 = int(i)
-        ref = app.state.chunk_refs[i2]
+        ref = snap.chunk_refs[i2]
         sources_out.append(
             {
-                "source": app.state.chunk_sources[i2],
+                "source": snap.chunk_sources[i2],
                 "ref": ref,
                 "page": page_from_ref(ref),
                 "score": float(s),
-                "snippet": app.state.chunk_texts[i2][:300].strip(),
+                "snippet": snap.chunk_texts[i2][:300].strip(),
             }
         )
     return sources_out
 
 
-def pick_answer_from_chunks(idx) -> str:
+def pick_answer_from_chunks(snap: ChunkSnapshot, idx) -> str:
     answer = ""
     for i in idx:
-        cand = clean_ocr(app.state.chunk_texts[int(i)])
+        cand = clean_ocr(snap.chunk_texts[int(i)])
         if looks_readable(cand):
             answer = cand[:600]
             break
 
     if not answer and len(idx) > 0:
-        answer = clean_ocr(app.state.chunk_texts[int(idx[0])])[:600]
+        answer = clean_ocr(snap.chunk_texts[int(idx[0])])[:600]
 
     return answer
 
@@ -194,8 +255,8 @@ def normalize_response(resp: dict, llm_mode: str) -> dict:
     out["llm_mode"] = llm_mode
     return out
 
-def fallback_payload(*, idx, sources_out: list[dict], error_code: str) -> dict:
-    fallback_answer = pick_answer_from_chunks(idx)
+def fallback_payload(*, snap: ChunkSnapshot, idx, sources_out: list[dict], error_code: str) -> dict:
+    fallback_answer = pick_answer_from_chunks(snap, idx)
     return normalize_response(
         {
             "answer": fallback_answer,
@@ -226,79 +287,221 @@ def list_parts():
         ]
     }
 
+def sync_parts_chunks() -> None:
+    """
+    Background task after a ledger write: re-embed the parts_text rows that
+    changed (one per write) and swap the rebuilt partition into the index.
+    Documents come from SQLite, not PARTS: ingest_parts.py may have replaced
+    the ledger (new ids) since the cache was loaded.
+    """
+    with PARTS_SYNC_LOCK:
+        try:
+            conn = connect()
+            try:
+                docs = parts_documents(conn.execute("SELECT id, date, part, cost, notes FROM parts"))
+                # The batching encoder embeds; unchanged rows are never re-encoded.
+                cache = EmbeddingCache(conn, load_model=lambda: ENCODER)
+                plan = sync_source(conn, PARTS_SOURCE, docs, cache)
+                if plan.changes_chunks:
+                    bump_index_generation(conn, PARTS_SOURCE)
+            finally:
+                conn.close()
+            if plan.changes_chunks:
+                CHUNK_RELOADER.reload()
+        except Exception as e:
+            # The next write (or an ingest run) retries from the ledger.
+            print(f"parts_text sync failed: {e}")
+
+
 @app.post("/parts")
-def add_part(payload: PartIn):
+def add_part(payload: PartIn, background_tasks: BackgroundTasks):
+    day = date_day(payload.date)
     with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            "INSERT INTO parts (date, part, cost, notes) VALUES (?, ?, ?, ?)",
-            (payload.date, payload.part, payload.cost, payload.notes),
+        cur = conn.execute(
+            "INSERT INTO parts (date, part, cost, notes, date_day) VALUES (?, ?, ?, ?, ?)",
+            (payload.date, payload.part, payload.cost, payload.notes, day),
         )
         conn.commit()
+        part_id = int(cur.lastrowid)
 
-    return {"ok": True}
+    PARTS.add({"id": part_id, **payload.model_dump(), "date_day": day})
+    background_tasks.add_task(sync_parts_chunks)
+    return {"ok": True, "id": part_id}
 
 
 @app.delete("/parts/{part_id}")
-def delete_part(part_id: int):
+def delete_part(part_id: int, background_tasks: BackgroundTasks):
     with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("DELETE FROM parts WHERE id = ?", (part_id,))
+        cur = conn.execute("DELETE FROM parts WHERE id = ?", (part_id,))
         conn.commit()
 
+    if cur.rowcount:
+        PARTS.remove(part_id)
+        background_tasks.add_task(sync_parts_chunks)
     return {"ok": True}
 
+def build_pdf_results(snap: ChunkSnapshot, idx, scores) -> list[dict]:
+    results = []
+    for i, s in zip(idx, scores):
+        i2 = int(i)
+        results.append({
+            "source": snap.chunk_sources[i2],
+            "ref": snap.chunk_refs[i2],
+            "page": page_from_ref(snap.chunk_refs[i2]),
+            "score": float(s),
+            "snippet": snap.chunk_texts[i2][:400].strip(),
+        })
+    return results
+
+
+def encode_queries(queries: list[str]) -> np.ndarray:
+    """Query embeddings, rows in query order; only cache misses reach the model."""
+    return QUERY_CACHE.encode(queries, ENCODER.encode)
+
+
+def retrieve(
+    snap: ChunkSnapshot,
+    queries: list[str],
+    *,
+    k: int,
+    sources: list[str] | None,
+    mode: str,
+) -> list[tuple[np.ndarray, np.ndarray, bool]]:
+    """
+    Vector or hybrid retrieval for a list of non-empty queries.
+    returns per query: (idx, scores, relevant). Scores are always cosine and
+    relevant = best cosine >= MIN_SCORE; hybrid only changes the order (RRF
+    of the vector and BM25 rankings). fts_match_query ORs every token, so a
+    BM25 hit alone says nothing about relevance.
+    """
+    q_mat = encode_queries(queries)
+
+    if mode != "hybrid":
+        out = []
+        for idx, scores in snap.search_many(q_mat, k=k, sources=sources):
+            best = float(scores[0]) if len(scores) > 0 else 0.0
+            out.append((idx, scores, best >= MIN_SCORE))
+        return out
+
+    depth = max(int(k), HYBRID_DEPTH)
+    vec_hits = snap.search_many(q_mat, k=depth, sources=sources)
+
+    out = []
+    with sqlite3.connect(DB_PATH) as conn:
+        for q, q_vec, (vec_idx, vec_scores) in zip(queries, q_mat, vec_hits):
+            # Lexical hits outside the snapshot (e.g. unembedded rows) are skipped.
+            lex_pos = [
+                snap.position_of[cid]
+                for cid, *_ in lexical_search(conn, q, k=depth, sources=sources)
+                if cid in snap.position_of
+            ]
+            fused = rrf_fuse([[int(i) for i in vec_idx], lex_pos], k_rrf=HYBRID_RRF_K)[:k]
+
+            idx = np.array([i for i, _ in fused], dtype=int)
+            known = {int(i): float(sc) for i, sc in zip(vec_idx, vec_scores)}
+            scores = cosine_scores(conn, snap, q_vec, idx, known)
+            best_cos = float(vec_scores[0]) if len(vec_scores) > 0 else 0.0
+            out.append((idx, scores, best_cos >= MIN_SCORE))
+    return out
+
+
+def cosine_scores(
+    conn: sqlite3.Connection,
+    snap: ChunkSnapshot,
+    q_vec: np.ndarray,
+    idx: np.ndarray,
+    known: dict[int, float],
+) -> np.ndarray:
+    """Cosine of q_vec with each row in idx; rows missing from `known` (BM25-only hits) are read from SQLite."""
+    missing = [int(chunk_id) for i, chunk_id in zip(idx, snap.chunk_ids[idx]) if int(i) not in known]
+    by_id: dict[int, float] = {}
+    if missing:
+        q = normalize_rows(q_vec)
+        placeholders = ",".join("?" * len(missing))
+        rows = conn.execute(f"SELECT id, embedding FROM chunks WHERE id IN ({placeholders})", missing).fetchall()
+        for chunk_id, blob in rows:
+            vec = np.frombuffer(blob, dtype=np.float32)
+            if vec.shape == q.shape:
+                by_id[int(chunk_id)] = float(normalize_rows(vec) @ q)
+    return np.array(
+        [known[int(i)] if int(i) in known else by_id.get(int(snap.chunk_ids[i]), 0.0) for i in idx],
+        dtype=np.float32,
+    )
+
+
+def lexical_pdf_results(query: str, k: int, sources: list[str] | None) -> list[dict]:
+    # Fast path: straight from SQLite FTS5, no embedding model and no snapshot.
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = lexical_search(conn, query, k=k, sources=sources)
+    return [
+        {
+            "source": source,
+            "ref": ref,
+            "page": page_from_ref(ref),
+            "score": score,
+            "snippet": text[:400].strip(),
+        }
+        for _, source, ref, text, score in rows
+    ]
+
+
 @app.post("/pdf/search")
 def pdf_search(payload: PdfSearchIn):
     q = (payload.query or "").strip()
     if not q:
         return {"results": []}
 
-    model = getattr(app.state, "embed_model", None)
-    matrix = getattr(app.state, "chunk_matrix", None)
+    if payload.mode == "lexical":
+        return {"results": lexical_pdf_results(q, payload.top_k, payload.sources)}
 
-    if model is None or matrix is None or matrix.shape[0] == 0:
+    snap = current_snapshot()
+    if snap.size(payload.sources) == 0:
         return {"results": []}
 
-    q_vec = model.encode([q], convert_to_numpy=True).astype(np.float32)[0]
-    idx, scores = cosine_top_k(q_vec, matrix, k=payload.top_k)
+    idx, scores, _ = retrieve(
+        snap, [q], k=payload.top_k, sources=payload.sources, mode=payload.mode
+    )[0]
 
-    results = []
-    for i, s in zip(idx, scores):
-        i2 = int(i)
-        results.append({
-            "source": app.state.chunk_sources[i2],
-            "ref": app.state.chunk_refs[i2],
-            "page": page_from_ref(app.state.chunk_refs[i2]),
-            "score": float(s),
-            "snippet": app.state.chunk_texts[i2][:400].strip(),
-        })
+    return {"results": build_pdf_results(snap, idx, scores)}
 
-    return {"results": results}
 
-@app.post("/ask")
-def ask(payload: AskIn) -> dict:
-    q = (payload.question or "").strip()
-    if not q:
-        return normalize_response({"answer": "", "sources": []}, llm_mode="off")
+@app.post("/pdf/search/batch")
+def pdf_search_batch(payload: PdfSearchBatchIn):
+    queries = [(q or "").strip() for q in payload.queries]
+    results: list[list[dict]] = [[] for _ in queries]
 
-    if PARTS_DF is not None:
-        rule_result = try_rules(q, PARTS_DF)
-        if rule_result is not None:
-            return normalize_response(rule_result, llm_mode="off")
+    # Empty queries keep their empty slot; the rest share one encode + matmul.
+    todo = [i for i, q in enumerate(queries) if q]
+    if not todo:
+        return {"results": results}
 
-    model = getattr(app.state, "embed_model", None)
-    matrix = getattr(app.state, "chunk_matrix", None)
+    if payload.mode == "lexical":
+        for i in todo:
+            results[i] = lexical_pdf_results(queries[i], payload.top_k, payload.sources)
+        return {"results": results}
 
-    # Guard: without cached embeddings, return empty response instead of erroring.
-    if model is None or matrix is None or matrix.shape[0] == 0:
-        return normalize_response({"answer": "", "sources": []}, llm_mode="off")
+    snap = current_snapshot()
+    if snap.size(payload.sources) == 0:
+        return {"results": results}
 
-    # Embed the query and retrieve top-k similar chunks.
-    q_vec = model.encode([q], convert_to_numpy=True).astype(np.float32)[0]
-    idx, scores = cosine_top_k(q_vec, matrix, k=payload.top_k)
-    sources_out = build_sources(idx, scores)
+    hits = retrieve(
+        snap,
+        [queries[i] for i in todo],
+        k=payload.top_k,
+        sources=payload.sources,
+        mode=payload.mode,
+    )
+    for i, (idx, scores, _) in zip(todo, hits):
+        results[i] = build_pdf_results(snap, idx, scores)
+
+    return {"results": results}
+
+
+def answer_from_hits(snap: ChunkSnapshot, q: str, idx, scores, relevant: bool) -> dict:
+    sources_out = build_sources(snap, idx, scores)
 
-    best = float(scores[0]) if len(scores) > 0 else 0.0
-    if best < MIN_SCORE:
+    if not relevant:
+        best = float(scores[0]) if len(scores) > 0 else 0.0
         return normalize_response(
             {
                 "answer": "En löydä tästä aineistosta.",
@@ -310,7 +513,7 @@ def ask(payload: AskIn) -> dict:
         )
 
     if not USE_OLLAMA:
-        answer = pick_answer_from_chunks(idx)
+        answer = pick_answer_from_chunks(snap, idx)
         return normalize_response(
             {"answer": answer, "sources": sources_out, "fallback": False},
             llm_mode="off",
@@ -318,9 +521,9 @@ def ask(payload: AskIn) -> dict:
 
     context_text = format_context(
         idx=idx,
-        chunk_sources=app.state.chunk_sources,
-        chunk_refs=app.state.chunk_refs,
-        chunk_texts=app.state.chunk_texts,
+        chunk_sources=snap.chunk_sources,
+        chunk_refs=snap.chunk_refs,
+        chunk_texts=snap.chunk_texts,
         per_chunk_char_limit=900,
         max_context_chars=MAX_CONTEXT_CHARS,
     )
@@ -338,10 +541,70 @@ def ask(payload: AskIn) -> dict:
             llm_mode="ollama",
         )
     except OllamaTimeoutError:
-        return fallback_payload(idx=idx, sources_out=sources_out, error_code="timeout")
+        return fallback_payload(snap=snap, idx=idx, sources_out=sources_out, error_code="timeout")
     except OllamaConnectionError:
-        return fallback_payload(idx=idx, sources_out=sources_out, error_code="connection")
+        return fallback_payload(snap=snap, idx=idx, sources_out=sources_out, error_code="connection")
     except OllamaBadResponseError:
-        return fallback_payload(idx=idx, sources_out=sources_out, error_code="bad_response")
+        return fallback_payload(snap=snap, idx=idx, sources_out=sources_out, error_code="bad_response")
     except OllamaError:
-        return fallback_payload(idx=idx, sources_out=sources_out, error_code="unknown")
+        return fallback_payload(snap=snap, idx=idx, sources_out=sources_out, error_code="unknown")
+
+
+def answer_without_retrieval(q: str) -> dict | None:
+    """Answers that never need the embedding model: empty input and rule hits."""
+    if not q:
+        return normalize_response({"answer": "", "sources": []}, llm_mode="off")
+
+    if PARTS.loaded:
+        rule_result = try_rules(q, PARTS.index, DB_PATH)
+        if rule_result is not None:
+            return normalize_response(rule_result, llm_mode="off")
+
+    return None
+
+
+@app.post("/ask")
+def ask(payload: AskIn) -> dict:
+    q = (payload.question or "").strip()
+    direct = answer_without_retrieval(q)
+    if direct is not None:
+        return direct
+
+    snap = current_snapshot()
+
+    # Guard: without cached embeddings, return empty response instead of erroring.
+    if snap.size(payload.sources) == 0:
+        return normalize_response({"answer": "", "sources": []}, llm_mode="off")
+
+    # Embed the query and retrieve top-k similar chunks.
+    idx, scores, relevant = retrieve(
+        snap, [q], k=payload.top_k, sources=payload.sources, mode=payload.mode
+    )[0]
+    return answer_from_hits(snap, q, idx, scores, relevant)
+
+
+@app.post("/ask/batch")
+def ask_batch(payload: AskBatchIn) -> dict:
+    questions = [(q or "").strip() for q in payload.questions]
+    answers: list[dict | None] = [answer_without_retrieval(q) for q in questions]
+
+    todo = [i for i, a in enumerate(answers) if a is None]
+    if todo:
+        snap = current_snapshot()
+
+        if snap.size(payload.sources) == 0:
+            for i in todo:
+                answers[i] = normalize_response({"answer": "", "sources": []}, llm_mode="off")
+        else:
+            # Questions that reach retrieval are encoded and scored together.
+            hits = retrieve(
+                snap,
+                [questions[i] for i in todo],
+                k=payload.top_k,
+                sources=payload.sources,
+                mode=payload.mode,
+            )
+            for i, (idx, scores, relevant) in zip(todo, hits):
+                answers[i] = answer_from_hits(snap, questions[i], idx, scores, relevant)
+
+    return {"answers": answers}
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from backend.rag import chunk_text
+
+# ATX headings ("## Title"); setext underlines are not used in notes.md.
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+SLUG_RE = re.compile(r"[^\w]+")
+# Key of the text before the first heading.
+PREAMBLE_KEY = "top"
+# Separates heading titles in a section's path.
+PATH_SEP = " > "
+
+
+@dataclass(frozen=True)
+class NoteSection:
+    key: str    # stable id: slugified heading path, e.g. "moottori/öljynvaihto"
+    title: str  # heading path for display, e.g. "Moottori > Öljynvaihto"
+    body: str
+
+    def text(self) -> str:
+        """Section text to chunk: heading path (empty for the preamble) on the first line, then the body."""
+        return f"{self.title}\n{self.body}"
+
+
+def slugify(title: str) -> str:
+    slug = SLUG_RE.sub("-", title.lower()).strip("-_")
+    return slug or "osio"
+
+
+def split_markdown_sections(text: str) -> list[NoteSection]:
+    """
+    Split markdown into sections at ATX headings (not inside fenced code).
+    A section's key is the slug path of its heading and its parents, so it
+    stays the same when other sections are edited, added or moved; repeated
+    paths get a "~2", "~3", ... suffix in order of appearance. Sections
+    without body text are dropped.
+    """
+    sections: list[NoteSection] = []
+    seen: dict[str, int] = {}
+    stack: list[tuple[int, str]] = []  # (level, title) of the open headings
+    body: list[str] = []
+    in_fence = False
+
+    def close_section() -> None:
+        content = "\n".join(body).strip()
+        body.clear()
+        if not content:
+            return
+        key = "/".join(slugify(t) for _, t in stack) or PREAMBLE_KEY
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            key = f"{key}~{seen[key]}"
+        sections.append(NoteSection(key, PATH_SEP.join(t for _, t in stack), content))
+
+    for line in text.replace("\r\n", "\n").split("\n"):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        m = None if in_fence else HEADING_RE.match(line)
+        if m is None:
+            body.append(line)
+            continue
+
+        # 1) A heading ends the current section ...
+        close_section()
+        # 2) ... and replaces open headings at the same or a deeper level.
+        level = len(m.group(1))
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, m.group(2).strip()))
+
+    close_section()
+    return sections
+
+
+def chunk_section(text: str, chunk_size: int = 500, overlap: int = 150) -> list[str]:
+    """
+    Chunk NoteSection.text(): the body is chunked and every chunk starts with
+    the heading path, so a chunk from the middle of a long section still
+    says what it is about.
+    """
+    title, _, body = text.partition("\n")
+    if not title.strip():
+        return chunk_text(body, chunk_size=chunk_size, overlap=overlap)
+    return [f"{title}\n{ch}" for ch in chunk_text(body, chunk_size=chunk_size, overlap=overlap)]
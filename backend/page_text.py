@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import re
+
+import numpy as np
+
+# A page's embedded text is used as-is when it has at least this many
+# non-space characters and a quality score at or above MIN_TEXT_QUALITY.
+MIN_TEXT_CHARS = 40
+MIN_TEXT_QUALITY = 0.6
+
+# Grayscale pixel values below this count as ink; a page with a smaller
+# share of ink pixels than BLANK_INK_RATIO is treated as blank.
+INK_LEVEL = 200
+BLANK_INK_RATIO = 0.002
+
+WORD_RE = re.compile(r"\S+")
+# Glyphs without a Unicode mapping: "(cid:123)" from some extractors, U+FFFD.
+BAD_GLYPH_RE = re.compile(r"\(cid:\d+\)|\ufffd")
+
+
+def clean_page_text(text: str) -> str:
+    """Normalize newlines and strip trailing spaces and blank edges."""
+    lines = (text or "").replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def text_quality(text: str) -> float:
+    """
+    Rough 0..1 score for an extracted text layer.
+    Product of two ratios: characters that are letters, digits or ordinary
+    punctuation, and words that contain at least one letter or digit.
+    Broken font encodings and scanned pages with a junk text layer score low.
+    """
+    cleaned = BAD_GLYPH_RE.sub("\ufffd", text or "")
+    chars = [ch for ch in cleaned if not ch.isspace()]
+    if not chars:
+        return 0.0
+
+    good_chars = sum(1 for ch in chars if ch.isalnum() or ch in ".,:;-+/()%°'\"#&*=<>!?[]")
+    words = WORD_RE.findall(cleaned)
+    good_words = sum(1 for w in words if any(ch.isalnum() for ch in w) and "\ufffd" not in w)
+
+    return (good_chars / len(chars)) * (good_words / len(words))
+
+
+def is_usable_text(text: str) -> bool:
+    """True when the text layer is good enough to skip OCR for the page."""
+    n_chars = sum(1 for ch in text or "" if not ch.isspace())
+    return n_chars >= MIN_TEXT_CHARS and text_quality(text) >= MIN_TEXT_QUALITY
+
+
+def is_blank_image(gray: np.ndarray) -> bool:
+    """
+    gray: 8-bit grayscale pixels of a (low-resolution) page render.
+    Blank when almost no pixel is dark enough to be ink.
+    """
+    if gray.size == 0:
+        return True
+    ink = np.count_nonzero(gray < INK_LEVEL)
+    return ink / gray.size < BLANK_INK_RATIO
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+import pandas as pd
+
+from backend.parts_index import PartsIndex
+from backend.parts_logic import load_parts_df, parts_frame
+
+
+class PartsCache:
+    """
+    The parts ledger in memory, kept in step with POST/DELETE /parts.
+
+    Writes patch the current DataFrame (append or drop the affected row)
+    and swap the new frame in with one assignment; requests read `df` once
+    and keep that object, like ChunkSnapshot. `index` (the rule engine's
+    token index) is built on load and updated row by row with the frame.
+    `version` counts changes.
+    """
+
+    def __init__(self):
+        self.df: pd.DataFrame = parts_frame([])
+        self.index = PartsIndex()
+        self.loaded = False
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def load(self, conn: sqlite3.Connection) -> None:
+        """Replace the cache with the full ledger (startup)."""
+        df = load_parts_df(conn)
+        index = PartsIndex.from_frame(df)
+        with self._lock:
+            self.df = df
+            self.index = index
+            self.loaded = True
+            self.version += 1
+
+    def add(self, row: dict) -> None:
+        """Append one inserted row (id, date, part, cost, notes, date_day)."""
+        new = parts_frame([row])
+        with self._lock:
+            old = self.df
+            self.df = new if old.empty else pd.concat([old, new], ignore_index=True)
+            self.index.add(int(row["id"]), row.get("part"), row.get("cost"), row.get("date"), row.get("date_day"))
+            self.version += 1
+
+    def remove(self, part_id: int) -> bool:
+        """Drop the row with this id; returns False when it was not cached."""
+        with self._lock:
+            old = self.df
+            keep = old["id"] != int(part_id)
+            if bool(keep.all()):
+                return False
+            self.df = old.loc[keep].reset_index(drop=True)
+            self.index.remove(part_id)
+            self.version += 1
+            return True
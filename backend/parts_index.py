@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from os.path import commonprefix
+
+import numpy as np
+import pandas as pd
+
+from backend.parts_logic import NO_DAY, day_numbers, day_to_iso, part_key, part_lc
+
+# Question tokens whose row sets are memoized (LRU); tokens come from users.
+TOKEN_MEMO_SIZE = 4096
+# A fuzzy match must beat the runner-up's trigram similarity by this much.
+FUZZY_MARGIN = 0.1
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in (text or "").lower().split() if t]
+
+
+def shares_stem(a: str, b: str) -> bool:
+    """True when a and b differ only after a shared first half (an inflected ending or a late typo)."""
+    return len(commonprefix([a, b])) * 2 >= min(len(a), len(b))
+
+
+def trigrams(word: str) -> set[str]:
+    """Character trigrams of a word padded like pg_trgm ("  w" ... "d ")."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PartsIndex:
+    """
+    Token index over the parts ledger for the rule engine.
+
+    Rows are stored column-wise (id, cost, date as a day number, parts_agg
+    key) and each
+    whitespace-separated word of part_lc has a sorted posting array of row
+    positions. A sorted list of every word suffix answers "which words
+    contain this token" with a bisect, so lookups keep mask_all_tokens'
+    substring ("contains") semantics without scanning the rows. A trigram ->
+    words map over the same vocabulary resolves a token with no substring
+    match (inflected form, typo) to the one most similar word with the same
+    stem, when no other word comes close. Row sets of tokens that hit are
+    memoized (LRU of TOKEN_MEMO_SIZE) until the next write. Removed rows
+    are tombstoned until the next full build.
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.costs = np.empty(0, dtype=np.float64)
+        self.date_days = np.empty(0, dtype=np.int32)
+        self.alive = np.empty(0, dtype=bool)
+        self.key_ids = np.empty(0, dtype=np.int64)
+        self.names: list[str] = []
+        self.keys: list[str] = []
+        self._key_id: dict[str, int] = {}
+        self.postings: dict[str, np.ndarray] = {}
+        self.position_of: dict[int, int] = {}
+        self._words_of: dict[int, str] = {}  # row position -> part_lc
+        self._suffixes: list[tuple[str, str]] = []  # sorted (suffix, word)
+        self._trigram_words: dict[str, set[str]] = {}
+        self._token_rows: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PartsIndex":
+        """Build from a load_parts_df frame (id, date, part, cost, date_day, part_lc)."""
+        # Stored day numbers; only rows without one fall back to parsing the text.
+        days = pd.to_numeric(df["date_day"], errors="coerce") if "date_day" in df else pd.Series(np.nan, index=df.index)
+        missing = days.isna().to_numpy()
+        day_arr = np.full(len(df), NO_DAY, dtype=np.int32)
+        day_arr[~missing] = days[~missing].to_numpy(dtype=np.int64)
+        if missing.any():
+            day_arr[missing] = day_numbers(df["date"][missing])
+
+        index = cls()
+        index._append(
+            df["id"].to_numpy(dtype=np.int64),
+            df["part"].tolist(),
+            df["part_lc"].tolist(),
+            pd.to_numeric(df["cost"], errors="coerce").to_numpy(dtype=np.float64),
+            day_arr,
+        )
+        return index
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def add(self, part_id: int, part: str, cost, date, day: int | None = None) -> None:
+        cost_f = pd.to_numeric(pd.Series([cost], dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+        days = day_numbers([date]) if day is None else np.array([day], dtype=np.int32)
+        with self._lock:
+            self._append(np.array([part_id], dtype=np.int64), [part], [part_lc(part)], cost_f, days)
+
+    def remove(self, part_id: int) -> bool:
+        with self._lock:
+            pos = self.position_of.pop(int(part_id), None)
+            if pos is None:
+                return False
+            self.alive[pos] = False
+            self._token_rows.clear()
+            for word in set(tokenize(self._words_of.pop(pos))):
+                rows = self.postings[word]
+                rows = rows[rows != pos]
+                if len(rows):
+                    self.postings[word] = rows
+                else:
+                    del self.postings[word]
+                    self._drop_suffixes(word)
+                    for tg in trigrams(word):
+                        self._trigram_words[tg].discard(word)
+            return True
+
+    def _append(
+        self,
+        ids: np.ndarray,
+        parts: list[str],
+        parts_lc: list[str],
+        costs: np.ndarray,
+        days: np.ndarray,
+    ) -> None:
+        start = len(self.ids)
+        self.names.extend(str(p or "").strip() for p in parts)
+        key_ids: list[int] = []
+        for part in parts:
+            key = part_key(part)
+            kid = self._key_id.get(key)
+            if kid is None:
+                kid = self._key_id[key] = len(self.keys)
+                self.keys.append(key)
+            key_ids.append(kid)
+        self.key_ids = np.concatenate([self.key_ids, np.asarray(key_ids, dtype=np.int64)])
+        self.ids = np.concatenate([self.ids, ids])
+        self.costs = np.concatenate([self.costs, costs])
+        self.date_days = np.concatenate([self.date_days, days])
+        self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+        self._token_rows.clear()
+
+        added: dict[str, list[int]] = {}
+        for pos, (part_id, part_lc) in enumerate(zip(ids.tolist(), parts_lc), start=start):
+            self.position_of[int(part_id)] = pos
+            self._words_of[pos] = part_lc or ""
+            for word in dict.fromkeys(tokenize(part_lc)):
+                added.setdefault(word, []).append(pos)
+
+        # New positions are larger than every stored one, so appending keeps postings sorted.
+        new_words = [w for w in added if w not in self.postings]
+        for word, positions in added.items():
+            rows = np.asarray(positions, dtype=np.int64)
+            old = self.postings.get(word)
+            self.postings[word] = rows if old is None else np.concatenate([old, rows])
+
+        for w in new_words:
+            for tg in trigrams(w):
+                self._trigram_words.setdefault(tg, set()).add(w)
+
+        if len(new_words) > 1:
+            self._suffixes.extend((w[i:], w) for w in new_words for i in range(len(w)))
+            self._suffixes.sort()
+        else:
+            for w in new_words:
+                for i in range(len(w)):
+                    insort(self._suffixes, (w[i:], w))
+
+    def _drop_suffixes(self, word: str) -> None:
+        for i in range(len(word)):
+            j = bisect_left(self._suffixes, (word[i:], word))
+            if j < len(self._suffixes) and self._suffixes[j] == (word[i:], word):
+                del self._suffixes[j]
+
+    def words_containing(self, token: str) -> set[str]:
+        """Indexed words that contain token as a substring."""
+        words: set[str] = set()
+        j = bisect_left(self._suffixes, (token,))
+        while j < len(self._suffixes) and self._suffixes[j][0].startswith(token):
+            words.add(self._suffixes[j][1])
+            j += 1
+        return words
+
+    def similar_words(self, token: str, threshold: float) -> list[tuple[str, float]]:
+        """Indexed words with trigram similarity >= threshold to token, best first."""
+        grams = trigrams(token)
+        shared: dict[str, int] = {}
+        with self._lock:
+            for tg in grams:
+                for word in self._trigram_words.get(tg, ()):
+                    shared[word] = shared.get(word, 0) + 1
+
+        scored = []
+        for word, n in shared.items():
+            score = n / (len(grams) + len(trigrams(word)) - n)
+            if score >= threshold:
+                scored.append((word, score))
+        return sorted(scored, key=lambda ws: (-ws[1], ws[0]))
+
+    def best_similar_word(self, token: str, threshold: float) -> str | None:
+        """
+        The single word token most likely means: similarity >= threshold, same
+        stem (so "öljynsuodatin" never reads as "ilmansuodatin") and at least
+        FUZZY_MARGIN ahead of the runner-up. None when ambiguous.
+        """
+        scored = [
+            (word, score)
+            for word, score in self.similar_words(token, max(0.0, threshold - FUZZY_MARGIN))
+            if shares_stem(token, word)
+        ]
+        if not scored or scored[0][1] < threshold:
+            return None
+        if len(scored) > 1 and scored[0][1] - scored[1][1] < FUZZY_MARGIN:
+            return None
+        return scored[0][0]
+
+    def match(self, target: str) -> np.ndarray:
+        """Row positions whose part_lc contains every token of target (empty target: none)."""
+        return self.resolve(target)[0]
+
+    def resolve(self, target: str, fuzzy_threshold: float = 0.0) -> tuple[np.ndarray, dict[str, str]]:
+        """
+        Like match(); with fuzzy_threshold > 0, a token that no word contains
+        matches the rows of its best_similar_word() instead.
+        returns: (row positions, {token: word it was read as})
+        """
+        tokens = tokenize(target)
+        if not tokens:
+            return np.empty(0, dtype=np.int64), {}
+
+        fuzzy: dict[str, str] = {}
+        with self._lock:
+            per_token = []
+            for tok in dict.fromkeys(tokens):
+                rows = self._rows_for_token(tok)
+                if len(rows) == 0 and fuzzy_threshold > 0:
+                    word = self.best_similar_word(tok, fuzzy_threshold)
+                    if word is not None:
+                        fuzzy[tok] = word
+                        rows = self.postings[word]
+                per_token.append(rows)
+
+        # Intersect smallest first.
+        per_token.sort(key=len)
+        hits = per_token[0]
+        for rows in per_token[1:]:
+            if len(hits) == 0:
+                break
+            hits = np.intersect1d(hits, rows, assume_unique=True)
+        return hits, fuzzy
+
+    def _rows_for_token(self, token: str) -> np.ndarray:
+        """Sorted positions of rows with a word containing token."""
+        rows = self._token_rows.get(token)
+        if rows is not None:
+            self._token_rows.move_to_end(token)
+            return rows
+
+        postings = [self.postings[w] for w in self.words_containing(token)]
+        if not postings:
+            # A miss costs one bisect; not worth a memo slot.
+            return np.empty(0, dtype=np.int64)
+        rows = postings[0] if len(postings) == 1 else np.unique(np.concatenate(postings))
+        self._token_rows[token] = rows
+        if len(self._token_rows) > TOKEN_MEMO_SIZE:
+            self._token_rows.popitem(last=False)
+        return rows
+
+    def keys_matching(self, target: str) -> list[str]:
+        """parts_agg keys of the rows that match target."""
+        return self.keys_of(self.match(target))
+
+    def keys_of(self, hits: np.ndarray) -> list[str]:
+        """parts_agg keys of these row positions."""
+        with self._lock:
+            return [self.keys[k] for k in np.unique(self.key_ids[hits])]
+
+    def stats(self, target: str) -> dict:
+        """Match count, dated count, total cost and last ISO date for target."""
+        return self.stats_of(self.match(target), target)
+
+    def stats_of(self, hits: np.ndarray, target: str) -> dict:
+        """stats() for already resolved row positions."""
+        target_lc = (target or "").strip().lower()
+        with self._lock:
+            days = self.date_days[hits]
+            total = float(np.nansum(self.costs[hits])) if len(hits) else 0.0
+        days = days[days != NO_DAY]
+        return {
+            "target": target_lc,
+            "matches": int(len(hits)),
+            "dated": int(len(days)),
+            "total_eur": total,
+            "last_date": day_to_iso(days.max()) if len(days) else None,
+        }
+
+    def in_range(self, start_day: int, end_day: int) -> list[tuple[str, int, float]]:
+        """(part, date_day, cost) of live rows with start_day <= date_day < end_day, by date."""
+        with self._lock:
+            days = self.date_days
+            pos = np.flatnonzero(self.alive & (days >= start_day) & (days < end_day))
+            pos = pos[np.argsort(days[pos], kind="stable")]
+            return [(self.names[p], int(days[p]), float(self.costs[p])) for p in pos]
+
+    # Rule lookups; same result dicts as the DataFrame versions in parts_logic.
+
+    def total_cost(self, target: str) -> dict:
+        target_lc = (target or "").strip().lower()
+        hits = self.match(target_lc)
+        with self._lock:
+            total = float(np.nansum(self.costs[hits])) if len(hits) else 0.0
+        return {"target": target_lc, "matches": int(len(hits)), "total_eur": total}
+
+    def _last_day(self, hits: np.ndarray) -> str | None:
+        with self._lock:
+            days = self.date_days[hits]
+        days = days[days != NO_DAY]
+        return day_to_iso(days.max()) if len(days) else None
+
+    def last_change_date(self, target: str) -> dict:
+        target_lc = (target or "").strip().lower()
+        hits = self.match(target_lc)
+        last_date = self._last_day(hits)
+        if last_date is None:
+            return {"target": target_lc, "date": None, "matches": 0}
+        with self._lock:
+            dated = int((self.date_days[hits] != NO_DAY).sum())
+        return {"target": target_lc, "date": last_date, "matches": dated}
+
+    def yes_no_changed(self, target: str) -> dict:
+        target_lc = (target or "").strip().lower()
+        hits = self.match(target_lc)
+        if len(hits) == 0:
+            return {"target": target_lc, "changed": False, "matches": 0, "last_date": None}
+        return {"target": target_lc, "changed": True, "matches": int(len(hits)), "last_date": self._last_day(hits)}
@@ -1,8 +1,19 @@
 from __future__ import annotations
 
 import sqlite3
+import string
+import numpy as np
 import pandas as pd
 
+PARTS_COLUMNS = ["id", "date", "part", "cost", "notes"]
+# Day-number value for a row without a parseable date (in numpy arrays).
+NO_DAY = np.iinfo(np.int32).min
+# chunks.source / ref prefix of the ledger's RAG text.
+PARTS_SOURCE = "parts_text"
+PARTS_REF = "parts.csv"
+# SQLite's lower() folds ASCII letters only (and trim() strips spaces only).
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
 
 def mask_all_tokens(series: pd.Series, target: str) -> pd.Series:
     toks = [t for t in (target or "").lower().split() if t]
@@ -24,34 +35,96 @@ def fmt_money(x) -> str:
         return ""
 
 
+def format_part_line(date, part, cost, notes) -> str:
+    """One ledger row as text for RAG; empty when the row has no part name."""
+    part_s = (part or "").strip()
+    if not part_s:
+        return ""
+    return (
+        f"Päivä: {(date or '').strip()}, "
+        f"Osa: {part_s}, "
+        f"Hinta: {fmt_money(cost)}, "
+        f"Huomio: {(notes or '').strip()}"
+    )
+
+
+def part_ref(part_id: int) -> str:
+    # One parts_text document per ledger row, so a write re-embeds only that row.
+    return f"{PARTS_REF}#id={int(part_id)}"
+
+
+def parts_documents(rows) -> dict[str, str]:
+    """(id, date, part, cost, notes) rows -> {ref: text} for the parts_text source."""
+    docs: dict[str, str] = {}
+    for part_id, date, part, cost, notes in rows:
+        line = format_part_line(date, part, cost, notes)
+        if line:
+            docs[part_ref(part_id)] = line
+    return docs
+
+
 def format_parts_text(conn: sqlite3.Connection) -> str:
     rows = conn.execute(
         "SELECT date, part, cost, notes FROM parts ORDER BY date, id"
     ).fetchall()
 
-    lines = []
-    for date, part, cost, notes in rows:
-        part_s = (part or "").strip()
-        if not part_s:
-            continue
+    lines = [format_part_line(*r) for r in rows]
+    return "\n".join(line for line in lines if line).strip()
 
-        line = (
-            f"Päivä: {(date or '').strip()}, "
-            f"Osa: {part_s}, "
-            f"Hinta: {fmt_money(cost)}, "
-            f"Huomio: {(notes or '').strip()}"
-        )
-        lines.append(line)
 
-    return "\n".join(lines).strip()
+def day_numbers(values) -> np.ndarray:
+    """
+    Dates as int32 days since 1970-01-01; NO_DAY when missing or unparseable.
+    ISO dates are read first; anything else is parsed day-first, as Finnish
+    dates are written ("1.5.2024" is 1 May).
+    """
+    series = pd.Series(list(values), dtype=object)
+    parsed = pd.to_datetime(series, errors="coerce", format="ISO8601")
+    rest = parsed.isna() & series.notna()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(series[rest], errors="coerce", format="mixed", dayfirst=True)
+    days = parsed.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    out = np.full(len(days), NO_DAY, dtype=np.int32)
+    ok = ~np.isnat(days)
+    out[ok] = days[ok].astype(np.int64)
+    return out
 
 
-def load_parts_df(conn: sqlite3.Connection) -> pd.DataFrame:
-    df = pd.read_sql_query(
-        "SELECT id, date, part, cost, notes FROM parts",
-        conn,
-    )
+def date_day(value) -> int | None:
+    """parts.date_day for a date text: days since 1970-01-01, None when unparseable."""
+    if value is None or not str(value).strip():
+        return None
+    day = int(day_numbers([str(value).strip()])[0])
+    return None if day == NO_DAY else day
+
+
+def day_to_iso(day: int) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def backfill_date_days(conn: sqlite3.Connection) -> int:
+    """Fill parts.date_day for rows written without it; returns rows updated."""
+    rows = conn.execute(
+        "SELECT id, date FROM parts WHERE date_day IS NULL AND trim(COALESCE(date, '')) <> ''"
+    ).fetchall()
+    updates = [(day, part_id) for part_id, day in ((r[0], date_day(r[1])) for r in rows) if day is not None]
+    with conn:
+        conn.executemany("UPDATE parts SET date_day = ? WHERE id = ?", updates)
+    return len(updates)
+
+
+def part_key(part) -> str:
+    """parts_agg key of a part name; mirrors lower(trim(part)) in SQLite."""
+    return str(part or "").strip(" ").translate(_ASCII_LOWER)
+
 
+def part_lc(part) -> str:
+    """Match form of a part name (same as the part_lc column)."""
+    return str(part or "").strip().lower()
+
+
+def with_part_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the derived columns the rule lookups match on."""
     df["part_lc"] = (
         df["part"]
         .fillna("")
@@ -59,10 +132,25 @@ def load_parts_df(conn: sqlite3.Connection) -> pd.DataFrame:
         .str.strip()
         .str.lower()
     )
-
     return df
 
 
+def parts_frame(rows: list[dict]) -> pd.DataFrame:
+    """DataFrame with load_parts_df's columns from row dicts (id, date, part, cost, notes, date_day)."""
+    return with_part_columns(pd.DataFrame(rows, columns=[*PARTS_COLUMNS, "date_day"]))
+
+
+def load_parts_df(conn: sqlite3.Connection) -> pd.DataFrame:
+    df = pd.read_sql_query(
+        "SELECT id, date, part, cost, notes, date_day FROM parts",
+        conn,
+    )
+    return with_part_columns(df)
+
+
+# Reference implementations of the rule lookups over a DataFrame scan;
+# PartsIndex answers the rules, and tests check it against these.
+
 def total_cost_contains(df: pd.DataFrame, target: str) -> dict:
     target_lc = (target or "").strip().lower()
     if not target_lc:
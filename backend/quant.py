@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from backend.rag import EmbeddingIndex, normalize_rows, top_k_scores
+
+QUANT_MODES = ("none", "float16", "int8")
+
+# Rows converted back to float32 at a time during the coarse scan.
+SCAN_BLOCK_ROWS = 8192
+
+
+def quantize(matrix: np.ndarray, mode: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize unit-normalized rows.
+    returns:
+        codes: (N, d) float16 or int8
+        scales: (N,) float32 multiplier per row (all ones for float16)
+    """
+    m = normalize_rows(matrix)
+    if m.ndim == 1:
+        m = m[None, :]
+
+    if mode == "float16":
+        return m.astype(np.float16), np.ones(m.shape[0], dtype=np.float32)
+
+    if mode == "int8":
+        # Symmetric per-vector scale so the largest component maps to +-127.
+        scales = np.abs(m).max(axis=1) / 127.0
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(m / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+
+    raise ValueError(f"tuntematon kvantisointi: {mode}")
+
+
+def code_dtype(mode: str) -> type:
+    if mode == "float16":
+        return np.float16
+    if mode == "int8":
+        return np.int8
+    raise ValueError(f"tuntematon kvantisointi: {mode}")
+
+
+def quantized_columns(emb: np.ndarray, mode: str) -> list[tuple[bytes | None, float | None, str | None]]:
+    """(embedding_q, embedding_scale, quant) column values for each row of emb."""
+    if mode == "none" or emb.shape[0] == 0:
+        return [(None, None, None) for _ in range(emb.shape[0])]
+
+    codes, scales = quantize(emb, mode)
+    return [(c.tobytes(), float(s), mode) for c, s in zip(codes, scales)]
+
+
+def sqlite_row_fetcher(db_path: Path, chunk_ids: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Full-precision rows for rescoring, read by primary key on demand so the
+    float32 matrix never has to live in memory.
+    """
+    def fetch(positions: np.ndarray) -> np.ndarray:
+        ids = [int(chunk_ids[int(p)]) for p in positions]
+        by_id: dict[int, np.ndarray] = {}
+        with sqlite3.connect(db_path) as conn:
+            # Stay under SQLite's bound-parameter limit.
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT id, embedding FROM chunks WHERE id IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                by_id.update({int(i): np.frombuffer(blob, dtype=np.float32) for i, blob in rows})
+        return np.vstack([by_id[i] for i in ids])
+
+    return fetch
+
+
+class QuantizedIndex(EmbeddingIndex):
+    """
+    Coarse scan over float16/int8 codes, exact rescoring of the best
+    candidates against full-precision rows from `full_rows`.
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        scales: np.ndarray,
+        full_rows: Callable[[np.ndarray], np.ndarray],
+        rescore_factor: int = 4,
+    ):
+        self.codes = codes
+        self.scales = scales.astype(np.float32)
+        self.full_rows = full_rows
+        self.rescore_factor = max(1, int(rescore_factor))
+
+    def __len__(self) -> int:
+        return int(self.codes.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self.codes.shape[1])
+
+    @property
+    def matrix(self) -> np.ndarray:
+        # Only for callers that need the dense matrix (diagnostics, rebuilds).
+        return self.codes.astype(np.float32) * self.scales[:, None]
+
+    def coarse_scores(self, q: np.ndarray) -> np.ndarray:
+        """Approximate cosine scores for all rows, converted block by block."""
+        sims = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCAN_BLOCK_ROWS):
+            block = self.codes[start:start + SCAN_BLOCK_ROWS].astype(np.float32)
+            sims[start:start + block.shape[0]] = block @ q
+        return sims * self.scales
+
+    def search(self, query_vec: np.ndarray, k: int = 5) -> tuple[np.ndarray, np.ndarray]:
+        if len(self) == 0:
+            return np.array([], dtype=int), np.array([], dtype=np.float32)
+
+        if query_vec.ndim != 1:
+            raise ValueError("query_vec pitää olla 1D, muoto (d,)")
+
+        if query_vec.shape[0] != self.dim:
+            raise ValueError("dimensiot ei täsmää")
+
+        q = normalize_rows(query_vec)
+
+        # 1) Coarse top-(k * factor) from the compact codes.
+        cand, _ = top_k_scores(self.coarse_scores(q), int(k) * self.rescore_factor)
+
+        # 2) Exact cosine on the candidates only.
+        exact = normalize_rows(self.full_rows(cand)) @ q
+        local_idx, scores = top_k_scores(exact, k)
+        return cand[local_idx].astype(int), scores
+
+    def search_many(self, query_matrix: np.ndarray, k: int = 5) -> list[tuple[np.ndarray, np.ndarray]]:
+        if query_matrix.ndim != 2:
+            raise ValueError("query_matrix pitää olla 2D, muoto (Q, d)")
+        return [self.search(q, k) for q in query_matrix]
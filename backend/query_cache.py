@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """
+    Cache key for text to embed: NFKC, lowercased, whitespace collapsed.
+    all-MiniLM-L6-v2 lowercases its input anyway, so these variants embed the same.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text or "").lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of normalized query -> float32 embedding.
+
+    max_size <= 0 disables caching; ttl_sec <= 0 means entries never expire.
+    Thread-safe: FastAPI runs the sync handlers on a threadpool.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_sec: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = int(max_size)
+        self.ttl_sec = float(ttl_sec)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, vec = entry
+            if self.ttl_sec > 0 and self.clock() - stored_at > self.ttl_sec:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vec
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        if self.max_size <= 0:
+            return
+        vec = np.array(vec, dtype=np.float32)
+        # Shared between requests, so nobody may modify it in place.
+        vec.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (self.clock(), vec)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def encode(
+        self,
+        queries: list[str],
+        encoder: Callable[[list[str]], np.ndarray],
+    ) -> np.ndarray:
+        """
+        Embeddings for queries, rows in the same order.
+        Only cache misses go to `encoder`, in one call with duplicates removed.
+        """
+        keys = [normalize_query(q) for q in queries]
+        found: dict[str, np.ndarray] = {}
+        missing: list[str] = []
+
+        # 1) Look every key up once; a repeat within the batch counts as a hit.
+        for key in dict.fromkeys(keys):
+            vec = self.get(key)
+            if vec is None:
+                missing.append(key)
+            else:
+                found[key] = vec
+
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        # 2) Encode the misses together and remember them.
+        if missing:
+            encoded = np.asarray(encoder(missing), dtype=np.float32)
+            for key, vec in zip(missing, encoded):
+                self.put(key, vec)
+                found[key] = vec
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([found[key] for key in keys])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_sec": self.ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
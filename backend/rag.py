@@ -75,6 +75,14 @@ def cosine_top_k(query_vec: np.ndarray, matrix: np.ndarray, k: int = 5)-> tuple[
     sims = m @ q  # (N,)
 
     # 5) Top-k: clamp k, select the largest scores, and order them.
+    return top_k_scores(sims, k)
+
+
+def top_k_scores(sims: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return (idx, scores) of the k largest values in a 1D score vector."""
+    if sims.size == 0:
+        return np.array([], dtype=int), np.array([], dtype=np.float32)
+
     k = max(1, min(int(k), sims.shape[0]))
     idx = np.argpartition(-sims, kth=k - 1)[:k]
     idx = idx[np.argsort(-sims[idx])]
@@ -83,6 +91,92 @@ def cosine_top_k(query_vec: np.ndarray, matrix: np.ndarray, k: int = 5)-> tuple[
     return idx.astype(int), scores.astype(np.float32)
 
 
+def top_k_rows(sims: np.ndarray, k: int) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Row-wise top_k_scores for a (Q, N) score matrix."""
+    n_rows, n_cols = sims.shape
+    if n_cols == 0:
+        empty = (np.array([], dtype=int), np.array([], dtype=np.float32))
+        return [empty for _ in range(n_rows)]
+
+    k = max(1, min(int(k), n_cols))
+    part = np.argpartition(-sims, kth=k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    idx = np.take_along_axis(part, order, axis=1)
+    scores = np.take_along_axis(part_scores, order, axis=1)
+
+    return [
+        (idx[r].astype(int), scores[r].astype(np.float32))
+        for r in range(n_rows)
+    ]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return a float32 copy of matrix with every row scaled to unit length."""
+    m = np.asarray(matrix, dtype=np.float32)
+    if m.ndim == 1:
+        return m / (np.linalg.norm(m) + 1e-12)
+    return m / (np.linalg.norm(m, axis=1, keepdims=True) + 1e-12)
+
+
+class EmbeddingIndex:
+    """
+    Chunk embeddings normalized once for repeated cosine searches.
+
+    cosine_top_k copies and re-normalizes the whole matrix per call; this
+    keeps the unit-length rows around so a query is a single dot product.
+    """
+
+    def __init__(self, matrix: np.ndarray, dim: int = 384):
+        if matrix.size == 0:
+            self.matrix = np.empty((0, dim), dtype=np.float32)
+        else:
+            if matrix.ndim != 2:
+                raise ValueError("matrix pitää olla 2D, muoto (N, d)")
+            self.matrix = normalize_rows(matrix)
+
+    def __len__(self) -> int:
+        return int(self.matrix.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1])
+
+    def search(self, query_vec: np.ndarray, k: int = 5) -> tuple[np.ndarray, np.ndarray]:
+        """Same contract as cosine_top_k, without touching the stored rows."""
+        if len(self) == 0:
+            return np.array([], dtype=int), np.array([], dtype=np.float32)
+
+        if query_vec.ndim != 1:
+            raise ValueError("query_vec pitää olla 1D, muoto (d,)")
+
+        if query_vec.shape[0] != self.dim:
+            raise ValueError("dimensiot ei täsmää")
+
+        q = normalize_rows(query_vec)
+        sims = self.matrix @ q  # (N,)
+        return top_k_scores(sims, k)
+
+    def search_many(self, query_matrix: np.ndarray, k: int = 5) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Batched search: one (Q, d) @ (d, N) product, then per-row top-k.
+        Returns one (idx, scores) pair per query row, as search() would.
+        """
+        if query_matrix.ndim != 2:
+            raise ValueError("query_matrix pitää olla 2D, muoto (Q, d)")
+
+        if len(self) == 0:
+            empty = (np.array([], dtype=int), np.array([], dtype=np.float32))
+            return [empty for _ in range(query_matrix.shape[0])]
+
+        if query_matrix.shape[1] != self.dim:
+            raise ValueError("dimensiot ei täsmää")
+
+        q = normalize_rows(query_matrix)
+        sims = q @ self.matrix.T  # (Q, N)
+        return top_k_rows(sims, k)
+
+
 @dataclass
 class Hit:
     text: str
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from backend.chunk_index import ChunkSnapshot, load_snapshot
+from backend.sidecar import SIDECAR_META_PATH
+from backend.store import DB_PATH, read_index_generations
+
+
+class SnapshotReloader:
+    """
+    Owns the live ChunkSnapshot and replaces it when ingest bumps a source's
+    generation in `index_generations`.
+
+    Requests read `snapshot` once and keep that object for their whole
+    lifetime; a reload builds a new snapshot off to the side and swaps the
+    attribute in one assignment, so in-flight requests never see a mix.
+    """
+
+    def __init__(
+        self,
+        interval_sec: int = 0,
+        db_path: Path = DB_PATH,
+        meta_path: Path = SIDECAR_META_PATH,
+    ):
+        self.interval_sec = int(interval_sec)
+        self.db_path = db_path
+        self.meta_path = meta_path
+        self.snapshot = ChunkSnapshot()
+        self.reloads = 0
+        self.last_reload_at: float | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def stored_generations(self) -> dict[str, int]:
+        with sqlite3.connect(self.db_path) as conn:
+            return read_index_generations(conn)
+
+    def is_stale(self) -> bool:
+        return self.stored_generations() != self.snapshot.generations
+
+    def reload(self, force: bool = False) -> dict:
+        """
+        Rebuild changed sources (all sources when force=True) and swap the
+        new snapshot in. Concurrent calls are serialized.
+        """
+        with self._lock:
+            if not force and self.reloads > 0 and not self.is_stale():
+                return {"reloaded": False, "generations": self.snapshot.generations}
+
+            t0 = time.perf_counter()
+            old = self.snapshot
+            new = load_snapshot(self.db_path, self.meta_path, previous=old, force=force)
+            rebuilt = [
+                s for s, part in new.partitions.items()
+                if old.partitions.get(s) is not part
+            ]
+
+            self.snapshot = new
+            self.reloads += 1
+            self.last_reload_at = time.time()
+
+            return {
+                "reloaded": True,
+                "rebuilt_sources": rebuilt,
+                "generations": new.generations,
+                "chunks": len(new),
+                "seconds": round(time.perf_counter() - t0, 3),
+            }
+
+    def start(self) -> None:
+        """Poll for new generations in a daemon thread (interval_sec > 0)."""
+        if self.interval_sec <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="chunk-index-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            try:
+                r = self.reload()
+                if r["reloaded"]:
+                    print(f"Chunk index reloaded: {r['rebuilt_sources']} ({r['chunks']} chunks)")
+            except Exception as e:
+                # Keep serving the old snapshot; the next poll retries.
+                print(f"Chunk index reload failed: {e}")
@@ -1,24 +1,100 @@
 from __future__ import annotations
+
+import math
+import sqlite3
+from datetime import date
+from pathlib import Path
+
 from backend.intent import (
     parse_total_cost_question,
     parse_last_date_question,
     parse_yes_no_question,
+    parse_period_cost_question,
+    parse_period_list_question,
 )
-from backend.parts_logic import (
-    total_cost_contains,
-    last_change_date_contains,
-    yes_no_changed_contains,
-)
+from backend.parts_index import PartsIndex
+from backend.parts_logic import day_to_iso
+from backend.settings import PARTS_FUZZY_THRESHOLD
+from backend.store import read_parts_agg, read_parts_in_range
+
+# Rows named in a "mitä vaihdettiin" answer; the rest are counted.
+MAX_LISTED = 20
+EPOCH = date(1970, 1, 1)
+
+def part_stats(
+    target: str,
+    parts: PartsIndex,
+    db_path: Path | None = None,
+    fuzzy_threshold: float = PARTS_FUZZY_THRESHOLD,
+) -> dict:
+    """
+    Count, dated count, total cost and last date of the rows matching target.
+    A token without a substring match resolves to the one unambiguous,
+    trigram-similar part word with the same stem (listed under "fuzzy").
+    With db_path, the matched rows' parts_agg keys are read in one indexed
+    lookup from the trigger-maintained table, so totals are current even
+    when another process wrote the ledger.
+    """
+    hits, fuzzy = parts.resolve(target, fuzzy_threshold)
+    keys = parts.keys_of(hits) if db_path is not None else []
+    if keys:
+        try:
+            with sqlite3.connect(db_path) as conn:
+                n, n_dated, total, last_date = read_parts_agg(conn, keys)
+            return {
+                "target": (target or "").strip().lower(),
+                "matches": n,
+                "dated": n_dated,
+                "total_eur": total,
+                "last_date": last_date,
+                "fuzzy": fuzzy,
+            }
+        except sqlite3.OperationalError:
+            # No parts_agg yet (init_db not run): answer from the index.
+            pass
+    return {**parts.stats_of(hits, target), "fuzzy": fuzzy}
 
-def try_rules(question: str, parts_df) -> dict | None:
+def fuzzy_note(r: dict) -> str:
+    """Tells which part names a fuzzy target was read as."""
+    words = list(r.get("fuzzy", {}).values())
+    return f" (tulkittu: {', '.join(words)})" if words else ""
+
+def parts_in_period(
+    start: date,
+    end: date,
+    parts: PartsIndex,
+    db_path: Path | None = None,
+) -> list[tuple[str, int, float]]:
+    """
+    (part, date_day, cost) of rows dated in [start, end), by date: an index
+    range scan on parts.date_day with db_path, else the in-memory day array.
+    """
+    start_day, end_day = (start - EPOCH).days, (end - EPOCH).days
+    if db_path is not None:
+        try:
+            with sqlite3.connect(db_path) as conn:
+                rows = read_parts_in_range(conn, start_day, end_day)
+            return [(str(part or "").strip(), int(day), float(cost or 0.0)) for _, part, day, cost in rows]
+        except sqlite3.OperationalError:
+            # Database without date_day yet (init_db not run).
+            pass
+    return parts.in_range(start_day, end_day)
+
+def try_rules(
+    question: str,
+    parts: PartsIndex,
+    db_path: Path | None = None,
+    fuzzy_threshold: float = PARTS_FUZZY_THRESHOLD,
+) -> dict | None:
+    """Deterministic answers for parts questions (token index, parts_agg totals)."""
     q = question.strip()
 
     # 1) Paljonko X on maksanut yhteensä
     target = parse_total_cost_question(q)
     if target:
-        r = total_cost_contains(parts_df, target)
+        r = part_stats(target, parts, db_path, fuzzy_threshold)
         return {
-            "answer": f"{r['total_eur']:.2f} € ({r['matches']} osumaa)",
+            "answer": f"{r['total_eur']:.2f} € ({r['matches']} osumaa){fuzzy_note(r)}",
             "sources": [],
             "type": "parts_cost",
         }
@@ -26,9 +102,9 @@ def try_rules(question: str, parts_df) -> dict | None:
     # 2) Milloin viimeksi X vaihdettiin
     target = parse_last_date_question(q)
     if target:
-        r = last_change_date_contains(parts_df, target)
-        if r["date"]:
-            answer = f"Viimeksi vaihdettu {r['date']} ({r['matches']} merkintää)."
+        r = part_stats(target, parts, db_path, fuzzy_threshold)
+        if r["last_date"]:
+            answer = f"Viimeksi vaihdettu {r['last_date']} ({r['dated']} merkintää){fuzzy_note(r)}."
         else:
             answer = f"Ei päivämäärätietoa osalle '{target}'."
         return {
@@ -40,12 +116,12 @@ def try_rules(question: str, parts_df) -> dict | None:
     # 3) Onko X vaihdettu
     target = parse_yes_no_question(q)
     if target:
-        r = yes_no_changed_contains(parts_df, target)
-        if r["changed"]:
+        r = part_stats(target, parts, db_path, fuzzy_threshold)
+        if r["matches"]:
             if r["last_date"]:
-                answer = f"Kyllä. Viimeksi vaihdettu {r['last_date']} ({r['matches']} merkintää)."
+                answer = f"Kyllä. Viimeksi vaihdettu {r['last_date']} ({r['matches']} merkintää){fuzzy_note(r)}."
             else:
-                answer = f"Kyllä. Vaihdettu {r['matches']} kertaa."
+                answer = f"Kyllä. Vaihdettu {r['matches']} kertaa{fuzzy_note(r)}."
         else:
             answer = f"Ei. Osaa '{target}' ei ole vaihdettu."
         return {
@@ -54,4 +130,33 @@ def try_rules(question: str, parts_df) -> dict | None:
             "type": "parts_yes_no",
         }
 
-    return None
\ No newline at end of file
+    # 4) Paljonko kului <aikavälillä>
+    period = parse_period_cost_question(q)
+    if period:
+        start, end, label = period
+        rows = parts_in_period(start, end, parts, db_path)
+        total = sum(cost for _, _, cost in rows if not math.isnan(cost))
+        return {
+            "answer": f"{label[0].upper()}{label[1:]} kului {total:.2f} € ({len(rows)} merkintää).",
+            "sources": [],
+            "type": "parts_period_cost",
+        }
+
+    # 5) Mitä vaihdettiin <aikavälillä>
+    period = parse_period_list_question(q)
+    if period:
+        start, end, label = period
+        rows = parts_in_period(start, end, parts, db_path)
+        if rows:
+            listed = ", ".join(f"{part} ({day_to_iso(day)})" for part, day, _ in rows[:MAX_LISTED])
+            more = f" ja {len(rows) - MAX_LISTED} muuta" if len(rows) > MAX_LISTED else ""
+            answer = f"{label[0].upper()}{label[1:]} vaihdettiin: {listed}{more}."
+        else:
+            answer = f"Ei merkintöjä ({label})."
+        return {
+            "answer": answer,
+            "sources": [],
+            "type": "parts_period_list",
+        }
+
+    return None
@@ -47,4 +47,49 @@ OLLAMA_BASE_URL = env_str("OLLAMA_BASE_URL", default="http://127.0.0.1:11434")
 OLLAMA_MODEL = env_str("OLLAMA_MODEL", default="llama3.1:8b")
 OLLAMA_TIMEOUT_SEC = env_int("OLLAMA_TIMEOUT_SEC", default=30, min_value=1, max_value=600)
 MAX_CONTEXT_CHARS = env_int("MAX_CONTEXT_CHARS", default=6000, min_value=500, max_value=50000)
-MIN_SCORE = env_float("MIN_SCORE", default=0.28, min_value=0.0, max_value=1.0)
\ No newline at end of file
+MIN_SCORE = env_float("MIN_SCORE", default=0.28, min_value=0.0, max_value=1.0)
+# Approximate nearest-neighbour (IVF) search. Corpora below ANN_MIN_ROWS use exact search.
+ANN_ENABLED = env_bool("ANN_ENABLED", default=True)
+ANN_MIN_ROWS = env_int("ANN_MIN_ROWS", default=20000, min_value=1)
+ANN_NLIST = env_int("ANN_NLIST", default=0, min_value=0)  # 0 = about 4 * sqrt(N)
+ANN_NPROBE = env_int("ANN_NPROBE", default=8, min_value=1, max_value=65536)
+
+# Compact in-memory embeddings: none | float16 | int8. Candidates are rescored in float32.
+EMBED_QUANT = env_str("EMBED_QUANT", default="none").lower()
+if EMBED_QUANT not in ("none", "float16", "int8"):
+    EMBED_QUANT = "none"
+RESCORE_FACTOR = env_int("RESCORE_FACTOR", default=4, min_value=1, max_value=100)
+
+# Memory-mapped embeddings sidecar written by ingest (db/embeddings_*.npy).
+EMBED_SIDECAR = env_bool("EMBED_SIDECAR", default=True)
+SIDECAR_BLOCK_ROWS = env_int("SIDECAR_BLOCK_ROWS", default=65536, min_value=1024)
+
+# Seconds between index_generations polls for hot reload (0 = only POST /admin/reload).
+INDEX_RELOAD_SEC = env_int("INDEX_RELOAD_SEC", default=10, min_value=0, max_value=86400)
+
+# Hybrid (BM25 + vector) retrieval: reciprocal-rank fusion constant and candidates per ranker.
+HYBRID_RRF_K = env_int("HYBRID_RRF_K", default=60, min_value=1, max_value=1000)
+HYBRID_DEPTH = env_int("HYBRID_DEPTH", default=50, min_value=1, max_value=1000)
+# 0 = load the embedding model on first vector search (lexical-only setups never load it).
+EMBED_MODEL_PRELOAD = env_bool("EMBED_MODEL_PRELOAD", default=True)
+
+# LRU of normalized question -> query embedding (0 entries = off, TTL 0 = never expires).
+QUERY_CACHE_SIZE = env_int("QUERY_CACHE_SIZE", default=1024, min_value=0, max_value=1_000_000)
+QUERY_CACHE_TTL_SEC = env_int("QUERY_CACHE_TTL_SEC", default=3600, min_value=0)
+
+# Micro-batching of query encodes: flush after ENCODER_MAX_BATCH texts or ENCODER_MAX_WAIT_MS.
+ENCODER_BATCHING = env_bool("ENCODER_BATCHING", default=True)
+ENCODER_MAX_BATCH = env_int("ENCODER_MAX_BATCH", default=32, min_value=1, max_value=1024)
+ENCODER_MAX_WAIT_MS = env_int("ENCODER_MAX_WAIT_MS", default=5, min_value=0, max_value=1000)
+ENCODER_WORKERS = env_int("ENCODER_WORKERS", default=1, min_value=1, max_value=16)
+# Longest a request waits for its query embedding before failing.
+ENCODER_TIMEOUT_SEC = env_float("ENCODER_TIMEOUT_SEC", default=30.0, min_value=1.0, max_value=600.0)
+
+# Ingest embedding: processes in the sentence-transformers pool (0 = all cores) and batch size.
+INGEST_EMBED_WORKERS = env_int("INGEST_EMBED_WORKERS", default=0, min_value=0, max_value=256)
+INGEST_EMBED_BATCH = env_int("INGEST_EMBED_BATCH", default=64, min_value=1, max_value=4096)
+
+# Rule targets without a substring match fall back to the one part-name word with
+# the same stem and at least this trigram (Jaccard) similarity, e.g. "jarrupaloja"
+# -> "jarrupalat" (0.53); "öljynsuodatin" vs "ilmansuodatin" is 0.40 (0 = off).
+PARTS_FUZZY_THRESHOLD = env_float("PARTS_FUZZY_THRESHOLD", default=0.5, min_value=0.0, max_value=1.0)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.rag import EmbeddingIndex, normalize_rows, top_k_rows, top_k_scores
+from backend.store import DB_PATH
+
+# Contiguous, row-normalized float32 copy of chunks.embedding plus a JSON file
+# naming the current .npy and mapping each row to its chunk id. Rows are ordered
+# by (source, id) so every source is one contiguous slice of the file.
+# Each write gets a fresh .npy name, so a file that a running server still has
+# mapped is never overwritten (Windows refuses to replace mapped files).
+SIDECAR_META_PATH = DB_PATH.parent / "embeddings_meta.json"
+SIDECAR_GLOB = "embeddings_*.npy"
+
+WRITE_BATCH_ROWS = 4096
+
+
+def write_sidecar(db_path: Path = DB_PATH, meta_path: Path = SIDECAR_META_PATH) -> int:
+    """
+    Dump every embedded chunk into a new .npy sidecar. Rows are streamed from
+    SQLite into an open_memmap, so memory stays bounded for big corpora.
+    The metadata file is swapped in last, which publishes the new file.
+    returns: number of rows written
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        # 1) Size the output from the first non-empty row.
+        first = conn.execute(
+            "SELECT embedding FROM chunks WHERE length(embedding) > 0 ORDER BY id LIMIT 1"
+        ).fetchone()
+        n = conn.execute(
+            "SELECT COUNT(*) FROM chunks WHERE length(embedding) > 0"
+        ).fetchone()[0]
+        dim = np.frombuffer(first[0], dtype=np.float32).shape[0] if first else 384
+
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        path = meta_path.parent / f"embeddings_{time.time_ns()}.npy"
+        tmp_meta = meta_path.with_name(meta_path.name + ".tmp")
+
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, dim))
+        chunk_ids: list[int] = []
+
+        # 2) Stream rows in (source, id) order, normalizing batch by batch.
+        cur = conn.execute(
+            """
+            SELECT id, source, embedding FROM chunks
+            WHERE length(embedding) > 0
+            ORDER BY source, id
+            """
+        )
+        ranges: dict[str, list[int]] = {}
+        row = 0
+        while True:
+            batch = cur.fetchmany(WRITE_BATCH_ROWS)
+            if not batch:
+                break
+            vecs = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in batch])
+            out[row:row + len(batch)] = normalize_rows(vecs)
+            for offset, (chunk_id, source, _) in enumerate(batch):
+                chunk_ids.append(int(chunk_id))
+                ranges.setdefault(source, [row + offset, row + offset])[1] = row + offset + 1
+            row += len(batch)
+
+        out.flush()
+        del out
+    finally:
+        conn.close()
+
+    tmp_meta.write_text(
+        json.dumps({
+            "file": path.name,
+            "rows": n,
+            "dim": int(dim),
+            "normalized": True,
+            "chunk_ids": chunk_ids,
+            "sources": ranges,
+        }),
+        encoding="utf-8",
+    )
+
+    # 3) Publish, then drop older files nobody maps any more.
+    os.replace(tmp_meta, meta_path)
+    remove_stale_sidecars(meta_path, keep=path.name)
+    return n
+
+
+def remove_stale_sidecars(meta_path: Path = SIDECAR_META_PATH, keep: str = "") -> None:
+    for old in meta_path.parent.glob(SIDECAR_GLOB):
+        if old.name == keep:
+            continue
+        try:
+            old.unlink()
+        except OSError:
+            # Still mapped by a running server; a later write cleans it up.
+            pass
+
+
+def read_sidecar_meta(meta_path: Path = SIDECAR_META_PATH) -> dict | None:
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(meta, dict) or "chunk_ids" not in meta or "sources" not in meta:
+        return None
+    return meta
+
+
+def open_sidecar(meta: dict, meta_path: Path = SIDECAR_META_PATH) -> np.ndarray | None:
+    """Read-only memmap of the sidecar; pages are shared through the OS cache."""
+    path = meta_path.parent / str(meta.get("file", ""))
+    if not path.is_file():
+        return None
+    try:
+        mm = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if mm.ndim != 2 or mm.shape[0] != len(meta["chunk_ids"]):
+        return None
+    return mm
+
+
+def sidecar_slice(meta: dict, mm: np.ndarray, source: str, chunk_ids: list[int]) -> np.ndarray | None:
+    """View of one source's rows, if the sidecar holds exactly these chunk ids."""
+    bounds = meta["sources"].get(source)
+    if not bounds:
+        return None
+    start, end = int(bounds[0]), int(bounds[1])
+    if meta["chunk_ids"][start:end] != chunk_ids:
+        return None
+    return mm[start:end]
+
+
+class MemmapIndex(EmbeddingIndex):
+    """
+    Exact search over a memory-mapped, pre-normalized matrix.
+    Rows are scanned in blocks and merged into a running top-k, so only one
+    block is materialized at a time.
+    """
+
+    def __init__(self, matrix: np.ndarray, block_rows: int = 65536):
+        self.matrix = matrix
+        self.block_rows = max(1, int(block_rows))
+
+    def search(self, query_vec: np.ndarray, k: int = 5) -> tuple[np.ndarray, np.ndarray]:
+        if len(self) == 0:
+            return np.array([], dtype=int), np.array([], dtype=np.float32)
+
+        if query_vec.ndim != 1:
+            raise ValueError("query_vec pitää olla 1D, muoto (d,)")
+
+        if query_vec.shape[0] != self.dim:
+            raise ValueError("dimensiot ei täsmää")
+
+        q = normalize_rows(query_vec)
+        best_idx = np.array([], dtype=int)
+        best_scores = np.array([], dtype=np.float32)
+
+        for start in range(0, len(self), self.block_rows):
+            sims = np.asarray(self.matrix[start:start + self.block_rows]) @ q
+            idx, scores = top_k_scores(sims, k)
+
+            # Merge this block's winners with the running top-k.
+            cand_idx = np.concatenate([best_idx, idx + start])
+            cand_scores = np.concatenate([best_scores, scores])
+            keep, best_scores = top_k_scores(cand_scores, k)
+            best_idx = cand_idx[keep]
+
+        return best_idx.astype(int), best_scores.astype(np.float32)
+
+    def search_many(self, query_matrix: np.ndarray, k: int = 5) -> list[tuple[np.ndarray, np.ndarray]]:
+        if query_matrix.ndim != 2:
+            raise ValueError("query_matrix pitää olla 2D, muoto (Q, d)")
+
+        n_queries = query_matrix.shape[0]
+        if len(self) == 0:
+            empty = (np.array([], dtype=int), np.array([], dtype=np.float32))
+            return [empty for _ in range(n_queries)]
+
+        if query_matrix.shape[1] != self.dim:
+            raise ValueError("dimensiot ei täsmää")
+
+        q = normalize_rows(query_matrix)
+        best_idx = np.empty((n_queries, 0), dtype=int)
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+
+        for start in range(0, len(self), self.block_rows):
+            sims = q @ np.asarray(self.matrix[start:start + self.block_rows]).T  # (Q, block)
+            block_hits = top_k_rows(sims, k)
+            block_idx = np.vstack([idx + start for idx, _ in block_hits])
+            block_scores = np.vstack([scores for _, scores in block_hits])
+
+            cand_idx = np.hstack([best_idx, block_idx])
+            cand_scores = np.hstack([best_scores, block_scores])
+            merged = top_k_rows(cand_scores, k)
+            best_idx = np.vstack([np.take(cand_idx[r], keep) for r, (keep, _) in enumerate(merged)])
+            best_scores = np.vstack([scores for _, scores in merged])
+
+        return [
+            (best_idx[r].astype(int), best_scores[r].astype(np.float32))
+            for r in range(n_queries)
+        ]
@@ -17,6 +17,131 @@ def connect() -> sqlite3.Connection:
     conn.execute("PRAGMA synchronous=NORMAL;")
     return conn
 
+def ensure_column(cur: sqlite3.Cursor, table: str, column: str, decl: str) -> bool:
+    # Additive migration for databases created before the column existed.
+    cols = {row[1] for row in cur.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in cols:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        return True
+    return False
+
+def ensure_chunks_fts(cur: sqlite3.Cursor) -> None:
+    exists = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunks_fts'"
+    ).fetchone()
+    try:
+        cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+            text,
+            content='chunks',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+        """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: lexical search is simply unavailable.
+        return
+
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS chunks_fts_ai AFTER INSERT ON chunks BEGIN
+        INSERT INTO chunks_fts(rowid, text) VALUES (new.id, new.text);
+    END;
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS chunks_fts_ad AFTER DELETE ON chunks BEGIN
+        INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END;
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS chunks_fts_au AFTER UPDATE OF text ON chunks BEGIN
+        INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO chunks_fts(rowid, text) VALUES (new.id, new.text);
+    END;
+    """)
+
+    if not exists:
+        cur.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('rebuild')")
+
+# A row's day number: parts.date_day, or its ISO date for writers that did not set it.
+# (The GLOB keeps julianday() from reading bare numbers as Julian day numbers.)
+PART_DAY_SQL = (
+    "COALESCE({row}date_day, CASE WHEN {row}date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' "
+    "THEN CAST(julianday({row}date) - 2440587.5 AS INTEGER) END)"
+)
+PARTS_AGG_TRIGGERS = ("parts_agg_ai", "parts_agg_ad", "parts_agg_au")
+
+
+def parts_agg_select(row: str) -> str:
+    """SELECT computing the parts_agg row of `row`.part from `parts`."""
+    day = PART_DAY_SQL.format(row="")
+    return f"""
+        SELECT lower(trim({row}.part)), COUNT(*), COUNT({day}), COALESCE(SUM(cost), 0),
+               date(MAX({day}) * 86400, 'unixepoch')
+        FROM parts WHERE lower(trim(part)) = lower(trim({row}.part))
+        HAVING COUNT(*) > 0"""
+
+
+def ensure_parts_agg(cur: sqlite3.Cursor, rebuild: bool = False) -> None:
+    exists = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'parts_agg'"
+    ).fetchone()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS parts_agg (
+        part_key TEXT PRIMARY KEY,
+        n INTEGER NOT NULL,
+        n_dated INTEGER NOT NULL,
+        total_cost REAL NOT NULL,
+        last_date TEXT
+    ) WITHOUT ROWID;
+    """)
+    # Deletes and updates recompute the affected keys from `parts` through
+    # this index; inserts update their key in place.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_parts_key ON parts(lower(trim(part)));")
+
+    # Triggers are recreated on every init so their definition follows the schema.
+    for name in PARTS_AGG_TRIGGERS:
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+    new_day = PART_DAY_SQL.format(row="new.")
+    cur.execute(f"""
+    CREATE TRIGGER parts_agg_ai AFTER INSERT ON parts BEGIN
+        INSERT INTO parts_agg(part_key, n, n_dated, total_cost, last_date)
+        VALUES (
+            lower(trim(new.part)), 1, {new_day} IS NOT NULL,
+            COALESCE(new.cost, 0), date({new_day} * 86400, 'unixepoch')
+        )
+        ON CONFLICT(part_key) DO UPDATE SET
+            n = n + 1,
+            n_dated = n_dated + excluded.n_dated,
+            total_cost = total_cost + excluded.total_cost,
+            last_date = COALESCE(max(last_date, excluded.last_date), last_date, excluded.last_date);
+    END;
+    """)
+    for name, event, rows in (
+        ("parts_agg_ad", "DELETE", ("old",)),
+        ("parts_agg_au", "UPDATE OF part, cost, date, date_day", ("old", "new")),
+    ):
+        body = "".join(
+            f"""
+        DELETE FROM parts_agg WHERE part_key = lower(trim({row}.part));
+        INSERT INTO parts_agg(part_key, n, n_dated, total_cost, last_date){parts_agg_select(row)};"""
+            for row in rows
+        )
+        cur.execute(f"CREATE TRIGGER {name} AFTER {event} ON parts BEGIN{body}\n    END;")
+
+    if rebuild or not exists:
+        rebuild_parts_agg(cur)
+
+def rebuild_parts_agg(cur: sqlite3.Cursor) -> None:
+    """Recompute every parts_agg row from `parts` (backfill)."""
+    day = PART_DAY_SQL.format(row="")
+    cur.execute("DELETE FROM parts_agg")
+    cur.execute(f"""
+    INSERT INTO parts_agg(part_key, n, n_dated, total_cost, last_date)
+    SELECT lower(trim(part)), COUNT(*), COUNT({day}), COALESCE(SUM(cost), 0),
+           date(MAX({day}) * 86400, 'unixepoch')
+    FROM parts GROUP BY lower(trim(part))
+    """)
+
 def init_db() -> None:
     # 1) Open a connection and create a cursor to run schema setup.
     conn = connect()
@@ -52,12 +177,169 @@ def init_db() -> None:
     );
     """)
 
-    # 5) Indexes to speed up common lookups.
+    # 5) Optional compact embeddings (float16/int8 codes + per-row scale);
+    #    the float32 `embedding` column stays as the full-precision copy.
+    ensure_column(cur, "chunks", "embedding_q", "BLOB")
+    ensure_column(cur, "chunks", "embedding_scale", "REAL")
+    ensure_column(cur, "chunks", "quant", "TEXT")
+
+    #    manual_pages.method: how the page text was produced
+    #    (native = PDF text layer, ocr = Tesseract, blank = no content).
+    ensure_column(cur, "manual_pages", "method", "TEXT")
+    #    OCR provenance: hash of the source image and the engine/lang used,
+    #    so re-runs skip pages that would produce the same text.
+    ensure_column(cur, "manual_pages", "source_hash", "TEXT")
+    ensure_column(cur, "manual_pages", "ocr_settings", "TEXT")
+
+    #    parts.date_day: the date as days since 1970-01-01, set by writers
+    #    (see parts_logic.date_day) so range queries scan an index instead
+    #    of parsing the free-text date. ISO dates are backfilled here, other
+    #    formats by parts_logic.backfill_date_days().
+    added_date_day = ensure_column(cur, "parts", "date_day", "INTEGER")
+    cur.execute(f"UPDATE parts SET date_day = {PART_DAY_SQL.format(row='')} WHERE date_day IS NULL")
+
+    # 6) index_generations: bumped by ingest per chunk source so a running
+    #    server can tell which parts of its in-memory index are stale.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS index_generations (
+        source TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+
+    #    chunk_page_hashes: text hash each (source, ref) was last chunked
+    #    from, so ingest re-embeds only pages whose text changed.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS chunk_page_hashes (
+        source TEXT NOT NULL,
+        ref TEXT NOT NULL,
+        text_hash TEXT NOT NULL,
+        PRIMARY KEY (source, ref)
+    );
+    """)
+
+    #    embedding_cache: content-addressed embeddings shared by all ingest
+    #    scripts; a text is only encoded once per model.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS embedding_cache (
+        model TEXT NOT NULL,
+        text_hash TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        PRIMARY KEY (model, text_hash)
+    ) WITHOUT ROWID;
+    """)
+
+    # 7) chunks_fts: FTS5 index over chunks.text for BM25/lexical search.
+    #    Triggers keep it in sync with every insert/update/delete, so ingest
+    #    scripts need no extra step; a fresh table is filled once via 'rebuild'.
+    ensure_chunks_fts(cur)
+
+    #    parts_agg: per-part count, total cost and last date, keyed by
+    #    lower(trim(part)) and kept current by triggers on `parts`, so rule
+    #    answers are one indexed lookup from any process.
+    ensure_parts_agg(cur, rebuild=added_date_day)
+
+    # 8) Indexes to speed up common lookups.
     cur.execute("CREATE INDEX IF NOT EXISTS idx_manual_pages_page ON manual_pages(page_num)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source_ref ON chunks(source, ref);")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_parts_part ON parts(part);")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_parts_date ON parts(date);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_parts_date_day ON parts(date_day);")
+
+    # 9) Persist schema changes and close the connection.
+    conn.commit()
+    conn.close()
+
+def bump_index_generation(conn: sqlite3.Connection, source: str) -> int:
+    """Mark the chunks of `source` as changed; returns the new generation."""
+    conn.execute(
+        """
+        INSERT INTO index_generations(source, generation) VALUES(?, 1)
+        ON CONFLICT(source) DO UPDATE SET generation = generation + 1
+        """,
+        (source,),
+    )
+    conn.commit()
+    row = conn.execute(
+        "SELECT generation FROM index_generations WHERE source = ?", (source,)
+    ).fetchone()
+    return int(row[0])
 
-    # 6) Persist schema changes and close the connection.
+def read_index_generations(conn: sqlite3.Connection) -> dict[str, int]:
+    try:
+        rows = conn.execute("SELECT source, generation FROM index_generations").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {str(source): int(gen) for source, gen in rows}
+
+def upsert_manual_pages(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    """
+    Insert or replace manual pages in one transaction.
+    rows: (page_num, text, method) or
+          (page_num, text, method, source_hash, ocr_settings)
+    """
+    full_rows = [tuple(r) + (None,) * (5 - len(r)) for r in rows]
+    conn.executemany(
+        """
+        INSERT INTO manual_pages(page_num, text, method, source_hash, ocr_settings)
+        VALUES(?, ?, ?, ?, ?)
+        ON CONFLICT(page_num) DO UPDATE SET
+            text = excluded.text,
+            method = excluded.method,
+            source_hash = excluded.source_hash,
+            ocr_settings = excluded.ocr_settings
+        """,
+        full_rows,
+    )
     conn.commit()
-    conn.close()
\ No newline at end of file
+
+def read_manual_page_hashes(conn: sqlite3.Connection) -> dict[int, tuple[str | None, str | None]]:
+    """page_num -> (source_hash, ocr_settings) for every stored page."""
+    rows = conn.execute("SELECT page_num, source_hash, ocr_settings FROM manual_pages").fetchall()
+    return {int(p): (h, s) for p, h, s in rows}
+
+def read_manual_page_methods(conn: sqlite3.Connection) -> dict[int, str | None]:
+    """page_num -> method ("native", "ocr", "blank") for every stored page."""
+    rows = conn.execute("SELECT page_num, method FROM manual_pages").fetchall()
+    return {int(p): m for p, m in rows}
+
+def read_chunk_page_hashes(conn: sqlite3.Connection, source: str) -> dict[str, str]:
+    """ref -> text_hash for the pages of `source` that have been chunked."""
+    rows = conn.execute(
+        "SELECT ref, text_hash FROM chunk_page_hashes WHERE source = ?", (source,)
+    ).fetchall()
+    return {str(ref): str(h) for ref, h in rows}
+
+def read_parts_agg(conn: sqlite3.Connection, keys: list[str]) -> tuple[int, int, float, str | None]:
+    """Combined (n, n_dated, total_cost, last_date) of the given parts_agg keys."""
+    n = n_dated = 0
+    total = 0.0
+    last: str | None = None
+    # Stay under SQLite's bound-parameter limit.
+    for start in range(0, len(keys), 500):
+        batch = keys[start:start + 500]
+        row = conn.execute(
+            f"""
+            SELECT COALESCE(SUM(n), 0), COALESCE(SUM(n_dated), 0), COALESCE(SUM(total_cost), 0), MAX(last_date)
+            FROM parts_agg WHERE part_key IN ({','.join('?' * len(batch))})
+            """,
+            batch,
+        ).fetchone()
+        n += int(row[0])
+        n_dated += int(row[1])
+        total += float(row[2])
+        if row[3] is not None and (last is None or row[3] > last):
+            last = row[3]
+    return n, n_dated, total, last
+
+def read_parts_in_range(conn: sqlite3.Connection, start_day: int, end_day: int) -> list[tuple]:
+    """(id, part, date_day, cost) of rows with start_day <= date_day < end_day, by date."""
+    return conn.execute(
+        """
+        SELECT id, part, date_day, cost FROM parts
+        WHERE date_day >= ? AND date_day < ?
+        ORDER BY date_day, id
+        """,
+        (int(start_day), int(end_day)),
+    ).fetchall()
@@ -0,0 +1,104 @@
+"""Extract manual page text into the database, OCRing only where needed.
+
+For each PDF page the embedded text layer is read with PyMuPDF first. Only
+pages whose text layer is missing or unusable are rasterized and passed to
+Tesseract; pages that render blank are recorded without OCR. Every row in
+`manual_pages` gets the method that produced it (native / ocr / blank).
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from collections import Counter
+from pathlib import Path
+
+import fitz  # pymupdf
+import numpy as np
+
+from backend.page_text import clean_page_text, is_blank_image, is_usable_text
+from backend.store import connect, init_db, upsert_manual_pages
+from ingest.ingest_manual import CACHE_DIR, DEFAULT_DPI, PDF_PATH, page_png_path, render_page
+
+# Pages written to the DB per transaction.
+WRITE_BATCH = 50
+# Render scale for the blank-page check; a rough thumbnail is enough.
+BLANK_CHECK_ZOOM = 0.5
+
+
+def page_gray_pixels(page: fitz.Page, zoom: float = BLANK_CHECK_ZOOM) -> np.ndarray:
+    """Low-resolution grayscale render of a page as a (h, w) uint8 array."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    rows = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return rows[:, :pix.width]
+
+
+def ocr_page(doc: fitz.Document, page_num: int, dpi: int, lang: str) -> str:
+    """Rasterize one page into the PNG cache (if missing) and OCR it."""
+    # Imported here so text-only manuals do not need Tesseract installed.
+    from ingest.ocr_manual_pages import ocr_image
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    png = page_png_path(page_num)
+    if not png.exists():
+        render_page(doc, page_num, png, dpi / 72.0, "gray")
+    return ocr_image(png, lang=lang)
+
+
+def extract_page(doc: fitz.Document, page_num: int, dpi: int, lang: str) -> tuple[str, str]:
+    """returns: (text, method) for one 1-based page number."""
+    page = doc.load_page(page_num - 1)
+
+    # 1) Embedded text layer, if it looks like real text.
+    text = clean_page_text(page.get_text("text"))
+    if is_usable_text(text):
+        return text, "native"
+
+    # 2) Nothing to read on the page at all: skip OCR.
+    if is_blank_image(page_gray_pixels(page)):
+        return "", "blank"
+
+    # 3) Image-only or broken text layer: rasterize + OCR.
+    return ocr_page(doc, page_num, dpi, lang), "ocr"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Poimi manuaalin teksti tietokantaan (OCR vain tarvittaessa).")
+    parser.add_argument("--pdf", type=Path, default=PDF_PATH)
+    parser.add_argument("--first", type=int, default=1, help="ensimmäinen sivu")
+    parser.add_argument("--last", type=int, default=None, help="viimeinen sivu (oletus: koko PDF)")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help="OCR-renderöinnin resoluutio")
+    parser.add_argument("--lang", default="eng", help="Tesseractin kieli")
+    args = parser.parse_args()
+
+    init_db()
+    conn = connect()
+
+    t0 = time.perf_counter()
+    methods: Counter[str] = Counter()
+    pending: list[tuple[int, str, str]] = []
+
+    with fitz.open(str(args.pdf)) as doc:
+        last = doc.page_count if args.last is None else min(args.last, doc.page_count)
+        first = max(1, args.first)
+
+        for page_num in range(first, last + 1):
+            text, method = extract_page(doc, page_num, args.dpi, args.lang)
+            methods[method] += 1
+            pending.append((page_num, text, method))
+            print(f"Sivu {page_num}: {method}, {len(text)} merkkiä")
+
+            if len(pending) >= WRITE_BATCH:
+                upsert_manual_pages(conn, pending)
+                pending.clear()
+
+    if pending:
+        upsert_manual_pages(conn, pending)
+    conn.close()
+
+    summary = ", ".join(f"{m}: {n}" for m, n in sorted(methods.items()))
+    print(f"Valmis. Sivut: {sum(methods.values())} ({summary}). Aika: {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,21 @@
 """Render PDF manual pages into cached PNGs for OCR workflows.
 
-This script is intentionally small and focused: it converts specific pages
-from the service manual PDF into rasterized PNG images that can later be
-processed by OCR tooling. The output is cached to disk so repeated runs do
-not re-render pages that already exist.
+This script converts service manual pages into rasterized PNG images that
+can later be processed by OCR tooling. The output is cached to disk so
+repeated runs do not re-render pages that already exist.
+
+The whole manual is split into contiguous page ranges; each worker process
+opens the PDF once and renders its range.
 """
 
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+
 import fitz  # pymupdf
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -15,28 +24,137 @@ PDF_PATH = ROOT / "data" / "s13servicemanual.pdf"
 # Cache folder where rasterized pages are stored for OCR runs.
 CACHE_DIR = ROOT / "db" / "cache" / "pages"
 
-def render_page_png(page_num: int, zoom: float = 2.0) -> Path:
+# PDF user space is 72 units per inch, so zoom = dpi / 72.
+DEFAULT_DPI = 144
+COLORSPACES = {"rgb": fitz.csRGB, "gray": fitz.csGRAY}
+# Ranges per worker; smaller ranges give smoother progress and load balancing.
+RANGES_PER_WORKER = 4
+
+
+def page_png_path(page_num: int, cache_dir: Path = CACHE_DIR) -> Path:
+    return cache_dir / f"manual_page_{page_num}.png"
+
+
+def render_page(doc: fitz.Document, page_num: int, out_path: Path, zoom: float, colorspace: str) -> None:
+    """Render one page of an already opened document to out_path."""
+    # PyMuPDF uses 0-based indexing for page numbers.
+    page = doc.load_page(page_num - 1)
+    pix = page.get_pixmap(
+        matrix=fitz.Matrix(zoom, zoom),
+        colorspace=COLORSPACES[colorspace],
+        alpha=False,
+    )
+    # Write next to the target and rename, so an interrupted run never
+    # leaves a truncated PNG that later runs would treat as cached.
+    tmp_path = out_path.with_suffix(".png.tmp")
+    pix.save(str(tmp_path), output="png")
+    os.replace(tmp_path, out_path)
+
+
+def render_page_png(page_num: int, zoom: float = 2.0, colorspace: str = "rgb") -> Path:
     """Render a single page to PNG and return the cached file path."""
     # Ensure the cache directory exists before writing output.
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    out_path = CACHE_DIR / f"manual_page_{page_num}.png"
+    out_path = page_png_path(page_num)
     # Skip rendering if we already have a cached file.
     if out_path.exists():
         return out_path
 
-    # Open the PDF and render the page using a scaling matrix.
-    doc = fitz.open(str(PDF_PATH))
-    # PyMuPDF uses 0-based indexing for page numbers.
-    page = doc.load_page(page_num - 1)
-    mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat)
-    pix.save(str(out_path))
-    doc.close()
+    with fitz.open(str(PDF_PATH)) as doc:
+        render_page(doc, page_num, out_path, zoom, colorspace)
 
     return out_path
 
 
-# Everything below is only for quick manual testing.
+def render_range(
+    pdf_path: str,
+    cache_dir: str,
+    first: int,
+    last: int,
+    zoom: float,
+    colorspace: str,
+    force: bool,
+) -> tuple[int, int, int, int]:
+    """
+    Worker: open the PDF once and render pages first..last (inclusive).
+    returns: (first, last, rendered, skipped)
+    """
+    out_dir = Path(cache_dir)
+    rendered = 0
+    skipped = 0
+
+    with fitz.open(pdf_path) as doc:
+        for page_num in range(first, last + 1):
+            out_path = page_png_path(page_num, out_dir)
+            if out_path.exists() and not force:
+                skipped += 1
+                continue
+            render_page(doc, page_num, out_path, zoom, colorspace)
+            rendered += 1
+
+    return first, last, rendered, skipped
+
+
+def split_ranges(first: int, last: int, n_ranges: int) -> list[tuple[int, int]]:
+    """Split first..last into at most n_ranges contiguous, nearly equal ranges."""
+    n_pages = last - first + 1
+    if n_pages <= 0:
+        return []
+    n_ranges = max(1, min(n_ranges, n_pages))
+    size, extra = divmod(n_pages, n_ranges)
+
+    ranges = []
+    start = first
+    for i in range(n_ranges):
+        end = start + size + (1 if i < extra else 0) - 1
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def render_all(
+    dpi: int = DEFAULT_DPI,
+    colorspace: str = "rgb",
+    workers: int = 0,
+    first: int = 1,
+    last: int | None = None,
+    force: bool = False,
+    pdf_path: Path = PDF_PATH,
+    cache_dir: Path = CACHE_DIR,
+) -> None:
+    """Render pages first..last (default: the whole document) in a process pool."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    with fitz.open(str(pdf_path)) as doc:
+        n_pages = doc.page_count
+    last = n_pages if last is None else min(last, n_pages)
+    first = max(1, first)
+
+    workers = workers or os.cpu_count() or 1
+    ranges = split_ranges(first, last, workers * RANGES_PER_WORKER)
+    total = last - first + 1 if ranges else 0
+    zoom = dpi / 72.0
+
+    print(f"Renderöidään sivut {first}-{last} ({total} kpl), {dpi} dpi, {colorspace}, {workers} prosessia")
+
+    t0 = time.perf_counter()
+    done = rendered = skipped = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(render_range, str(pdf_path), str(cache_dir), a, b, zoom, colorspace, force)
+            for a, b in ranges
+        ]
+        for fut in as_completed(futures):
+            a, b, r, s = fut.result()
+            done += b - a + 1
+            rendered += r
+            skipped += s
+            print(f"Sivut {a}-{b} valmis ({done}/{total}, {time.perf_counter() - t0:.1f} s)")
+
+    print(f"Valmis. Renderöity: {rendered}. Välimuistista: {skipped}. Aika: {time.perf_counter() - t0:.1f} s")
+
+
+# Quick manual testing of a few known pages.
 
 def render_pages(pages: list[int]) -> None:
     """Render and print multiple pages for quick verification."""
@@ -45,13 +163,36 @@ def render_pages(pages: list[int]) -> None:
         print(f"Sivu {p} -> {out}")
 
 
-if __name__ == "__main__":
-    # Example page ranges for smoke-testing the PDF rendering.
-    pages = (
-        list(range(1, 11)) +      # start
-        list(range(200, 211)) +   # middle
-        list(range(880, 891))     # end
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Renderöi manuaalin sivut PNG-kuviksi.")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help="resoluutio (72 dpi = zoom 1.0)")
+    parser.add_argument("--colorspace", choices=sorted(COLORSPACES), default="rgb")
+    parser.add_argument("--workers", type=int, default=0, help="prosessien määrä (0 = CPU-ytimet)")
+    parser.add_argument("--first", type=int, default=1, help="ensimmäinen sivu")
+    parser.add_argument("--last", type=int, default=None, help="viimeinen sivu (oletus: koko PDF)")
+    parser.add_argument("--force", action="store_true", help="renderöi myös välimuistissa olevat sivut")
+    parser.add_argument("--sample", action="store_true", help="vain muutama testisivu alusta, keskeltä ja lopusta")
+    args = parser.parse_args()
+
+    if args.sample:
+        # Example page ranges for smoke-testing the PDF rendering.
+        pages = (
+            list(range(1, 11)) +      # start
+            list(range(200, 211)) +   # middle
+            list(range(880, 891))     # end
+        )
+        render_pages(pages)
+        return
+
+    render_all(
+        dpi=args.dpi,
+        colorspace=args.colorspace,
+        workers=args.workers,
+        first=args.first,
+        last=args.last,
+        force=args.force,
     )
 
-    # Render the sample pages and emit file paths.
-    render_pages(pages)
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
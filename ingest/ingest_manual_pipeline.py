@@ -0,0 +1,302 @@
+"""Streaming manual ingest: render -> OCR -> chunk -> embed in one command.
+
+Pages flow through bounded queues instead of PNG files and full-table
+reads:
+
+    render pool  --q_pages-->  OCR pool  --q_text-->  chunk  --q_chunks-->  embed pool
+                                                       (at the end: sync chunks)
+
+- Render workers (processes) open the PDF once each. A page with a usable
+  text layer skips OCR entirely; a blank page is recorded as such; other
+  pages are rasterized to in-memory PNG bytes.
+- OCR workers (processes) keep one engine each (see ocr_backends).
+- The main thread records each page in `manual_pages` and chunks it.
+- The embed stage (EmbedStage) is a thread with its own connection and
+  IngestEmbedder process pool. It encodes blocks of chunk texts into the
+  persistent embedding cache; blocks are sized so the pool is used.
+- At the end the manual's chunks are synced from `manual_pages` like
+  ingest_manual_to_db does: every embedding is a cache hit, and old chunks
+  are replaced in one transaction. An interrupted run leaves the previous
+  chunks searchable; rerunning it reuses the pages and embeddings already
+  stored.
+
+Queue sizes bound how many pages are in flight, so memory stays flat no
+matter how large the manual is, and OCR overlaps with embedding.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import fitz  # pymupdf
+
+from backend.embed_cache import ENCODE_BLOCK, EmbeddingCache
+from backend.incremental import sync_source
+from backend.ingest_embedder import pool_min_texts
+from backend.page_text import clean_page_text, is_blank_image, is_usable_text
+from backend.rag import chunk_text
+from backend.settings import INGEST_EMBED_BATCH, INGEST_EMBED_WORKERS
+from backend.sidecar import write_sidecar
+from backend.store import DB_PATH, bump_index_generation, connect, init_db, upsert_manual_pages
+from ingest.extract_manual_text import page_gray_pixels
+from ingest.ingest_manual import DEFAULT_DPI, PDF_PATH
+from ingest.ingest_manual_to_db import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    SOURCE,
+    fetch_manual_pages,
+    page_ref,
+)
+from ingest.ocr_backends import BACKEND_NAMES, get_backend
+
+# Pages allowed in flight per worker in each stage's queue.
+QUEUE_PER_WORKER = 2
+# Ends a stage's queue.
+_DONE = None
+# Pages recorded in manual_pages per transaction.
+PAGES_PER_COMMIT = 20
+
+# Per-process PDF handle for render workers.
+_DOC: fitz.Document | None = None
+
+
+def init_render_worker(pdf_path: str) -> None:
+    global _DOC
+    _DOC = fitz.open(pdf_path)
+
+
+def render_worker(page_num: int, zoom: float) -> tuple[int, str, str | bytes]:
+    """
+    returns: (page_num, method, payload); payload is the page text for
+    native/blank pages and grayscale PNG bytes for pages that need OCR.
+    """
+    page = _DOC.load_page(page_num - 1)
+
+    text = clean_page_text(page.get_text("text"))
+    if is_usable_text(text):
+        return page_num, "native", text
+
+    if is_blank_image(page_gray_pixels(page)):
+        return page_num, "blank", ""
+
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    return page_num, "ocr", pix.tobytes("png")
+
+
+def ocr_worker(page_num: int, png: bytes, backend: str, lang: str) -> tuple[int, str, str]:
+    return page_num, "ocr", get_backend(backend, lang).ocr_bytes(png)
+
+
+def feed_render(pool: ProcessPoolExecutor, pages: range, zoom: float, out: queue.Queue) -> None:
+    """Submit pages in order; the bounded queue throttles how far ahead rendering runs."""
+    try:
+        for page_num in pages:
+            out.put(pool.submit(render_worker, page_num, zoom))
+    finally:
+        out.put(_DONE)
+
+
+def feed_ocr(
+    pool: ProcessPoolExecutor,
+    backend: str,
+    lang: str,
+    inp: queue.Queue,
+    out: queue.Queue,
+) -> None:
+    """Pass text pages through and send rasterized pages to the OCR pool, keeping page order."""
+    try:
+        while True:
+            fut = inp.get()
+            if fut is _DONE:
+                break
+            page_num, method, payload = fut.result()
+            if method == "ocr":
+                out.put(pool.submit(ocr_worker, page_num, payload, backend, lang))
+            else:
+                done: Future = Future()
+                done.set_result((page_num, method, payload))
+                out.put(done)
+    except BaseException as e:
+        failed: Future = Future()
+        failed.set_exception(e)
+        out.put(failed)
+    finally:
+        out.put(_DONE)
+
+
+class EmbedStage:
+    """
+    Embed stage: chunk texts are put() here and encoded block by block into
+    the embedding cache on a separate thread, with its own connection and
+    IngestEmbedder process pool, so OCR keeps running while blocks embed.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = max(1, int(block_size))
+        self.error: BaseException | None = None
+        self.summary = ""
+        self._buffer: list[str] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=QUEUE_PER_WORKER)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="embed-stage", daemon=True)
+        self._thread.start()
+
+    def put(self, text: str) -> None:
+        if self.error is not None:
+            raise RuntimeError(f"Embedding epäonnistui: {self.error}")
+        self._buffer.append(text)
+        if len(self._buffer) >= self.block_size:
+            self._queue.put(self._buffer)
+            self._buffer = []
+
+    def close(self) -> None:
+        """Embed the rest and stop the thread and its pool; safe to call twice."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._buffer:
+            self._queue.put(self._buffer)
+            self._buffer = []
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self.error is not None:
+            raise RuntimeError(f"Embedding epäonnistui: {self.error}")
+
+    def _run(self) -> None:
+        conn = connect()
+        cache = EmbeddingCache(conn)
+        try:
+            while True:
+                block = self._queue.get()
+                if block is _DONE:
+                    break
+                # One encode per block; the cache must not split it below the pool size.
+                cache.encode(block, block_size=max(ENCODE_BLOCK, len(block)))
+        except BaseException as e:
+            self.error = e
+            # Keep draining so the producer is never blocked on put().
+            while self._queue.get() is not _DONE:
+                pass
+        finally:
+            self.summary = cache.summary()
+            cache.close()
+            conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manuaalin ingest yhtenä virtana: renderöinti, OCR, chunkit, embeddingit.")
+    parser.add_argument("--render-workers", type=int, default=2)
+    parser.add_argument("--ocr-workers", type=int, default=0, help="0 = CPU-ytimet")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help="OCR-renderöinnin resoluutio")
+    parser.add_argument("--lang", default="eng", help="Tesseractin kieli")
+    parser.add_argument("--backend", choices=BACKEND_NAMES, default="auto")
+    parser.add_argument("--first", type=int, default=1)
+    parser.add_argument("--last", type=int, default=None)
+    parser.add_argument("--full", action="store_true", help="rakenna kaikki chunkit uudelleen")
+    args = parser.parse_args()
+
+    init_db()
+
+    with fitz.open(str(PDF_PATH)) as doc:
+        n_pages = doc.page_count
+    last = n_pages if args.last is None else min(args.last, n_pages)
+    pages = range(max(1, args.first), last + 1)
+
+    render_workers = max(1, args.render_workers)
+    ocr_workers = args.ocr_workers or os.cpu_count() or 1
+    # One Tesseract thread per OCR process; the pool provides the parallelism.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    # Resolve "auto" once so every worker uses the same engine.
+    backend = get_backend(args.backend, args.lang).name
+
+    q_pages: queue.Queue = queue.Queue(maxsize=render_workers * QUEUE_PER_WORKER)
+    q_text: queue.Queue = queue.Queue(maxsize=ocr_workers * QUEUE_PER_WORKER)
+
+    pending_pages: list[tuple[int, str, str]] = []
+    methods: Counter[str] = Counter()
+    conn = connect()
+    # Every sync embedding is a hit after the embed stage; the model is never loaded here.
+    cache = EmbeddingCache(conn)
+    embed_workers = INGEST_EMBED_WORKERS or os.cpu_count() or 1
+    embed = EmbedStage(pool_min_texts(embed_workers, INGEST_EMBED_BATCH))
+
+    t0 = time.perf_counter()
+    try:
+        # 1) Stream pages: OCR overlaps with embedding into the cache.
+        with ProcessPoolExecutor(
+            max_workers=render_workers,
+            initializer=init_render_worker,
+            initargs=(str(PDF_PATH),),
+        ) as render_pool, ProcessPoolExecutor(max_workers=ocr_workers) as ocr_pool:
+            threading.Thread(
+                target=feed_render, args=(render_pool, pages, args.dpi / 72.0, q_pages), daemon=True
+            ).start()
+            threading.Thread(
+                target=feed_ocr, args=(ocr_pool, backend, args.lang, q_pages, q_text), daemon=True
+            ).start()
+
+            while True:
+                fut = q_text.get()
+                if fut is _DONE:
+                    break
+                page_num, method, text = fut.result()
+                methods[method] += 1
+                pending_pages.append((page_num, text, method))
+                if len(pending_pages) >= PAGES_PER_COMMIT:
+                    upsert_manual_pages(conn, pending_pages)
+                    pending_pages.clear()
+
+                for ch in chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+                    embed.put(ch)
+
+                done = sum(methods.values())
+                print(f"Sivu {page_num}: {method} ({done}/{len(pages)}, {time.perf_counter() - t0:.1f} s)")
+        if pending_pages:
+            upsert_manual_pages(conn, pending_pages)
+        embed.close()
+
+        # 2) Swap the manual's chunks in one transaction (embeddings come from the cache).
+        plan = sync_source(
+            conn,
+            SOURCE,
+            {page_ref(p): t for p, t in fetch_manual_pages()},
+            cache,
+            chunk_size=CHUNK_SIZE,
+            overlap=CHUNK_OVERLAP,
+            full=args.full,
+        )
+    finally:
+        embed.close()
+        cache.close()
+
+    seconds = time.perf_counter() - t0
+    summary = ", ".join(f"{m}: {n}" for m, n in sorted(methods.items()))
+    print(
+        f"Valmis. Sivut: {sum(methods.values())} ({summary}). "
+        f"Chunkit: {len(plan.to_insert)} uutta, {plan.kept} säilyviä, {len(plan.delete_ids)} poistettu."
+    )
+    print(f"Embedding: {embed.summary}")
+    print(f"Aika: {seconds:.1f} s ({sum(methods.values()) / max(seconds, 1e-9):.2f} sivua/s)")
+
+    if not plan.changes_chunks:
+        conn.close()
+        print("Ei muuttuneita chunkeja. Indeksi on ajan tasalla.")
+        return
+
+    rows = write_sidecar(DB_PATH)
+    print(f"Sidecar päivitetty: {rows} riviä")
+
+    # Bump last so a running server reloads only once everything is on disk.
+    gen = bump_index_generation(conn, SOURCE)
+    conn.close()
+    print(f"Index generation ({SOURCE}): {gen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
-"""Chunk OCR text, embed it, and store embeddings into the database."""
+"""Chunk OCR text, embed it, and store embeddings into the database.
+
+Incremental by default: each page's text hash is kept in
+`chunk_page_hashes`, and only pages whose text changed are re-chunked.
+Within a changed page, chunks whose text is unchanged keep their row
+(same chunk id, no re-embedding). Use --full to rebuild everything.
+"""
 
 from __future__ import annotations
 from pathlib import Path
-from typing import Iterable
-from sentence_transformers import SentenceTransformer
-from backend.store import init_db, connect
-from backend.rag import chunk_text
+from backend.store import init_db, connect, bump_index_generation
+from backend.incremental import sync_source
+from backend.embed_cache import EmbeddingCache
+from backend.sidecar import write_sidecar
 
+import argparse
 import sqlite3
-import numpy as np
 
 ROOT = Path(__file__).resolve().parents[1]
 # SQLite DB that contains OCR text and target chunks.
@@ -16,9 +22,9 @@ DB_PATH = ROOT / "db" / "app.sqlite"
 # Metadata for chunk records.
 SOURCE = "manual"
 PDF_NAME = "s13servicemanual.pdf"
-# Number of chunks to embed per batch for efficiency.
-
-BATCH_SIZE = 64
+# chunk_text parameters; part of the page hash so changing them re-chunks.
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 150
 
 def fetch_manual_pages() -> list[tuple[int, str]]:
     """Load OCR text from the manual_pages table."""
@@ -27,102 +33,73 @@ def fetch_manual_pages() -> list[tuple[int, str]]:
     c.close()
     return [(int(p), str(t)) for p, t in rows]
 
-def delete_old_manual_chunks() -> None:
-    """Remove existing manual chunks before inserting fresh ones."""
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM chunks WHERE source = ?", (SOURCE,))
-    conn.commit()
-    conn.close()
-
-def insert_chunks(rows: Iterable[tuple[str, str, str, bytes]]) -> None:
-    """Bulk insert chunk rows into the chunks table."""
-    conn = connect()
-    cur = conn.cursor()
-    cur.executemany(
-        "INSERT INTO chunks(source, ref, text, embedding) VALUES(?, ?, ?, ?)",
-        list(rows),
-    )
-    conn.commit()
-    conn.close()
+def page_ref(page_num: int) -> str:
+    # Reference string links the chunk to the PDF page.
+    return f"{PDF_NAME}#page={page_num}"
 
 def main() -> None:
-    """Main entry point: chunk, embed, and store manual text."""
+    """Main entry point: chunk, embed, and store changed manual pages."""
+    parser = argparse.ArgumentParser(description="Chunkkaa ja embeddaa manuaalin sivut (vain muuttuneet).")
+    parser.add_argument("--full", action="store_true", help="rakenna kaikki chunkit uudelleen")
+    args = parser.parse_args()
+
     init_db()
 
     if not DB_PATH.exists():
         print("DB puuttuu.")
         return
-    
+
     pages = fetch_manual_pages()
     if not pages:
         print("manual_pages on tyhjä. Aja ensin OCR.")
         return
-    
-    # Load embedding model once to reuse across batches.
     print(f"Sivuja DB:ssä {len(pages)}")
-    print("Ladataan embedding-malli...")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    print("Malli ladattu")
-    print("Poistetaan vanhat manual-chunkit...")
-    delete_old_manual_chunks()
-    print("OK.")
-
-    # Buffers hold data until we have BATCH_SIZE chunks to embed.
-    buffer_texts: list[str] = []
-    buffer_meta: list[tuple[int, str]] = []
-
-    inserted = 0
-
-    def flush() -> None:
-        """Embed buffered chunks and write them to the DB."""
-        nonlocal inserted
-        if not buffer_texts:
-            return
-        
-        # Encode text to embeddings and convert to float32 for storage.
-        emb = model.encode(buffer_texts)
-        emb = np.asarray(emb, dtype=np.float32)
-
-        rows = []
-        for (page_num, ref), text, vec in zip(buffer_meta, buffer_texts, emb):
-            rows.append((SOURCE, ref, text, vec.tobytes()))
 
-        insert_chunks(rows)
-        inserted += len(rows)
-
-        buffer_texts.clear()
-        buffer_meta.clear()
-
-    for page_num, page_text in pages:
-        # Split each page into chunks for embedding.
-        chunks = chunk_text(page_text)
-        if not chunks:
-            continue
-
-        # Reference string links the chunk to the PDF page.
-        ref = f"{PDF_NAME}#page={page_num}"
-
-        for ch in chunks:
-            buffer_texts.append(ch)
-            buffer_meta.append((page_num, ref))
-
-            # Flush whenever we reach a full batch.
-            if len(buffer_texts) >= BATCH_SIZE:
-                flush()
+    # 1) Plan, embed (model loaded only on a cache miss) and apply in one
+    # transaction: readers never see a half-updated manual.
+    conn = connect()
+    cache = EmbeddingCache(conn)
+    try:
+        plan = sync_source(
+            conn,
+            SOURCE,
+            {page_ref(p): t for p, t in pages},
+            cache,
+            chunk_size=CHUNK_SIZE,
+            overlap=CHUNK_OVERLAP,
+            full=args.full,
+        )
+    finally:
+        cache.close()
+
+    # Pages with no chunks (empty text) still record their hash, but only
+    # real chunk changes require a new sidecar and index generation.
+    if not plan.changes_chunks:
+        conn.close()
+        print("Ei muuttuneita sivuja. Embeddingit ovat ajan tasalla.")
+        return
 
-        print(f"Sivu {page_num}: {len(chunks)} chunkia")
+    for ref, n_new, n_stale in plan.changed:
+        print(f"{ref}: muuttunut, {n_new} uutta / {n_stale} poistettavaa chunkia")
+    print(
+        f"Muuttuneita sivuja {len(plan.new_hashes)}, poistuneita {len(plan.removed_refs)}. "
+        f"Uusia chunkeja {len(plan.to_insert)}, säilyviä {plan.kept}, poistettavia {len(plan.delete_ids)}."
+    )
+    if plan.to_insert:
+        print(f"Embedding: {cache.summary()}")
 
-    # Flush remaining chunks.
-    flush()
+    n = conn.execute("SELECT COUNT(*) FROM chunks WHERE source=?", (SOURCE,)).fetchone()[0]
+    print(f"Valmis. Inserted chunks: {len(plan.to_insert)}, deleted: {len(plan.delete_ids)}")
+    print(f"SELECT COUNT(*) WHERE source=manual: {n}")
 
-    print(f"Valmis. Inserted chunks: {inserted}")
+    # Refresh the memory-mapped embeddings file the server loads at startup.
+    sidecar_rows = write_sidecar(DB_PATH)
+    print(f"Sidecar päivitetty: {sidecar_rows} riviä")
 
-    # Quick verification of inserted chunk count.
-    c = sqlite3.connect(DB_PATH)
-    n = c.execute("SELECT COUNT(*) FROM chunks WHERE source=?", (SOURCE,)).fetchone()[0]
-    c.close()
-    print(f"SELECT COUNT(*) WHERE source=manual: {n}")
+    # Bump last so a running server reloads only once everything is on disk.
+    gen = bump_index_generation(conn, SOURCE)
+    conn.close()
+    print(f"Index generation ({SOURCE}): {gen}")
 
 
 if __name__ == "__main__":
@@ -1,9 +1,21 @@
-"""Chunk a notes markdown file and store placeholder embeddings."""
+"""Chunk notes.md along its markdown headings, embed it, and store the chunks.
+
+Each heading section is its own document with a stable ref
+(`notes.md#<heading-path-slug>`), synced incrementally like the manual:
+only sections whose text changed are re-chunked and re-embedded.
+--watch keeps running and syncs again whenever the file changes.
+"""
 
 from __future__ import annotations
 from pathlib import Path
-from backend.rag import chunk_text
-from backend.store import init_db, connect
+from backend.embed_cache import EmbeddingCache
+from backend.incremental import sync_source
+from backend.notes import chunk_section, split_markdown_sections
+from backend.sidecar import write_sidecar
+from backend.store import DB_PATH, init_db, connect, bump_index_generation
+
+import argparse
+import time
 
 ROOT = Path(__file__).resolve().parents[1]
 # Path to the notes file used for ingestion.
@@ -11,57 +23,114 @@ NOTES_PATH = ROOT / "data" / "notes.md"
 # Metadata for the chunk table.
 SOURCE = "notes"
 REF = "notes.md"
+# chunk_text parameters; part of the section hash so changing them re-chunks.
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 150
 
-def main() -> None:
-    """Read notes, chunk text, and upsert into the chunks table."""
-    init_db()
-
+def read_sections() -> dict[str, str]:
+    """notes.md as {ref: section text}; empty when the file is missing or empty."""
     if not NOTES_PATH.exists():
-        print("notes.md ei löydy")
-        return
-
+        return {}
     # Load the notes content with safe encoding behavior.
-    text = NOTES_PATH.read_text(encoding="utf-8", errors="replace").strip()
-    if not text:
-        print("notes.md on tyhjä")
-        return
+    text = NOTES_PATH.read_text(encoding="utf-8", errors="replace")
+    return {f"{REF}#{s.key}": s.text() for s in split_markdown_sections(text)}
 
-    # Split into RAG-friendly chunks.
-    chunks = chunk_text(text)
-    print(f"Chunkit: {len(chunks)}")
+def sync_notes(cache: EmbeddingCache, full: bool = False, republish: bool = False) -> bool:
+    """
+    Sync notes sections into chunks; returns True when it published a change.
+    republish=True refreshes the sidecar and index generation even when the
+    plan is empty: a failed attempt may have committed its chunks before
+    publishing them.
+    """
+    sections = read_sections()
+    print(f"Osioita: {len(sections)}")
 
-    if not chunks:
-        print("Ei chunkkeja. Lopetetaan.")
-        return
+    # 1) Plan, embed only new chunk texts and apply in one transaction.
+    # Removed sections (and old whole-file chunks) are deleted here too.
+    plan = sync_source(
+        cache.conn,
+        SOURCE,
+        sections,
+        cache,
+        chunk_size=CHUNK_SIZE,
+        overlap=CHUNK_OVERLAP,
+        full=full,
+        chunker=chunk_section,
+    )
+    if not plan.changes_chunks and not republish:
+        print("Ei muuttuneita osioita.")
+        return False
 
-    conn = connect()
-    cur = conn.cursor()
+    for ref, n_new, n_stale in plan.changed:
+        print(f"{ref}: muuttunut, {n_new} uutta / {n_stale} poistettavaa chunkia")
+    for ref in plan.removed_refs:
+        print(f"{ref}: poistunut")
+    print(f"Uusia chunkeja {len(plan.to_insert)}, säilyviä {plan.kept}, poistettavia {len(plan.delete_ids)}.")
 
-    # 1) Remove existing notes chunks before inserting new ones.
-    cur.execute("DELETE FROM chunks WHERE source = ?", (SOURCE,))
-    conn.commit()
+    # 2) Refresh the sidecar, then tell a running server that notes changed.
+    rows = write_sidecar(DB_PATH)
+    print(f"Sidecar päivitetty: {rows} riviä")
+    gen = bump_index_generation(cache.conn, SOURCE)
 
-    # 2) Insert the new chunks.
-    rows = []
-    for ch in chunks:
-        # Embeddings are not computed here; empty bytes placeholder.
-        rows.append((SOURCE, REF, ch, b""))  # embedding placeholder
+    n = cache.conn.execute("SELECT COUNT(*) FROM chunks WHERE source = ?", (SOURCE,)).fetchone()[0]
+    print(f"Valmis. chunks WHERE source=notes: {n}, index generation: {gen}")
+    return True
 
-    cur.executemany(
-        "INSERT INTO chunks(source, ref, text, embedding) VALUES(?, ?, ?, ?)",
-        rows,
-    )
-    conn.commit()
+def notes_mtime() -> float | None:
+    try:
+        return NOTES_PATH.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+def main() -> None:
+    """Sync notes once, or keep syncing on every change with --watch."""
+    parser = argparse.ArgumentParser(description="Chunkkaa ja embeddaa notes.md otsikoittain (vain muuttuneet osiot).")
+    parser.add_argument("--full", action="store_true", help="rakenna kaikki chunkit uudelleen")
+    parser.add_argument("--watch", action="store_true", help="seuraa tiedostoa ja synkronoi muutokset")
+    parser.add_argument("--interval", type=float, default=2.0, help="tarkistusväli sekunteina (--watch)")
+    args = parser.parse_args()
 
-    # 3) Verify insert count for sanity.
-    n = cur.execute(
-        "SELECT COUNT(*) FROM chunks WHERE source = ?",
-        (SOURCE,),
-    ).fetchone()[0]
+    init_db()
 
-    conn.close()
+    if not NOTES_PATH.exists() and not args.watch:
+        print("notes.md ei löydy")
+        return
+
+    conn = connect()
+    # One cache for the whole run: in watch mode the model stays loaded.
+    cache = EmbeddingCache(conn)
+    try:
+        if not args.watch:
+            sync_notes(cache, full=args.full)
+            return
 
-    print(f"Valmis. chunks WHERE source=notes: {n}")
+        print(f"Seurataan {NOTES_PATH} (Ctrl+C lopettaa)...")
+        last = None
+        full = args.full
+        # Set after a failed attempt, which may have left chunks unpublished.
+        pending = False
+        while True:
+            mtime = notes_mtime()
+            # A missing file (e.g. mid-save by an editor) is not a deletion.
+            if mtime is not None and mtime != last:
+                try:
+                    sync_notes(cache, full=full, republish=pending)
+                except Exception as e:
+                    # E.g. "database is locked" while the server writes: retry on the next tick.
+                    print(f"Synkronointi epäonnistui, yritetään uudelleen: {e!r}")
+                    pending = True
+                else:
+                    last = mtime
+                    full = False
+                    pending = False
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("Lopetetaan.")
+    finally:
+        if cache.hits or cache.misses:
+            print(f"Embedding: {cache.summary()}")
+        cache.close()
+        conn.close()
 
 if __name__ == "__main__":
     main()
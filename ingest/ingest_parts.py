@@ -3,6 +3,7 @@
 from __future__ import annotations
 from pathlib import Path
 from backend.store import init_db, connect
+from backend.parts_logic import NO_DAY, day_numbers
 
 import csv
 import pandas as pd
@@ -47,13 +48,21 @@ def main() -> None:
     cur.execute("DELETE FROM parts")
     conn.commit()
 
+    # date_day: the date as a day number for indexed range queries.
+    days = [None if d == NO_DAY else int(d) for d in day_numbers(df["date"])]
     rows = [
-        (row["part"], row["date"], None if pd.isna(row["cost"]) else float(row["cost"]), row["notes"])
-        for _, row in df.iterrows()
+        (
+            row["part"],
+            row["date"],
+            None if pd.isna(row["cost"]) else float(row["cost"]),
+            row["notes"],
+            day,
+        )
+        for (_, row), day in zip(df.iterrows(), days)
     ]
 
     cur.executemany(
-        "INSERT INTO parts(part, date, cost, notes) VALUES(?, ?, ?, ?)",
+        "INSERT INTO parts(part, date, cost, notes, date_day) VALUES(?, ?, ?, ?, ?)",
         rows,
     )
     conn.commit()
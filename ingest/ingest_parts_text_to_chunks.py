@@ -1,101 +1,82 @@
+"""Embed the parts ledger as RAG text, one parts_text document per row.
+
+Uses the same per-row refs (`parts.csv#id=<id>`) and incremental sync as
+the server, which keeps parts_text current after POST/DELETE /parts; this
+script is for the initial load and after a bulk ingest_parts.py import.
+"""
+
 from __future__ import annotations
-from backend.store import init_db, connect
-from backend.rag import chunk_text
+from backend.store import init_db, connect, bump_index_generation
+from backend.incremental import sync_source
+from backend.parts_logic import PARTS_SOURCE, parts_documents
+from backend.sidecar import write_sidecar
+from backend.embed_cache import EmbeddingCache
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
 
+import argparse
 import sqlite3
-import numpy as np
 
 ROOT = Path(__file__).resolve().parents[1]
 DB_PATH = ROOT / "db" / "app.sqlite"
 
-SOURCE = "parts_text"
-REF = "parts.csv"
+SOURCE = PARTS_SOURCE
 
-def fmt_money(x) -> str:
-    if x is None:
-        return ""
-    try:
-        return f"{float(x):.2f}"
-    except Exception:
-        return ""
-
-def build_parts_text() -> str:
+def fetch_parts_documents() -> dict[str, str]:
     c = sqlite3.connect(DB_PATH)
     rows = c.execute(
-        "SELECT date, part, cost, notes FROM parts ORDER BY date, id"
+        "SELECT id, date, part, cost, notes FROM parts ORDER BY date, id"
     ).fetchall()
     c.close()
-
-    lines = []
-    for date, part, cost, notes in rows:
-        part_s = (part or "").strip()
-        if not part_s:
-            continue
-
-        line = (
-            f"Päivä: {(date or '').strip()}, "
-            f"Osa: {part_s}, "
-            f"Hinta: {fmt_money(cost)}, "
-            f"Huomio: {(notes or '').strip()}"
-        )
-        lines.append(line)
-
-    return "\n".join(lines).strip()
+    return parts_documents(rows)
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Embeddaa osalistan rivit (vain muuttuneet).")
+    parser.add_argument("--full", action="store_true", help="rakenna kaikki chunkit uudelleen")
+    args = parser.parse_args()
+
     init_db()
 
     if not DB_PATH.exists():
         print("DB puuttuu")
         return
 
-    parts_text = build_parts_text()
-    if not parts_text:
-        print("Parts-teksti tyhjä. Onko parts-taulu täynnä?")
-        return
-
-    chunks = chunk_text(parts_text)
-    print(f"Chunkit: {len(chunks)}")
-    if not chunks:
-        print("Ei chunkkeja")
-        return
-
-    print("Ladataan embedding-malli...")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    print("Malli ladattu.")
-
-    emb = model.encode(chunks)
-    emb = np.asarray(emb, dtype=np.float32)
+    docs = fetch_parts_documents()
+    # An empty ledger still syncs: it deletes the stale parts_text chunks.
+    if not docs:
+        print("Parts-teksti tyhjä. Poistetaan vanhat parts_text-chunkit.")
+    print(f"Rivejä: {len(docs)}")
 
     conn = connect()
-    cur = conn.cursor()
 
-    # 1) poista vanhat
-    cur.execute("DELETE FROM chunks WHERE source = ?", (SOURCE,))
-    conn.commit()
-
-    # 2) insert uudet
-    rows = []
-    for ch, vec in zip(chunks, emb):
-        rows.append((SOURCE, REF, ch, vec.tobytes()))
+    # Only changed rows are re-embedded; the old single-document chunks
+    # (ref "parts.csv") are removed on the first run.
+    cache = EmbeddingCache(conn)
+    try:
+        plan = sync_source(conn, SOURCE, docs, cache, full=args.full)
+    finally:
+        cache.close()
 
-    cur.executemany(
-        "INSERT INTO chunks(source, ref, text, embedding) VALUES(?, ?, ?, ?)",
-        rows,
-    )
-    conn.commit()
+    if not plan.changes_chunks:
+        conn.close()
+        print("Ei muuttuneita rivejä.")
+        return
+    print(f"Embedding: {cache.summary()}")
 
-    # 3) varmennus
-    n = cur.execute(
+    n = conn.execute(
         "SELECT COUNT(*) FROM chunks WHERE source = ?",
         (SOURCE,),
     ).fetchone()[0]
-
     conn.close()
 
-    print(f"Valmis. chunks WHERE source={SOURCE}: {n}")
+    print(f"Valmis. Uusia chunkeja {len(plan.to_insert)}, poistettuja {len(plan.delete_ids)}. chunks WHERE source={SOURCE}: {n}")
+
+    # Refresh the memory-mapped embeddings file the server loads at startup.
+    print(f"Sidecar päivitetty: {write_sidecar(DB_PATH)} riviä")
+
+    # Bump last so a running server reloads only once everything is on disk.
+    c = connect()
+    print(f"Index generation ({SOURCE}): {bump_index_generation(c, SOURCE)}")
+    c.close()
 
 if __name__ == "__main__":
     main()
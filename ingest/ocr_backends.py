@@ -0,0 +1,128 @@
+"""OCR engines behind one small interface.
+
+- tesserocr: one persistent Tesseract API handle per process; language
+  data is loaded once and reused for every page.
+- pytesseract: spawns a `tesseract` process per page (temp files, language
+  data reloaded each time). Always available as the fallback.
+
+`get_backend()` caches one backend per process, so pool workers and the
+serial scripts reuse the same engine across pages.
+"""
+
+from __future__ import annotations
+
+import io
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+BACKEND_NAMES = ("auto", "tesserocr", "pytesseract")
+
+
+class OcrBackend(ABC):
+    """OCR engine interface: text for one image file."""
+
+    name = "base"
+
+    @abstractmethod
+    def ocr(self, path: Path) -> str:
+        ...
+
+    @abstractmethod
+    def ocr_bytes(self, data: bytes) -> str:
+        """OCR an encoded image (e.g. PNG bytes from a pixmap) without a file."""
+
+    @property
+    def version(self) -> str:
+        return "unknown"
+
+    def close(self) -> None:
+        pass
+
+
+class PytesseractBackend(OcrBackend):
+    name = "pytesseract"
+
+    def __init__(self, lang: str = "eng"):
+        import pytesseract
+        from PIL import Image
+
+        self.lang = lang
+        self._pytesseract = pytesseract
+        self._image = Image
+
+    def ocr(self, path: Path) -> str:
+        with self._image.open(path) as img:
+            text = self._pytesseract.image_to_string(img, lang=self.lang)
+        return (text or "").strip()
+
+    def ocr_bytes(self, data: bytes) -> str:
+        return self.ocr(io.BytesIO(data))
+
+    @property
+    def version(self) -> str:
+        return str(self._pytesseract.get_tesseract_version())
+
+
+class TesserocrBackend(OcrBackend):
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng"):
+        import tesserocr
+
+        self.lang = lang
+        self._tesserocr = tesserocr
+        # Same page segmentation as the tesseract CLI default (PSM 3, auto).
+        self._api = tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM.AUTO)
+
+    def ocr(self, path: Path) -> str:
+        self._api.SetImageFile(str(path))
+        return self._recognize()
+
+    def ocr_bytes(self, data: bytes) -> str:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as img:
+            self._api.SetImage(img)
+            return self._recognize()
+
+    def _recognize(self) -> str:
+        text = self._api.GetUTF8Text()
+        # Drop per-page recognition state; the loaded model stays.
+        self._api.Clear()
+        return (text or "").strip()
+
+    @property
+    def version(self) -> str:
+        return str(self._tesserocr.tesseract_version()).split()[1]
+
+    def close(self) -> None:
+        self._api.End()
+
+
+def make_backend(name: str = "auto", lang: str = "eng") -> OcrBackend:
+    """
+    name: tesserocr | pytesseract | auto (tesserocr when installed).
+    """
+    if name not in BACKEND_NAMES:
+        raise ValueError(f"tuntematon OCR-moottori: {name}")
+
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrBackend(lang)
+        except ImportError:
+            if name == "tesserocr":
+                raise
+    return PytesseractBackend(lang)
+
+
+_BACKENDS: dict[tuple[str, str], OcrBackend] = {}
+
+
+def get_backend(name: str = "auto", lang: str = "eng") -> OcrBackend:
+    """Process-wide backend for (name, lang), created on first use."""
+    key = (name, lang)
+    backend = _BACKENDS.get(key)
+    if backend is None:
+        backend = make_backend(name, lang)
+        _BACKENDS[key] = backend
+    return backend
@@ -1,18 +1,39 @@
-"""OCR cached manual page images and upsert text into the database."""
+"""OCR cached manual page images and upsert text into the database.
+
+With --workers N the images are OCRed in a process pool; a single writer
+thread receives the results through a queue and upserts them in batched
+transactions over one connection.
+
+Each row stores a hash of its source image and the OCR settings (engine,
+version, language). Pages whose hash and settings match are skipped, and
+every committed batch is a checkpoint: an interrupted run resumes from
+the pages it had not written yet. Pages read from the PDF text layer
+("native") or found blank keep their text unless --force is given.
+"""
 
 from __future__ import annotations
 from pathlib import Path
-from PIL import Image
-from backend.store import connect, init_db
+from backend.store import connect, init_db, read_manual_page_hashes, read_manual_page_methods, upsert_manual_pages
+from ingest.ocr_backends import BACKEND_NAMES, get_backend
 
+import argparse
+import hashlib
+import os
+import queue
 import re
-import pytesseract
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 ROOT = Path(__file__).resolve().parents[1]
 # Directory where rendered PNGs are stored.
 PAGES_DIR = ROOT / "db" / "cache" / "pages"
 # Regex used to parse the page number from the PNG filename.
 PAGE_RE = re.compile(r"manual_page_(\d+)\.png$", re.IGNORECASE)
+# Pages upserted per transaction by the writer thread (= checkpoint interval).
+WRITE_BATCH = 20
+# manual_pages methods that OCR would only make worse; re-OCRed with --force.
+TEXT_LAYER_METHODS = ("native", "blank")
 
 def parse_page_num(path: Path) -> int:
     """Extract a page number from a cached PNG filename."""
@@ -21,59 +42,202 @@ def parse_page_num(path: Path) -> int:
         raise ValueError(f"Virheellinen tiedosto nimi: {path.name}")
     return int(m.group(1))
 
-def ocr_image(path: Path, lang: str = "eng") -> str:
-    """Run Tesseract OCR on a single PNG image."""
-    img = Image.open(path)
-    text = pytesseract.image_to_string(img, lang=lang)
-    return (text or "").strip()
+def ocr_image(path: Path, lang: str = "eng", backend: str = "auto") -> str:
+    """Run Tesseract OCR on a single PNG image (engine reused across calls)."""
+    return get_backend(backend, lang).ocr(path)
+
+def ocr_page_file(path: str, lang: str = "eng", backend: str = "auto") -> tuple[int, str]:
+    """Pool worker: (page_num, text) for one cached PNG."""
+    p = Path(path)
+    return parse_page_num(p), ocr_image(p, lang=lang, backend=backend)
+
+def image_hash(path: Path) -> str:
+    """Content hash of a page image; the file name alone says nothing about changes."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def ocr_settings_key(backend_name: str, backend_version: str, lang: str) -> str:
+    return f"{backend_name}:{backend_version}:{lang}"
 
 def upsert_manual_page(page_num: int, text: str) -> None:
     """Insert or update OCR text for a manual page in the database."""
     conn = connect()
-    cur  = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO manual_pages(page_num, text)
-        VALUES(?, ?)
-        ON CONFLICT(page_num) DO UPDATE SET
-            text = excluded.text
-        """,
-        (page_num, text),
-    )
-    conn.commit()
+    upsert_manual_pages(conn, [(page_num, text, "ocr")])
     conn.close()
 
+def pages_to_ocr(
+    pngs: list[Path],
+    stored: dict[int, tuple[str | None, str | None]],
+    methods: dict[int, str | None],
+    settings: str,
+    force: bool = False,
+) -> list[tuple[Path, str]]:
+    """
+    (png, image hash) of the pages that need OCR. Skipped: pages whose stored
+    hash and settings match (including the batches an interrupted run
+    committed) and pages read from the text layer or found blank.
+    force=True returns every page.
+    stored: read_manual_page_hashes(), methods: read_manual_page_methods()
+    """
+    todo: list[tuple[Path, str]] = []
+    for png in pngs:
+        page_num = parse_page_num(png)
+        if not force and methods.get(page_num) in TEXT_LAYER_METHODS:
+            continue
+        digest = image_hash(png)
+        if not force and stored.get(page_num) == (digest, settings):
+            continue
+        todo.append((png, digest))
+    return todo
+
+class ManualPageWriter:
+    """
+    Single writer for manual_pages: rows arrive through a bounded queue and
+    are upserted WRITE_BATCH at a time over one connection.
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, batch_size: int = WRITE_BATCH):
+        self.batch_size = max(1, int(batch_size))
+        self.written = 0
+        self.error: BaseException | None = None
+        self._queue: queue.Queue = queue.Queue(maxsize=self.batch_size * 4)
+        self._thread = threading.Thread(target=self._run, name="manual-page-writer", daemon=True)
+        self._thread.start()
+
+    def put(
+        self,
+        page_num: int,
+        text: str,
+        method: str = "ocr",
+        source_hash: str | None = None,
+        ocr_settings: str | None = None,
+    ) -> None:
+        if self.error is not None:
+            raise RuntimeError(f"Tietokantaan kirjoitus epäonnistui: {self.error}")
+        self._queue.put((page_num, text, method, source_hash, ocr_settings))
+
+    def close(self) -> int:
+        """Flush the remaining rows and stop; returns the number of rows written."""
+        self._queue.put(self._CLOSE)
+        self._thread.join()
+        if self.error is not None:
+            raise RuntimeError(f"Tietokantaan kirjoitus epäonnistui: {self.error}")
+        return self.written
+
+    def _run(self) -> None:
+        conn = connect()
+        pending: list[tuple] = []
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._CLOSE:
+                    break
+                pending.append(item)
+                if len(pending) >= self.batch_size:
+                    upsert_manual_pages(conn, pending)
+                    self.written += len(pending)
+                    pending.clear()
+            if pending:
+                upsert_manual_pages(conn, pending)
+                self.written += len(pending)
+        except BaseException as e:
+            self.error = e
+            # Keep draining so producers blocked on put() are released.
+            while self._queue.get() is not self._CLOSE:
+                pass
+        finally:
+            conn.close()
+
 def main() -> None:
     """Main entry point for OCRing cached manual PNGs."""
+    parser = argparse.ArgumentParser(description="OCR db/cache/pages -kuvista manual_pages-tauluun.")
+    parser.add_argument("--workers", type=int, default=1, help="OCR-prosessien määrä (0 = CPU-ytimet)")
+    parser.add_argument("--lang", default="eng", help="Tesseractin kieli")
+    parser.add_argument(
+        "--backend",
+        choices=BACKEND_NAMES,
+        default="auto",
+        help="OCR-moottori (auto = tesserocr jos asennettu, muuten pytesseract)",
+    )
+    parser.add_argument("--force", action="store_true", help="OCR myös muuttumattomat sekä tekstikerroksesta luetut sivut")
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=WRITE_BATCH,
+        help="montako sivua tallennetaan kerralla (jatkokohta keskeytyksen jälkeen)",
+    )
+    args = parser.parse_args()
+
     init_db()
 
     if not PAGES_DIR.exists():
         print("EI SIVUKUVIA. Aja ensin rederöinti, joka luo db/cache/pages/manual_page_{n}.png")
         return
-    
-    pngs = sorted(PAGES_DIR.glob("manual_page_*.png"))
+
+    pngs = sorted(PAGES_DIR.glob("manual_page_*.png"), key=parse_page_num)
     if not pngs:
         print("EI PNG-TIEDOSTOJA. Kansio on tyhjä: db/cache/pages")
         return
-    
+
+    # 1) Resolve the engine once: "auto" becomes a concrete backend, and its
+    #    name, version and language form the settings part of the cache key.
+    engine = get_backend(args.backend, args.lang)
+    settings = ocr_settings_key(engine.name, engine.version, args.lang)
+
+    # 2) Skip unchanged, text-layer and blank pages.
+    conn = connect()
+    stored = read_manual_page_hashes(conn)
+    methods = read_manual_page_methods(conn)
+    conn.close()
+    todo = pages_to_ocr(pngs, stored, methods, settings, args.force)
+
+    skipped = len(pngs) - len(todo)
+    print(f"Sivukuvia: {len(pngs)}. Muuttumattomia (ohitetaan): {skipped}. OCR: {len(todo)}. ({settings})")
+    if not todo:
+        return
+
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1:
+        # Parallelism comes from the pool; one Tesseract thread per process
+        # avoids oversubscribing the cores.
+        os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
     # Track summary stats for logging at the end.
     total = 0
     nonempty = 0
+    t0 = time.perf_counter()
+    writer = ManualPageWriter(batch_size=args.checkpoint_every)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    hashes = {parse_page_num(png): digest for png, digest in todo}
 
-    for png in pngs:
-        page_num = parse_page_num(png)
-        # OCR each image; empty strings are allowed but skipped for DB writes.
-        text = ocr_image(png, lang="eng")
+    try:
+        paths = [str(png) for png, _ in todo]
+        langs = [args.lang] * len(paths)
+        backends = [engine.name] * len(paths)
+        if pool is not None:
+            results = pool.map(ocr_page_file, paths, langs, backends, chunksize=4)
+        else:
+            results = map(ocr_page_file, paths, langs, backends)
 
-        total += 1
-        if text:
-            nonempty += 1
-            # OCR each image; empty strings are allowed but skipped for DB writes.
-            upsert_manual_page(page_num, text)
+        for page_num, text in results:
+            total += 1
+            if text:
+                nonempty += 1
+            # Empty pages are stored too, so their hash marks them as done.
+            writer.put(page_num, text, "ocr", hashes[page_num], settings)
 
-        print(f"Sivu {page_num}: {len(text)} merkkiä")
+            print(f"Sivu {page_num}: {len(text)} merkkiä")
+    finally:
+        if pool is not None:
+            # On interrupt, drop queued pages; finished ones are still written below.
+            pool.shutdown(cancel_futures=True)
+        writer.close()
 
+    seconds = time.perf_counter() - t0
+    rate = total / seconds if seconds > 0 else 0.0
     print(f"Valmis. Sivut: {total}. Sivut joissa tekstiä: {nonempty}.")
+    print(f"Aika: {seconds:.1f} s ({rate:.2f} sivua/s, {workers} prosessia, {engine.name})")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,85 @@
+"""Compare per-page OCR latency of the available backends.
+
+Runs every installed backend (tesserocr, pytesseract) over the same cached
+page images in db/cache/pages and prints latency statistics. The first page
+is reported separately: it includes engine start-up (language data load).
+
+Usage:
+    python scripts/bench_ocr_backends.py --pages 20 --lang eng
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from ingest.ocr_backends import make_backend
+from ingest.ocr_manual_pages import PAGES_DIR, parse_page_num
+
+
+def bench(name: str, paths: list[Path], lang: str) -> dict | None:
+    t0 = time.perf_counter()
+    try:
+        backend = make_backend(name, lang)
+    except ImportError as e:
+        print(f"{name}: ei asennettu ({e})")
+        return None
+
+    times: list[float] = []
+    chars = 0
+    try:
+        for path in paths:
+            t = time.perf_counter()
+            chars += len(backend.ocr(path))
+            times.append(time.perf_counter() - t)
+    finally:
+        backend.close()
+
+    # Engine creation counts towards the first page, as it does in a real run.
+    first = times[0] + (time.perf_counter() - t0 - sum(times))
+    rest = times[1:] or times
+    return {
+        "backend": name,
+        "version": backend.version,
+        "pages": len(times),
+        "first_ms": first * 1000,
+        "mean_ms": statistics.mean(rest) * 1000,
+        "median_ms": statistics.median(rest) * 1000,
+        "p95_ms": sorted(rest)[int(0.95 * (len(rest) - 1))] * 1000,
+        "chars": chars,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OCR-moottorien vertailu välimuistin sivukuvilla.")
+    parser.add_argument("--pages", type=int, default=20, help="montako sivukuvaa ajetaan")
+    parser.add_argument("--lang", default="eng")
+    args = parser.parse_args()
+
+    paths = sorted(PAGES_DIR.glob("manual_page_*.png"), key=parse_page_num)[: args.pages]
+    if not paths:
+        print("EI PNG-TIEDOSTOJA. Aja ensin ingest/ingest_manual.py")
+        return
+
+    print(f"Sivukuvia: {len(paths)} ({PAGES_DIR})")
+    results = [r for r in (bench(name, paths, args.lang) for name in ("tesserocr", "pytesseract")) if r]
+
+    for r in results:
+        print(
+            f"{r['backend']:<12} v{r['version']:<8} "
+            f"ensimmäinen {r['first_ms']:8.1f} ms | "
+            f"keskiarvo {r['mean_ms']:8.1f} ms | "
+            f"mediaani {r['median_ms']:8.1f} ms | "
+            f"p95 {r['p95_ms']:8.1f} ms | "
+            f"merkkejä {r['chars']}"
+        )
+
+    if len(results) == 2:
+        speedup = results[1]["mean_ms"] / results[0]["mean_ms"]
+        print(f"tesserocr / pytesseract: {speedup:.2f}x nopeampi per sivu")
+
+
+if __name__ == "__main__":
+    main()
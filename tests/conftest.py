@@ -1,7 +1,52 @@
 from pathlib import Path
 
+import os
 import sys
 
+import numpy as np
+import pytest
+
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend import store  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Path of a fresh app.sqlite; store.DB_PATH points to it and the schema exists."""
+    db_path = tmp_path / "app.sqlite"
+    monkeypatch.setattr(store, "DB_PATH", db_path)
+    store.init_db()
+    return db_path
+
+
+class FakeModel:
+    """Stand-in SentenceTransformer: one row (len(text), count of "a") per text; records calls and pool use."""
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+        self.pool_started = 0
+        self.pool_stopped = 0
+        self.pool_env: str | None = None
+
+    def encode(self, texts, batch_size=32):
+        self.calls.append(list(texts))
+        return np.array([[len(t), t.count("a")] for t in texts], dtype=np.float32)
+
+    def start_multi_process_pool(self, target_devices=None):
+        self.pool_started += 1
+        self.pool_env = os.environ.get("OMP_NUM_THREADS")
+        return object()
+
+    def encode_multi_process(self, texts, pool, batch_size=32, chunk_size=None):
+        return self.encode(texts, batch_size=batch_size)
+
+    def stop_multi_process_pool(self, pool):
+        self.pool_stopped += 1
+
+
+@pytest.fixture
+def fake_model():
+    return FakeModel()
@@ -0,0 +1,58 @@
+import numpy as np
+
+from backend import ann, rag
+
+
+def clustered_matrix(n_clusters=8, per_cluster=60, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    rows = [c + 0.1 * rng.normal(size=(per_cluster, dim)) for c in centers]
+    return np.vstack(rows).astype(np.float32)
+
+
+def test_ivf_index_recall_against_exact_search():
+    matrix = clustered_matrix()
+    index = ann.IVFIndex.build(matrix, nlist=8, nprobe=2)
+    exact = rag.EmbeddingIndex(matrix)
+
+    rng = np.random.default_rng(1)
+    hits = 0
+    for row in rng.choice(matrix.shape[0], size=20, replace=False):
+        q = matrix[row] + 0.01 * rng.normal(size=matrix.shape[1]).astype(np.float32)
+        idx, _ = index.search(q, k=5)
+        ref_idx, _ = exact.search(q, k=5)
+        hits += len(set(idx.tolist()) & set(ref_idx.tolist()))
+
+    assert hits / (20 * 5) >= 0.9
+
+
+def test_ivf_index_full_probe_equals_exact():
+    matrix = clustered_matrix(seed=2)
+    index = ann.IVFIndex.build(matrix, nlist=8)
+    q = matrix[3]
+
+    idx, scores = index.search(q, k=4, nprobe=index.nlist)
+    ref_idx, ref_scores = rag.cosine_top_k(q, matrix, k=4)
+
+    assert idx.tolist() == ref_idx.tolist()
+    assert np.allclose(scores, ref_scores, atol=1e-5)
+
+
+def test_ivf_index_save_and_load_roundtrip(tmp_path):
+    matrix = clustered_matrix(seed=3)
+    path = tmp_path / "ivf.npz"
+    ann.IVFIndex.build(matrix, nlist=4).save(path)
+
+    loaded = ann.IVFIndex.load(path, matrix)
+    assert loaded is not None
+    assert loaded.nlist == 4
+
+    # A different matrix must not reuse the cached lists.
+    assert ann.IVFIndex.load(path, matrix[:-1]) is None
+
+
+def test_build_search_index_falls_back_to_exact_when_small(tmp_path):
+    matrix = clustered_matrix(n_clusters=2, per_cluster=5)
+    index = ann.build_search_index(matrix, path=tmp_path / "ivf.npz")
+
+    assert type(index) is rag.EmbeddingIndex
@@ -0,0 +1,40 @@
+import numpy as np
+
+from backend import store
+from backend.embed_cache import EmbeddingCache, text_key
+
+
+def make_cache(model):
+    return EmbeddingCache(store.connect(), load_model=lambda: model)
+
+
+def test_text_key_ignores_case_and_whitespace():
+    assert text_key("Jarru  Pala\n") == text_key("jarru pala")
+    assert text_key("jarru pala") != text_key("jarrupala")
+
+
+def test_only_misses_are_encoded_and_cache_persists(db, fake_model):
+    cache = make_cache(fake_model)
+
+    first = cache.encode(["aa", "b", "aa"])
+    assert fake_model.calls == [["aa", "b"]]
+    assert np.array_equal(first[0], first[2])
+
+    # A fresh cache over the same DB (e.g. the next ingest run).
+    cache2 = EmbeddingCache(store.connect(), load_model=lambda: fake_model)
+    second = cache2.encode(["b", "ccc"])
+
+    assert fake_model.calls[1:] == [["ccc"]]
+    assert np.array_equal(second[0], first[1])
+    assert (cache2.hits, cache2.misses) == (1, 1)
+
+
+def test_all_hits_never_load_the_model(db, fake_model):
+    cache = make_cache(fake_model)
+    cache.encode(["x"])
+
+    def fail():
+        raise AssertionError("model should not load")
+
+    cached_only = EmbeddingCache(store.connect(), load_model=fail)
+    assert cached_only.encode(["X "]).shape == (1, 2)
@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from backend.encoder_service import BatchingEncoder
+
+
+class RecordingEncoder:
+    def __init__(self):
+        self.batch_sizes: list[int] = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.batch_sizes.append(len(texts))
+        return np.array([[float(t), -float(t)] for t in texts], dtype=np.float32)
+
+
+def test_direct_encode_before_start():
+    enc = RecordingEncoder()
+    batcher = BatchingEncoder(enc)
+
+    out = batcher.encode(["1", "2"])
+
+    assert np.array_equal(out, np.array([[1, -1], [2, -2]], dtype=np.float32))
+    assert enc.batch_sizes == [2]
+
+
+def test_concurrent_requests_are_batched_and_routed_back():
+    enc = RecordingEncoder()
+    batcher = BatchingEncoder(enc, max_batch=8, max_wait_ms=50)
+    batcher.start()
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda i: batcher.encode([str(i)]), range(16)))
+    finally:
+        batcher.stop()
+
+    for i, out in enumerate(results):
+        assert np.array_equal(out, np.array([[i, -i]], dtype=np.float32))
+    assert sum(enc.batch_sizes) == 16
+    assert max(enc.batch_sizes) <= 8
+    assert len(enc.batch_sizes) < 16
+
+
+def test_encoder_error_reaches_caller():
+    def failing(texts):
+        raise RuntimeError("malli rikki")
+
+    batcher = BatchingEncoder(failing, max_wait_ms=1)
+    batcher.start()
+    try:
+        with pytest.raises(RuntimeError):
+            batcher.encode(["a"])
+    finally:
+        batcher.stop()
+
+    assert not batcher.running
+
+
+def test_short_encoder_output_fails_every_caller():
+    batcher = BatchingEncoder(lambda texts: np.zeros((len(texts) - 1, 2), dtype=np.float32), max_batch=2, max_wait_ms=200)
+    batcher.start()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(batcher.encode, [t]) for t in "ab"]
+            for f in futures:
+                with pytest.raises(RuntimeError):
+                    f.result(timeout=5)
+    finally:
+        batcher.stop()
+
+
+def test_submit_after_stop_is_encoded_directly():
+    enc = RecordingEncoder()
+    batcher = BatchingEncoder(enc, timeout_sec=1)
+    batcher.start()
+    batcher.stop()
+
+    assert np.array_equal(batcher.submit("3").result(timeout=1), [3, -3])
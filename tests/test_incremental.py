@@ -0,0 +1,59 @@
+from backend import store
+from backend.embed_cache import EmbeddingCache
+from backend.incremental import diff_chunks, page_text_hash, sync_source
+
+
+def test_page_hash_depends_on_text_and_chunking():
+    h = page_text_hash("öljynvaihto", 500, 150)
+    assert h == page_text_hash("öljynvaihto", 500, 150)
+    assert h != page_text_hash("öljynvaihto.", 500, 150)
+    assert h != page_text_hash("öljynvaihto", 400, 150)
+
+
+def test_diff_chunks_keeps_unchanged_rows():
+    old = [(10, "a"), (11, "b"), (12, "c")]
+    keep, delete, insert = diff_chunks(old, ["a", "c", "d"])
+
+    assert keep == [10, 12]
+    assert delete == [11]
+    assert insert == ["d"]
+
+
+def test_diff_chunks_handles_repeated_texts():
+    old = [(5, "x"), (6, "x")]
+    keep, delete, insert = diff_chunks(old, ["x", "x", "x"])
+
+    assert keep == [5, 6]
+    assert delete == []
+    assert insert == ["x"]
+
+
+def test_sync_source_reembeds_only_changed_documents(db, fake_model):
+    conn = store.connect()
+    cache = EmbeddingCache(conn, load_model=lambda: fake_model)
+
+    plan = sync_source(conn, "notes", {"n#a": "alpha", "n#b": "beta"}, cache)
+    assert plan.changes_chunks and len(plan.to_insert) == 2
+
+    # Unchanged: nothing to do. Changed/removed: only that document.
+    assert not sync_source(conn, "notes", {"n#a": "alpha", "n#b": "beta"}, cache).changes_chunks
+    plan = sync_source(conn, "notes", {"n#a": "alpha 2"}, cache)
+    assert plan.to_insert == [("n#a", "alpha 2")]
+    assert plan.removed_refs == ["n#b"]
+    assert fake_model.calls == [["alpha", "beta"], ["alpha 2"]]
+
+    refs = [r for (r,) in conn.execute("SELECT ref FROM chunks WHERE source = 'notes'")]
+    assert refs == ["n#a"]
+
+
+def test_sync_source_with_no_documents_deletes_the_source(db, fake_model):
+    conn = store.connect()
+    cache = EmbeddingCache(conn, load_model=lambda: fake_model)
+    sync_source(conn, "parts_text", {"parts.csv#id=1": "jarrupalat", "parts.csv#id=2": "öljy"}, cache)
+
+    plan = sync_source(conn, "parts_text", {}, cache)
+
+    assert plan.changes_chunks
+    assert sorted(plan.removed_refs) == ["parts.csv#id=1", "parts.csv#id=2"]
+    assert conn.execute("SELECT COUNT(*) FROM chunks WHERE source = 'parts_text'").fetchone()[0] == 0
+    assert not sync_source(conn, "parts_text", {}, cache).changes_chunks
@@ -0,0 +1,36 @@
+import os
+
+from backend.ingest_embedder import IngestEmbedder, length_order
+
+
+def test_length_order_is_longest_first_and_stable():
+    assert list(length_order(["bb", "a", "ccc", "dd"])) == [2, 0, 3, 1]
+
+
+def test_encode_sorts_by_length_and_restores_order(fake_model):
+    texts = ["a", "cccc", "bb", "ddd"]
+
+    out = IngestEmbedder(fake_model, workers=1).encode(texts)
+
+    assert fake_model.calls == [["cccc", "ddd", "bb", "a"]]
+    assert out[:, 0].tolist() == [1, 4, 2, 3]
+
+
+def test_large_inputs_use_the_process_pool(monkeypatch, fake_model):
+    monkeypatch.setenv("OMP_NUM_THREADS", "parent")
+    texts = [("x" * (i % 7)) + str(i) for i in range(64)]
+
+    with IngestEmbedder(fake_model, workers=2, batch_size=8) as embedder:
+        small = embedder.encode(texts[:10])
+        assert fake_model.pool_started == 0
+
+        out = embedder.encode(texts)
+        assert fake_model.pool_started == 1
+        # Workers see their thread share; the parent keeps its setting.
+        assert fake_model.pool_env == str(max(1, (os.cpu_count() or 1) // 2))
+        assert os.environ["OMP_NUM_THREADS"] == "parent"
+
+    assert fake_model.pool_stopped == 1
+    assert out[:, 0].tolist() == [len(t) for t in texts]
+    assert small.shape == (10, 2)
+    assert embedder.encoded == 74
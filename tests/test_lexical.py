@@ -0,0 +1,65 @@
+import sqlite3
+
+from backend import lexical, store
+
+
+def connect_with_chunks(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO chunks(source, ref, text, embedding) VALUES(?, ?, ?, ?)",
+        [
+            ("manual", "m.pdf#page=1", "KA24DE engine torque specifications", b""),
+            ("manual", "m.pdf#page=2", "Brake fluid bleeding procedure", b""),
+            ("parts_text", "parts.csv", "Osa: KA24DE tiivistesarja, Hinta: 120.00", b""),
+        ],
+    )
+    conn.commit()
+    return conn
+
+
+def test_fts_match_query_quotes_tokens():
+    assert lexical.fts_match_query('KA24DE "torque"') == '"ka24de" OR "torque"'
+    assert lexical.fts_match_query("  ,. ") is None
+
+
+def test_lexical_search_finds_exact_terms_and_filters_sources(db):
+    conn = connect_with_chunks(db)
+    try:
+        hits = lexical.lexical_search(conn, "ka24de torque", k=5)
+        assert [h[2] for h in hits][0] == "m.pdf#page=1"
+        assert len(hits) == 2
+
+        manual_only = lexical.lexical_search(conn, "KA24DE", k=5, sources=["manual"])
+        assert [h[1] for h in manual_only] == ["manual"]
+    finally:
+        conn.close()
+
+
+def test_fts_follows_chunk_deletes(db):
+    conn = connect_with_chunks(db)
+    try:
+        conn.execute("DELETE FROM chunks WHERE source = 'parts_text'")
+        conn.commit()
+        assert len(lexical.lexical_search(conn, "tiivistesarja", k=5)) == 0
+    finally:
+        conn.close()
+
+
+def test_init_db_backfills_fts_for_existing_chunks(db):
+    conn = connect_with_chunks(db)
+    conn.execute("DROP TABLE chunks_fts")
+    conn.commit()
+    conn.close()
+
+    store.init_db()
+    conn = sqlite3.connect(db)
+    try:
+        assert len(lexical.lexical_search(conn, "brake", k=5)) == 1
+    finally:
+        conn.close()
+
+
+def test_rrf_fuse_rewards_agreement():
+    fused = lexical.rrf_fuse([[1, 2, 3], [3, 1]], k_rrf=60)
+
+    assert [i for i, _ in fused] == [1, 3, 2]
@@ -0,0 +1,77 @@
+import sqlite3
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend import chunk_index, main, reloader, store
+from backend.parts_cache import PartsCache
+
+
+def insert_chunks(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO chunks(source, ref, text, embedding) VALUES('manual', ?, ?, ?)",
+        [(ref, text, np.asarray(vec, dtype=np.float32).tobytes()) for ref, text, vec in rows],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_hybrid_relevance_and_scores_are_cosine(tmp_path, db, monkeypatch):
+    # Only the BM25 ranking finds "jarru"; its cosine with the question is low.
+    insert_chunks(db, [
+        ("m.pdf#page=1", "jarru ilmaus", [0.0, 1.0]),
+        ("m.pdf#page=2", "moottori", [1.0, 0.2]),
+    ])
+    monkeypatch.setattr(main, "DB_PATH", db)
+    monkeypatch.setattr(main, "HYBRID_DEPTH", 2)
+    monkeypatch.setattr(main, "encode_queries", lambda qs: np.array([[0.1, -1.0]] * len(qs), dtype=np.float32))
+
+    snap = chunk_index.load_snapshot(db, tmp_path / "meta.json")
+    (_, _, relevant), = main.retrieve(snap, ["miten jarru"], k=2, sources=None, mode="hybrid")
+    assert relevant is False
+
+    # With a close vector hit the BM25-only row (outside the vector top-2) gets its cosine from SQLite.
+    insert_chunks(db, [("m.pdf#page=3", "vaihteisto", [0.1, -0.9])])
+    snap = chunk_index.load_snapshot(db, tmp_path / "meta.json")
+    (idx, scores, relevant), = main.retrieve(snap, ["miten jarru"], k=2, sources=None, mode="hybrid")
+
+    assert relevant is True
+    cos = {snap.chunk_refs[i]: s for i, s in zip(idx, scores)}
+    assert set(cos) == {"m.pdf#page=3", "m.pdf#page=1"}
+    assert np.isclose(cos["m.pdf#page=1"], -1.0 / np.sqrt(1.01), atol=1e-5)
+    assert cos["m.pdf#page=3"] > 0.99
+
+
+def test_part_writes_update_rules_and_reembed_from_sqlite(tmp_path, db, monkeypatch, fake_model):
+    conn = store.connect()
+    conn.execute("INSERT INTO parts(date, part, cost) VALUES('2023-01-02', 'Jarrupalat taka', 35.0)")
+    conn.commit()
+    parts = PartsCache()
+    parts.load(conn)
+    # ingest_parts.py replaces the ledger behind the server's back (new id, new row).
+    conn.execute("DELETE FROM parts")
+    conn.execute("INSERT INTO parts(date, part, cost) VALUES('2023-01-02', 'Akku', 120.0)")
+    conn.commit()
+
+    monkeypatch.setattr(main, "DB_PATH", db)
+    monkeypatch.setattr(main, "PARTS", parts)
+    monkeypatch.setattr(main, "ENCODER", fake_model)
+    monkeypatch.setattr(main, "CHUNK_RELOADER", reloader.SnapshotReloader(db_path=db, meta_path=tmp_path / "meta.json"))
+    client = TestClient(main.app)
+    ask = "Paljonko jarrupalat on maksanut yhteensä?"
+
+    part_id = client.post("/parts", json={"date": "2024-03-01", "part": "Jarrupalat etu", "cost": 40.0}).json()["id"]
+    assert client.post("/ask", json={"question": ask}).json()["answer"] == "40.00 € (1 osumaa)"
+
+    # The background sync embedded exactly the rows SQLite has.
+    refs = {r for (r,) in conn.execute("SELECT ref FROM chunks WHERE source = 'parts_text'")}
+    assert refs == {"parts.csv#id=2", f"parts.csv#id={part_id}"}
+    assert main.CHUNK_RELOADER.snapshot.size(["parts_text"]) == 2
+
+    client.delete(f"/parts/{part_id}")
+    assert client.post("/ask", json={"question": ask}).json()["answer"] == "0.00 € (0 osumaa)"
+    refs = {r for (r,) in conn.execute("SELECT ref FROM chunks WHERE source = 'parts_text'")}
+    assert refs == {"parts.csv#id=2"}
+    assert len(fake_model.calls) == 1
+    conn.close()
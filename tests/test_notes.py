@@ -0,0 +1,91 @@
+import pytest
+
+from backend import store
+from backend.embed_cache import EmbeddingCache
+from backend.notes import chunk_section, split_markdown_sections
+from ingest import ingest_notes_to_chunks
+
+
+NOTES = """Yleistä huomioitavaa.
+
+# Moottori
+## Öljynvaihto
+5W-30, 3.5 l.
+
+```sh
+# ei otsikko
+```
+
+## Sytytystulpat
+NGK BKR6E.
+
+# Jarrut
+## Öljynvaihto
+Jarruneste DOT4.
+"""
+
+
+def test_sections_follow_headings_and_skip_code_fences():
+    sections = split_markdown_sections(NOTES)
+
+    assert [s.key for s in sections] == [
+        "top",
+        "moottori/öljynvaihto",
+        "moottori/sytytystulpat",
+        "jarrut/öljynvaihto",
+    ]
+    assert sections[1].title == "Moottori > Öljynvaihto"
+    assert "# ei otsikko" in sections[1].body
+
+
+def test_keys_are_stable_when_other_sections_change():
+    before = {s.key: s.body for s in split_markdown_sections(NOTES)}
+    edited = NOTES.replace("NGK BKR6E.", "NGK BKR6E, väli 0.8 mm.").replace(
+        "# Jarrut", "# Renkaat\nKesä 195/65R15.\n\n# Jarrut"
+    )
+    after = {s.key: s.body for s in split_markdown_sections(edited)}
+
+    assert after["moottori/öljynvaihto"] == before["moottori/öljynvaihto"]
+    assert after["jarrut/öljynvaihto"] == before["jarrut/öljynvaihto"]
+    assert after["moottori/sytytystulpat"] != before["moottori/sytytystulpat"]
+    assert "renkaat" in after
+
+
+def test_repeated_headings_get_suffixes():
+    keys = [s.key for s in split_markdown_sections("# Huom\na\n# Huom\nb\n")]
+    assert keys == ["huom", "huom~2"]
+
+
+def test_every_chunk_starts_with_heading_path():
+    section = split_markdown_sections("# Moottori\n" + "sana " * 300)[0]
+    chunks = chunk_section(section.text(), chunk_size=200, overlap=50)
+
+    assert len(chunks) > 1
+    assert all(ch.startswith("Moottori\n") for ch in chunks)
+
+
+def test_retry_publishes_chunks_committed_by_a_failed_sync(db, tmp_path, monkeypatch, fake_model):
+    notes = tmp_path / "notes.md"
+    notes.write_text(NOTES, encoding="utf-8")
+    monkeypatch.setattr(ingest_notes_to_chunks, "NOTES_PATH", notes)
+    failures = [OSError("levy täynnä")]
+
+    def write_sidecar(path):
+        if failures:
+            raise failures.pop()
+        return 0
+
+    monkeypatch.setattr(ingest_notes_to_chunks, "write_sidecar", write_sidecar)
+    conn = store.connect()
+    cache = EmbeddingCache(conn, load_model=lambda: fake_model)
+
+    # The chunks are committed, but publishing fails before the bump.
+    with pytest.raises(OSError):
+        ingest_notes_to_chunks.sync_notes(cache)
+    assert store.read_index_generations(conn).get("notes", 0) == 0
+
+    # A plain retry sees nothing to do; the pending retry still publishes.
+    assert ingest_notes_to_chunks.sync_notes(cache) is False
+    assert ingest_notes_to_chunks.sync_notes(cache, republish=True) is True
+    assert store.read_index_generations(conn)["notes"] == 1
+    conn.close()
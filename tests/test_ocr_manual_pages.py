@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from backend import store
+from ingest import ocr_manual_pages
+from ingest.ocr_manual_pages import ManualPageWriter
+
+
+def stored_pages():
+    conn = store.connect()
+    rows = conn.execute("SELECT page_num, text FROM manual_pages ORDER BY page_num").fetchall()
+    conn.close()
+    return rows
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_writer_commits_full_batches_and_flushes_on_close(db):
+    writer = ManualPageWriter(batch_size=2)
+    for page in (1, 2, 3):
+        writer.put(page, f"sivu {page}", "ocr", f"h{page}", "s")
+
+    # The first batch is committed while the writer is still open.
+    wait_for(lambda: writer.written == 2)
+    assert stored_pages() == [(1, "sivu 1"), (2, "sivu 2")]
+
+    assert writer.close() == 3
+    assert stored_pages() == [(1, "sivu 1"), (2, "sivu 2"), (3, "sivu 3")]
+
+
+def test_writer_error_reaches_producer_without_blocking(db, monkeypatch):
+    def fail(conn, rows):
+        raise OSError("levy täynnä")
+
+    monkeypatch.setattr(ocr_manual_pages, "upsert_manual_pages", fail)
+    writer = ManualPageWriter(batch_size=1)
+
+    def produce():
+        # Far more rows than the queue holds: a stuck writer would block put().
+        for page in range(50):
+            try:
+                writer.put(page, "x")
+            except RuntimeError:
+                pass  # the writer already failed
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join(timeout=5)
+    assert not producer.is_alive()
+
+    with pytest.raises(RuntimeError, match="levy täynnä"):
+        writer.close()
+    with pytest.raises(RuntimeError):
+        writer.put(99, "y")
+
+
+def write_pngs(tmp_path, n):
+    pngs = []
+    for page in range(1, n + 1):
+        png = tmp_path / f"manual_page_{page}.png"
+        png.write_bytes(f"kuva {page}".encode())
+        pngs.append(png)
+    return pngs
+
+
+def pages_to_ocr(pngs, settings="tesserocr:5.3.0:eng", force=False):
+    conn = store.connect()
+    stored = store.read_manual_page_hashes(conn)
+    methods = store.read_manual_page_methods(conn)
+    conn.close()
+    todo = ocr_manual_pages.pages_to_ocr(pngs, stored, methods, settings, force)
+    return [ocr_manual_pages.parse_page_num(png) for png, _ in todo]
+
+
+def test_pages_to_ocr_resumes_after_an_interrupted_run(tmp_path, db):
+    pngs = write_pngs(tmp_path, 5)
+    settings = "tesserocr:5.3.0:eng"
+    conn = store.connect()
+    store.upsert_manual_pages(conn, [(4, "tekstikerros", "native"), (5, "", "blank")])
+    conn.close()
+    assert pages_to_ocr(pngs) == [1, 2, 3]
+
+    # The run stops after the writer committed one batch of two pages.
+    writer = ManualPageWriter(batch_size=2)
+    for png, digest in ocr_manual_pages.pages_to_ocr(pngs[:2], {}, {}, settings):
+        writer.put(ocr_manual_pages.parse_page_num(png), "ocr", "ocr", digest, settings)
+    writer.close()
+    assert pages_to_ocr(pngs) == [3]
+
+    # A changed image, new OCR settings or --force bring pages back.
+    pngs[0].write_bytes(b"uusi kuva")
+    assert pages_to_ocr(pngs) == [1, 3]
+    assert pages_to_ocr(pngs, settings="pytesseract:5.3.0:eng") == [1, 2, 3]
+    assert pages_to_ocr(pngs, force=True) == [1, 2, 3, 4, 5]
@@ -0,0 +1,25 @@
+import numpy as np
+
+from backend import page_text
+
+
+def test_real_text_layer_is_usable():
+    text = "Check the engine oil level with the dipstick.\nCapacity: 3.4 L (KA24DE)."
+    assert page_text.text_quality(text) > 0.9
+    assert page_text.is_usable_text(text)
+
+
+def test_broken_encoding_and_short_text_are_not_usable():
+    garbage = " ".join(["(cid:12)(cid:7)", "\ufffd\ufffd", "~~^^", "ab"] * 10)
+    assert page_text.text_quality(garbage) < page_text.MIN_TEXT_QUALITY
+    assert not page_text.is_usable_text(garbage)
+    assert not page_text.is_usable_text("Page 12")
+
+
+def test_blank_image_detection():
+    white = np.full((100, 80), 255, dtype=np.uint8)
+    assert page_text.is_blank_image(white)
+
+    drawing = white.copy()
+    drawing[40:60, 10:70] = 0
+    assert not page_text.is_blank_image(drawing)
@@ -0,0 +1,38 @@
+from backend import store
+from backend.parts_cache import PartsCache
+from backend.parts_logic import parts_documents, total_cost_contains
+
+
+def make_cache(rows):
+    conn = store.connect()
+    conn.executemany("INSERT INTO parts(date, part, cost, notes) VALUES(?, ?, ?, ?)", rows)
+    conn.commit()
+    cache = PartsCache()
+    cache.load(conn)
+    return cache, conn
+
+
+def test_add_and_remove_patch_the_frame(db):
+    cache, _ = make_cache([("2024-01-02", "Jarrupalat", 40.0, None)])
+    before = cache.df
+
+    cache.add({"id": 7, "date": "2024-03-01", "part": "Jarrupalat taka", "cost": 35.0, "notes": None})
+    assert total_cost_contains(cache.df, "jarrupalat")["total_eur"] == 75.0
+    assert cache.index.total_cost("jarrupalat")["total_eur"] == 75.0
+    # Readers holding the old frame are not affected.
+    assert len(before) == 1
+
+    assert cache.remove(7)
+    assert not cache.remove(7)
+    assert total_cost_contains(cache.df, "jarrupalat")["matches"] == 1
+    assert cache.index.total_cost("jarrupalat")["matches"] == 1
+    assert cache.version == 3
+
+
+def test_parts_documents_skip_rows_without_a_part(db):
+    _, conn = make_cache(
+        [("2024-01-02", "Jarrupalat", None, None), ("2024-02-03", " ", 5.0, "tyhjä osa")],
+    )
+    rows = conn.execute("SELECT id, date, part, cost, notes FROM parts").fetchall()
+
+    assert parts_documents(rows) == {"parts.csv#id=1": "Päivä: 2024-01-02, Osa: Jarrupalat, Hinta: , Huomio: "}
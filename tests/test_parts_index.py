@@ -0,0 +1,94 @@
+import numpy as np
+
+from backend import parts_index
+from backend.parts_index import PartsIndex
+from backend.parts_logic import (
+    last_change_date_contains,
+    parts_frame,
+    total_cost_contains,
+    yes_no_changed_contains,
+)
+
+ROWS = [
+    {"id": 1, "date": "2023-04-01", "part": "Jarrupalat etu", "cost": 45.5, "notes": None},
+    {"id": 2, "date": "2024-02-10", "part": "Jarrupalat taka", "cost": 38.0, "notes": None},
+    {"id": 3, "date": "", "part": "Jarrulevyt etu", "cost": None, "notes": None},
+    {"id": 4, "date": "2024-06-01", "part": "Öljynsuodatin", "cost": 9.9, "notes": None},
+    {"id": 5, "date": "2022-09-15", "part": "Moottoriöljy 5W-30", "cost": 32.0, "notes": None},
+]
+TARGETS = ["jarrupalat", "jarru", "etu", "palat taka", "öljy", "w-3", "jarru etu", "kytkin", ""]
+
+
+def test_lookups_match_dataframe_versions():
+    df = parts_frame(ROWS)
+    index = PartsIndex.from_frame(df)
+
+    for target in TARGETS:
+        assert index.total_cost(target) == total_cost_contains(df, target)
+        assert index.last_change_date(target) == last_change_date_contains(df, target)
+        assert index.yes_no_changed(target) == yes_no_changed_contains(df, target)
+
+
+def test_add_and_remove_update_postings():
+    index = PartsIndex.from_frame(parts_frame(ROWS))
+
+    index.add(6, "ilmansuodatin", "12.5", "2024-07-01")
+    assert index.words_containing("suodatin") == {"öljynsuodatin", "ilmansuodatin"}
+    assert index.total_cost("suodatin")["total_eur"] == 22.4
+
+    assert index.remove(4)
+    assert not index.remove(4)
+    assert index.words_containing("suodatin") == {"ilmansuodatin"}
+    assert index.last_change_date("suodatin")["date"] == "2024-07-01"
+    assert len(index) == 5
+    assert np.array_equal(index.match("etu"), [0, 2])
+
+
+def test_fuzzy_resolves_only_tokens_without_substring_match():
+    index = PartsIndex.from_frame(parts_frame(ROWS))
+
+    words = [w for w, _ in index.similar_words("jarrupaloja", 0.4)]
+    assert words == ["jarrupalat"]
+
+    hits, fuzzy = index.resolve("jarrupaloja etu", fuzzy_threshold=0.5)
+    assert fuzzy == {"jarrupaloja": "jarrupalat"}
+    assert np.array_equal(hits, [0])
+
+    # Substring matches keep the exact "contains" semantics.
+    hits, fuzzy = index.resolve("jarru", fuzzy_threshold=0.5)
+    assert fuzzy == {}
+    assert np.array_equal(hits, index.match("jarru"))
+
+    assert len(index.resolve("jarrupaloja")[0]) == 0
+    index.remove(1)
+    index.remove(2)
+    assert index.similar_words("jarrupaloja", 0.4) == []
+
+
+def test_fuzzy_match_needs_the_same_stem_and_a_clear_winner():
+    index = PartsIndex.from_frame(parts_frame([
+        {"id": 1, "date": "2024-01-01", "part": "Ilmansuodatin", "cost": 12.0, "notes": None},
+        {"id": 2, "date": "2024-02-01", "part": "Takajarrulevyt", "cost": 80.0, "notes": None},
+        {"id": 3, "date": "2024-03-01", "part": "Jarrulevyt", "cost": 70.0, "notes": None},
+        {"id": 4, "date": "2024-04-01", "part": "Jarrulevyn kiinnike", "cost": 5.0, "notes": None},
+    ]))
+
+    # Similar enough at a low threshold, but a different part.
+    assert index.best_similar_word("öljynsuodatin", 0.3) is None
+    assert index.best_similar_word("etujarrulevyt", 0.3) is None
+    # Two words equally close: ambiguous, so no match.
+    (_, first), (_, second) = index.similar_words("jarrulevyjä", 0.5)[:2]
+    assert first == second
+    hits, fuzzy = index.resolve("jarrulevyjä", fuzzy_threshold=0.5)
+    assert len(hits) == 0 and fuzzy == {}
+
+
+def test_token_memo_is_bounded_and_skips_misses(monkeypatch):
+    monkeypatch.setattr(parts_index, "TOKEN_MEMO_SIZE", 2)
+    index = PartsIndex.from_frame(parts_frame(ROWS))
+
+    index.match("ei-osumaa")
+    assert len(index._token_rows) == 0
+    for token in ("jarru", "suodatin", "etu"):
+        index.match(token)
+    assert list(index._token_rows) == ["suodatin", "etu"]
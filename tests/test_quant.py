@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from backend import quant, rag
+
+
+def random_matrix(n=200, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+def test_quantize_roundtrip_is_close(mode):
+    matrix = random_matrix()
+    codes, scales = quant.quantize(matrix, mode)
+
+    assert codes.dtype == quant.code_dtype(mode)
+    restored = codes.astype(np.float32) * scales[:, None]
+    assert np.abs(restored - rag.normalize_rows(matrix)).max() < 0.01
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+def test_quantized_index_rescoring_matches_exact(mode):
+    matrix = random_matrix(seed=1)
+    codes, scales = quant.quantize(matrix, mode)
+    index = quant.QuantizedIndex(codes, scales, lambda pos: matrix[pos], rescore_factor=4)
+
+    q = random_matrix(n=1, seed=2)[0]
+    idx, scores = index.search(q, k=5)
+    ref_idx, ref_scores = rag.cosine_top_k(q, matrix, k=5)
+
+    assert idx.tolist() == ref_idx.tolist()
+    assert np.allclose(scores, ref_scores, atol=1e-5)
+
+
+def test_quantized_columns_none_mode_leaves_columns_empty():
+    cols = quant.quantized_columns(random_matrix(n=3), "none")
+
+    assert cols == [(None, None, None)] * 3
@@ -0,0 +1,67 @@
+import numpy as np
+
+from backend.query_cache import QueryEmbeddingCache, normalize_query
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def test_normalize_query_folds_case_and_whitespace():
+    assert normalize_query("  Mikä   on\tKA24DE:n ÖLJY? ") == "mikä on ka24de:n öljy?"
+
+
+def test_cache_hits_skip_encoder_and_keep_row_order():
+    enc = CountingEncoder()
+    cache = QueryEmbeddingCache(max_size=10)
+
+    first = cache.encode(["öljy", "Jarrut"], enc)
+    second = cache.encode(["jarrut ", "ÖLJY", "öljy"], enc)
+
+    assert enc.calls == [["öljy", "jarrut"]]
+    assert np.array_equal(second, first[[1, 0, 0]])
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_evicts_least_recently_used():
+    enc = CountingEncoder()
+    cache = QueryEmbeddingCache(max_size=2)
+
+    cache.encode(["a", "b"], enc)
+    cache.encode(["a"], enc)  # "b" is now the oldest
+    cache.encode(["c"], enc)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+def test_cache_entries_expire_after_ttl():
+    now = [0.0]
+    enc = CountingEncoder()
+    cache = QueryEmbeddingCache(max_size=10, ttl_sec=60, clock=lambda: now[0])
+
+    cache.encode(["a"], enc)
+    now[0] = 30.0
+    cache.encode(["a"], enc)
+    now[0] = 100.0
+    cache.encode(["a"], enc)
+
+    assert enc.calls == [["a"], ["a"]]
+
+
+def test_zero_size_disables_cache():
+    enc = CountingEncoder()
+    cache = QueryEmbeddingCache(max_size=0)
+
+    cache.encode(["a"], enc)
+    cache.encode(["a"], enc)
+
+    assert len(enc.calls) == 2
+    assert len(cache) == 0
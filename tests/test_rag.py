@@ -53,3 +53,41 @@ def test_cosine_top_k_validates_dimensions():
 
     with pytest.raises(ValueError):
         rag.cosine_top_k(np.array([1.0, 0.0]), np.array([[1.0, 0.0, 2.0]]))
+
+
+def test_embedding_index_matches_cosine_top_k():
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(50, 8)).astype(np.float32)
+    query = rng.normal(size=8).astype(np.float32)
+
+    index = rag.EmbeddingIndex(matrix)
+    idx, scores = index.search(query, k=5)
+    ref_idx, ref_scores = rag.cosine_top_k(query, matrix, k=5)
+
+    assert idx.tolist() == ref_idx.tolist()
+    assert np.allclose(scores, ref_scores, atol=1e-6)
+    assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1.0, atol=1e-5)
+
+
+def test_embedding_index_handles_empty_matrix():
+    index = rag.EmbeddingIndex(np.empty((0, 4), dtype=np.float32))
+    idx, scores = index.search(np.array([1.0, 0.0, 0.0, 0.0]), k=3)
+
+    assert len(index) == 0
+    assert idx.size == 0
+    assert scores.size == 0
+
+
+def test_embedding_index_search_many_matches_single_queries():
+    rng = np.random.default_rng(1)
+    matrix = rng.normal(size=(40, 6)).astype(np.float32)
+    queries = rng.normal(size=(4, 6)).astype(np.float32)
+
+    index = rag.EmbeddingIndex(matrix)
+    batched = index.search_many(queries, k=3)
+
+    assert len(batched) == 4
+    for q, (idx, scores) in zip(queries, batched):
+        ref_idx, ref_scores = index.search(q, k=3)
+        assert idx.tolist() == ref_idx.tolist()
+        assert np.allclose(scores, ref_scores, atol=1e-6)
@@ -0,0 +1,76 @@
+import sqlite3
+
+import numpy as np
+
+from backend import chunk_index, rag, reloader, store
+
+
+def insert_chunks(db_path, source, vectors):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO chunks(source, ref, text, embedding) VALUES(?, ?, ?, ?)",
+        [(source, f"{source}#{i}", f"{source} {i}", v.tobytes()) for i, v in enumerate(vectors)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def insert_sources(db_path):
+    rng = np.random.default_rng(0)
+    insert_chunks(db_path, "manual", rng.normal(size=(20, 8)).astype(np.float32))
+    insert_chunks(db_path, "parts_text", rng.normal(size=(5, 8)).astype(np.float32))
+
+
+def test_snapshot_search_matches_flat_search(tmp_path, db):
+    insert_sources(db)
+    snap = chunk_index.load_snapshot(db, tmp_path / "meta.json")
+
+    conn = sqlite3.connect(db)
+    rows = conn.execute("SELECT id, embedding FROM chunks ORDER BY source, id").fetchall()
+    conn.close()
+    matrix = np.vstack([np.frombuffer(b, dtype=np.float32) for _, b in rows])
+
+    q = matrix[22] + 0.05
+    idx, scores = snap.search(q, k=4)
+    ref_idx, ref_scores = rag.cosine_top_k(q, matrix, k=4)
+
+    assert idx.tolist() == ref_idx.tolist()
+    assert np.allclose(scores, ref_scores, atol=1e-6)
+    assert snap.chunk_ids[idx].tolist() == [rows[i][0] for i in ref_idx]
+
+
+def test_reload_rebuilds_only_bumped_source(tmp_path, db):
+    insert_sources(db)
+    r = reloader.SnapshotReloader(db_path=db, meta_path=tmp_path / "meta.json")
+    r.reload(force=True)
+    first = r.snapshot
+
+    assert r.reload()["reloaded"] is False
+
+    insert_chunks(db, "parts_text", [np.ones(8, dtype=np.float32)])
+    conn = sqlite3.connect(db)
+    store.bump_index_generation(conn, "parts_text")
+    conn.close()
+
+    result = r.reload()
+    assert result["reloaded"] is True
+    assert result["rebuilt_sources"] == ["parts_text"]
+    assert r.snapshot.partitions["manual"] is first.partitions["manual"]
+    assert len(r.snapshot) == len(first) + 1
+
+    # The old snapshot object is untouched for requests still holding it.
+    assert len(first.partitions["parts_text"]) == 5
+
+
+def test_snapshot_search_respects_source_filter(tmp_path, db):
+    insert_sources(db)
+    snap = chunk_index.load_snapshot(db, tmp_path / "meta.json")
+    q = np.ones(8, dtype=np.float32)
+
+    idx, _ = snap.search(q, k=30, sources=["parts_text"])
+    assert len(idx) == 5
+    assert {snap.chunk_sources[i] for i in idx} == {"parts_text"}
+
+    assert snap.size(["manual"]) == 20
+    assert snap.size(["unknown"]) == 0
+    assert snap.search(q, k=3, sources=[])[0].size == 0
@@ -0,0 +1,100 @@
+import sqlite3
+from datetime import date
+
+from backend import store
+from backend.intent import parse_period_cost_question, parse_period_list_question
+from backend.parts_index import PartsIndex
+from backend.parts_logic import date_day, load_parts_df, parts_frame
+from backend.rules import try_rules
+
+
+def test_rules_read_totals_from_parts_agg(db):
+    conn = store.connect()
+    conn.executemany(
+        "INSERT INTO parts(date, part, cost) VALUES(?, ?, ?)",
+        [("2024-05-01", "Jarrupalat etu", 40.0), ("2023-01-02", "Jarrupalat taka", 35.0)],
+    )
+    conn.commit()
+    parts = PartsIndex.from_frame(load_parts_df(conn))
+
+    q = "Paljonko jarrupalat on maksanut yhteensä?"
+    assert try_rules(q, parts)["answer"] == "75.00 € (2 osumaa)"
+    assert try_rules(q, parts, store.DB_PATH)["answer"] == "75.00 € (2 osumaa)"
+
+    # Another process adds a row for a known key: parts_agg has it, the index does not.
+    with sqlite3.connect(store.DB_PATH) as other:
+        other.execute("INSERT INTO parts(date, part, cost) VALUES('2024-09-01', 'Jarrupalat etu', 42.0)")
+    assert try_rules(q, parts, store.DB_PATH)["answer"] == "117.00 € (3 osumaa)"
+    assert try_rules("Milloin viimeksi jarrupalat vaihdettiin?", parts, store.DB_PATH)["answer"] == (
+        "Viimeksi vaihdettu 2024-09-01 (3 merkintää)."
+    )
+    assert try_rules("Onko kytkin vaihdettu?", parts, store.DB_PATH)["answer"] == "Ei. Osaa 'kytkin' ei ole vaihdettu."
+    conn.close()
+
+
+def test_period_intents():
+    today = date(2026, 2, 10)
+    assert parse_period_cost_question("Paljonko kului vuonna 2024?", today) == (
+        date(2024, 1, 1), date(2025, 1, 1), "vuonna 2024"
+    )
+    # A month without a year is its latest occurrence.
+    assert parse_period_list_question("Mitä vaihdettiin maaliskuussa?", today) == (
+        date(2025, 3, 1), date(2025, 4, 1), "maaliskuussa 2025"
+    )
+    assert parse_period_list_question("mitä vaihdettiin joulukuussa 2023", today)[1] == date(2024, 1, 1)
+    assert parse_period_cost_question("Paljonko jarrupalat on maksanut yhteensä?", today) is None
+
+    # Anything besides the period (a part name, a unit) is not a period question.
+    assert parse_period_cost_question("Paljonko maksoivat jarrupalat vuonna 2024?", today) is None
+    assert parse_period_list_question("Mitä osia vaihdettiin 2000 km jälkeen?", today) is None
+    assert parse_period_list_question("Mitä vaihdettiin 2023?", today)[2] == "vuonna 2023"
+    assert parse_period_cost_question("Paljonko kului yhteensä viime vuonna?", today)[0] == date(2025, 1, 1)
+
+
+def test_period_rules_scan_date_day(db):
+    conn = store.connect()
+    conn.executemany(
+        "INSERT INTO parts(date, part, cost, date_day) VALUES(?, ?, ?, ?)",
+        [(d, p, c, date_day(d)) for d, p, c in [
+            ("2024-03-04", "Jarrupalat etu", 40.0),
+            ("20.3.2024", "Öljynsuodatin", 9.5),
+            ("2023-12-30", "Akku", 120.0),
+        ]],
+    )
+    conn.commit()
+    parts = PartsIndex.from_frame(load_parts_df(conn))
+    conn.close()
+
+    for db_path in (store.DB_PATH, None):
+        assert try_rules("Paljonko kului vuonna 2024?", parts, db_path)["answer"] == "Vuonna 2024 kului 49.50 € (2 merkintää)."
+        assert try_rules("Mitä vaihdettiin maaliskuussa 2024?", parts, db_path)["answer"] == (
+            "Maaliskuussa 2024 vaihdettiin: Jarrupalat etu (2024-03-04), Öljynsuodatin (2024-03-20)."
+        )
+        assert try_rules("Mitä vaihdettiin vuonna 2022?", parts, db_path)["answer"] == "Ei merkintöjä (vuonna 2022)."
+        assert try_rules("Paljonko maksoivat jarrupalat vuonna 2024?", parts, db_path) is None
+        assert try_rules("Mitä osia vaihdettiin 2000 km jälkeen?", parts, db_path) is None
+
+
+def test_inflected_targets_resolve_by_trigram_similarity():
+    parts = PartsIndex.from_frame(parts_frame([
+        {"id": 1, "date": "2024-05-01", "part": "Jarrupalat etu", "cost": 40.0, "notes": None},
+        {"id": 2, "date": "2023-01-02", "part": "Jarrulevyt", "cost": 80.0, "notes": None},
+    ]))
+
+    q = "Paljonko jarrupaloja on maksanut yhteensä?"
+    assert try_rules(q, parts)["answer"] == "40.00 € (1 osumaa) (tulkittu: jarrupalat)"
+    assert try_rules(q, parts, fuzzy_threshold=0.0)["answer"] == "0.00 € (0 osumaa)"
+    assert try_rules("Onko jarrulevyjä vaihdettu?", parts)["answer"] == (
+        "Kyllä. Viimeksi vaihdettu 2023-01-02 (1 merkintää) (tulkittu: jarrulevyt)."
+    )
+
+
+def test_fuzzy_targets_never_answer_for_a_different_part():
+    parts = PartsIndex.from_frame(parts_frame([
+        {"id": 1, "date": "2024-05-01", "part": "Ilmansuodatin", "cost": 12.0, "notes": None},
+        {"id": 2, "date": "2023-01-02", "part": "Takajarrulevyt", "cost": 80.0, "notes": None},
+    ]))
+
+    assert try_rules("Onko öljynsuodatin vaihdettu?", parts)["answer"] == "Ei. Osaa 'öljynsuodatin' ei ole vaihdettu."
+    assert try_rules("Onko etujarrulevyt vaihdettu?", parts)["answer"] == "Ei. Osaa 'etujarrulevyt' ei ole vaihdettu."
+    assert try_rules("Onko etujarrulevyt vaihdettu?", parts, fuzzy_threshold=0.3)["answer"].startswith("Ei.")
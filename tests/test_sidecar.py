@@ -0,0 +1,79 @@
+import sqlite3
+
+import numpy as np
+
+from backend import chunk_index, rag, sidecar
+
+
+def insert_chunks(db_path, n=30, dim=8):
+    rng = np.random.default_rng(0)
+    emb = rng.normal(size=(n, dim)).astype(np.float32)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO chunks(source, ref, text, embedding) VALUES(?, ?, ?, ?)",
+        [("manual", f"m.pdf#page={i}", f"text {i}", emb[i].tobytes()) for i in range(n)]
+        + [("notes", "notes.md", "placeholder", b"")],
+    )
+    conn.commit()
+    conn.close()
+    return emb
+
+
+def test_write_sidecar_skips_empty_embeddings(tmp_path, db):
+    emb = insert_chunks(db)
+    meta_path = tmp_path / "embeddings_meta.json"
+
+    assert sidecar.write_sidecar(db, meta_path) == emb.shape[0]
+
+    meta = sidecar.read_sidecar_meta(meta_path)
+    mm = sidecar.open_sidecar(meta, meta_path)
+    assert meta["chunk_ids"] == list(range(1, emb.shape[0] + 1))
+    assert np.allclose(mm, rag.normalize_rows(emb), atol=1e-6)
+
+
+def test_write_sidecar_replaces_previous_file(tmp_path, db):
+    insert_chunks(db)
+    meta_path = tmp_path / "embeddings_meta.json"
+
+    sidecar.write_sidecar(db, meta_path)
+    sidecar.write_sidecar(db, meta_path)
+
+    assert len(list(tmp_path.glob(sidecar.SIDECAR_GLOB))) == 1
+
+
+def test_memmap_index_blockwise_matches_exact():
+    rng = np.random.default_rng(1)
+    matrix = rng.normal(size=(100, 8)).astype(np.float32)
+    index = sidecar.MemmapIndex(rag.normalize_rows(matrix), block_rows=7)
+    exact = rag.EmbeddingIndex(matrix)
+    queries = rng.normal(size=(3, 8)).astype(np.float32)
+
+    for q, (idx, scores) in zip(queries, index.search_many(queries, k=5)):
+        ref_idx, ref_scores = exact.search(q, k=5)
+        assert idx.tolist() == ref_idx.tolist()
+        assert index.search(q, k=5)[0].tolist() == ref_idx.tolist()
+        assert np.allclose(scores, ref_scores, atol=1e-6)
+
+
+def test_load_snapshot_uses_sidecar_only_when_ids_match(tmp_path, db):
+    insert_chunks(db)
+    meta_path = tmp_path / "embeddings_meta.json"
+
+    snap = chunk_index.load_snapshot(db, meta_path)
+    assert type(snap.partitions["manual"].index) is rag.EmbeddingIndex
+
+    sidecar.write_sidecar(db, meta_path)
+    snap = chunk_index.load_snapshot(db, meta_path)
+    assert isinstance(snap.partitions["manual"].index, sidecar.MemmapIndex)
+    assert len(snap) == len(snap.chunk_ids) == len(snap.chunk_sources)
+
+    # A chunk added after the sidecar was written makes it stale.
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "INSERT INTO chunks(source, ref, text, embedding) VALUES('manual', 'x', 'y', ?)",
+        (np.ones(8, dtype=np.float32).tobytes(),),
+    )
+    conn.commit()
+    conn.close()
+    snap = chunk_index.load_snapshot(db, meta_path)
+    assert type(snap.partitions["manual"].index) is rag.EmbeddingIndex
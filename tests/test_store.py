@@ -1,6 +1,7 @@
 import sqlite3
 
 from backend import store
+from backend.parts_logic import backfill_date_days
 
 
 def test_init_db_creates_schema(tmp_path, monkeypatch):
@@ -19,3 +20,66 @@ def test_init_db_creates_schema(tmp_path, monkeypatch):
         conn.close()
 
     assert {"chunks", "parts", "manual_pages"}.issubset(tables)
+
+
+def test_upsert_manual_pages_records_method(db):
+    conn = store.connect()
+    store.upsert_manual_pages(conn, [(1, "vanha", "ocr"), (2, "", "blank")])
+    store.upsert_manual_pages(conn, [(1, "uusi", "native")])
+    rows = conn.execute("SELECT page_num, text, method FROM manual_pages ORDER BY page_num").fetchall()
+    conn.close()
+
+    assert rows == [(1, "uusi", "native"), (2, "", "blank")]
+
+
+def test_manual_page_hashes_round_trip(db):
+    conn = store.connect()
+    store.upsert_manual_pages(conn, [(1, "a", "ocr", "h1", "tesserocr:5.3.0:eng"), (2, "b", "native")])
+    hashes = store.read_manual_page_hashes(conn)
+    conn.close()
+
+    assert hashes == {1: ("h1", "tesserocr:5.3.0:eng"), 2: (None, None)}
+
+
+def test_parts_agg_follows_inserts_updates_and_deletes(db):
+    conn = store.connect()
+    conn.executemany(
+        "INSERT INTO parts(date, part, cost) VALUES(?, ?, ?)",
+        [("2024-05-01", " Jarrupalat ", 40.0), ("2023-01-02", "jarrupalat", 35.0), (None, "jarrupalat", None)],
+    )
+    assert store.read_parts_agg(conn, ["jarrupalat"]) == (3, 2, 75.0, "2024-05-01")
+
+    conn.execute("DELETE FROM parts WHERE id = 1")
+    assert store.read_parts_agg(conn, ["jarrupalat"]) == (2, 1, 35.0, "2023-01-02")
+
+    conn.execute("UPDATE parts SET part = 'Jarrulevyt' WHERE id = 2")
+    assert store.read_parts_agg(conn, ["jarrupalat"]) == (1, 0, 0.0, None)
+    assert store.read_parts_agg(conn, ["jarrulevyt", "jarrupalat"]) == (2, 1, 35.0, "2023-01-02")
+    conn.close()
+
+
+def test_init_db_backfills_iso_date_days(db):
+    conn = store.connect()
+    conn.executemany(
+        "INSERT INTO parts(date, part) VALUES(?, ?)",
+        [("2024-05-01", "a"), ("1.5.2024", "b"), ("2024", "c")],
+    )
+    conn.execute("UPDATE parts SET date_day = NULL")
+    conn.commit()
+    store.init_db()
+
+    days = dict(conn.execute("SELECT part, date_day FROM parts").fetchall())
+    assert days == {"a": 19844, "b": None, "c": None}
+
+    # Other formats are parsed in Python (day-first).
+    assert backfill_date_days(conn) == 2
+    days = dict(conn.execute("SELECT part, date_day FROM parts").fetchall())
+    assert days == {"a": 19844, "b": 19844, "c": 19723}
+    conn.close()
+
+
+def test_manual_page_methods(db):
+    conn = store.connect()
+    store.upsert_manual_pages(conn, [(1, "a", "native"), (2, "", "blank"), (3, "c", "ocr", "h3", "s")])
+    assert store.read_manual_page_methods(conn) == {1: "native", 2: "blank", 3: "ocr"}
+    conn.close()
@@ -165,6 +165,8 @@ elif page == "PDF-haku":
     st.subheader("PDF-haku")
 
     query = st.text_input("Hae käsikirjasta", key="pdf_search")
+    search_modes = {"Semanttinen": "vector", "Sanahaku": "lexical", "Yhdistelmä": "hybrid"}
+    mode_label = st.radio("Hakutapa", list(search_modes), horizontal=True, key="pdf_search_mode")
     if st.button("Hae", key="pdf_search_button"):
         if not query.strip():
             st.warning("Kirjoita hakulause.")
@@ -172,7 +174,11 @@ elif page == "PDF-haku":
             try:
                 resp = requests.post(
                     f"{BACKEND_URL}/pdf/search",
-                    json={"query": query},
+                    json={
+                        "query": query,
+                        "sources": ["manual"],
+                        "mode": search_modes[mode_label],
+                    },
                     timeout=10,
                 )
                 resp.raise_for_status()